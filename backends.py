@@ -0,0 +1,54 @@
+import importlib
+import sys
+from typing import Callable, Dict, Iterable
+
+# AST output backends by name, as "module:function". A backend's module is
+# imported the first time it is selected, so a compile only pays for the
+# output it produces (the PrettyPrint drawing alone costs most of a second of
+# imports). Every backend function takes (statements, stream).
+BACKENDS: Dict[str, str] = {
+    "text": "render:render_display",
+    "pretty": "visualize:render_pretty",
+    "dot": "render:render_dot",
+    "json": "render:render_jsonl",
+}
+
+# Packages a backend's module needs beyond the stdlib, named in the error
+# raised when they are missing
+REQUIREMENTS = {"pretty": "PrettyPrintTree"}
+
+
+class BackendError(Exception):
+    pass
+
+
+# Add a backend, or replace one, e.g. register_backend("html", "mytools:render_html")
+def register_backend(name: str, spec: str):
+    module, _, function = spec.partition(":")
+    if not module or not function:
+        raise BackendError(f"Backend spec '{spec}' is not of the form 'module:function'")
+    BACKENDS[name] = spec
+
+
+# Import and return the function of a backend
+def load_backend(name: str) -> Callable:
+    try:
+        spec = BACKENDS[name]
+    except KeyError:
+        raise BackendError(
+            f"Unknown output backend '{name}' (available: {', '.join(sorted(BACKENDS))})"
+        ) from None
+    module, _, function = spec.partition(":")
+    try:
+        return getattr(importlib.import_module(module), function)
+    except ImportError as e:
+        requirement = REQUIREMENTS.get(name)
+        hint = f"; install it with `pip install {requirement}`" if requirement else ""
+        raise BackendError(f"Output backend '{name}' is unavailable: {e}{hint}") from None
+    except AttributeError:
+        raise BackendError(f"Module '{module}' has no backend function '{function}'") from None
+
+
+# Write statements with the named backend (to stdout by default)
+def render_ast(statements: Iterable, name: str, stream=None):
+    load_backend(name)(statements, stream if stream is not None else sys.stdout)
@@ -0,0 +1,232 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional
+
+from cache import CompilationCache
+from diagnostics import Diagnostics
+from lexical import LexicalAnalyzer
+from sourcemap import SourceMap, open_source
+from symbols import SymbolTable
+from syntax import Parser
+
+# Compilation caches opened by this process, one per cache directory
+_caches = {}
+
+
+# Outcome of compiling one file in a batch
+class CompileResult:
+    __slots__ = ("path", "tokens", "statements", "messages", "error", "ast", "cached")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tokens = 0  # Number of tokens produced by the lexer
+        self.statements = 0  # Number of top-level statements parsed
+        self.messages = []  # Lexical and syntax error messages, in the order found
+        self.error = None  # Summary of the syntax errors, or the read error
+        self.ast = None  # Top-level statements, only kept when requested
+        self.cached = False  # True when served from the compilation cache
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.messages
+
+    def __str__(self):
+        if self.error is not None:
+            return f"ERROR {self.path}: {self.error}"
+        status = "OK   " if self.ok else "WARN "
+        return f"{status} {self.path} ({self.tokens} tokens, {self.statements} statements)"
+
+
+# Throughput summary of a batch run
+class BatchReport:
+    def __init__(self, results: List[CompileResult], seconds: float, workers: int):
+        self.results = results
+        self.seconds = seconds
+        self.workers = workers
+        self.files = len(results)
+        self.tokens = sum(result.tokens for result in results)
+        self.failed = sum(1 for result in results if not result.ok)
+        self.cache_hits = sum(1 for result in results if result.cached)
+
+    def __str__(self):
+        seconds = max(self.seconds, 1e-9)
+        return (
+            f"Compiled {self.files} files ({self.failed} with errors) "
+            f"in {self.seconds:.3f}s using {self.workers} worker(s): "
+            f"{self.files / seconds:,.1f} files/sec, {self.tokens / seconds:,.0f} tokens/sec, "
+            f"{self.cache_hits} cache hit(s)"
+        )
+
+
+# Expand directories (all .txt files below them) and glob patterns into a
+# sorted, de-duplicated list of paths so batch results have a stable order
+def expand_inputs(inputs: Iterable[str]) -> List[str]:
+    paths = set()
+    for entry in inputs:
+        if os.path.isdir(entry):
+            pattern = os.path.join(entry, "**", "*.txt")
+            paths.update(glob.glob(pattern, recursive=True))
+        elif os.path.isfile(entry):
+            paths.add(entry)
+        else:
+            paths.update(
+                path for path in glob.glob(entry, recursive=True) if os.path.isfile(path)
+            )
+    return sorted(paths)
+
+
+# Compile one file through the LexicalAnalyzer -> Parser pipeline, streaming
+# tokens from the file straight into the parser. The parser recovers from
+# syntax errors, so every error of the file is reported in one run. With a
+# cache directory, unchanged files are served from the compilation cache instead.
+def compile_file(
+    path: str,
+    engine: str = "regex",
+    keep_ast: bool = False,
+    cache_dir: Optional[str] = None,
+) -> CompileResult:
+    if cache_dir is not None:
+        return compile_file_cached(path, engine, keep_ast, cache_dir)
+    result = CompileResult(path)
+
+    def counted(tokens):
+        for token in tokens:
+            result.tokens += 1
+            yield token
+
+    diagnostics = Diagnostics(SourceMap(path=path))
+    try:
+        with open_source(path) as file:
+            symbols = SymbolTable()
+            lexer = LexicalAnalyzer(engine=engine, diagnostics=diagnostics, symbols=symbols)
+            parser = Parser(counted(lexer.iter_tokens(file)), diagnostics, symbols)
+            statements = []
+            for statement in parser.parse_program_iter():
+                result.statements += 1
+                if keep_ast:
+                    statements.append(statement)
+    except (OSError, UnicodeDecodeError) as e:
+        result.error = f"Error reading file: {e}"
+    else:
+        if keep_ast:
+            result.ast = statements
+    record_diagnostics(result, diagnostics)
+    return result
+
+
+# Keep a file's diagnostics as messages; any syntax error fails the file
+def record_diagnostics(result: CompileResult, diagnostics: Diagnostics):
+    result.messages = diagnostics.messages()
+    errors = diagnostics.count("syntax")
+    if errors and result.error is None:
+        result.error = f"Syntax Error: {errors} error(s) found"
+
+
+def compile_file_cached(
+    path: str, engine: str, keep_ast: bool, cache_dir: str
+) -> CompileResult:
+    result = CompileResult(path)
+    if cache_dir not in _caches:
+        _caches[cache_dir] = CompilationCache(cache_dir)
+    cache = _caches[cache_dir]
+
+    try:
+        with open(path, "rb") as file:
+            source = file.read()
+        hits = cache.hits
+        tokens, statements, diagnostics = cache.compile(source, engine)
+    except (OSError, UnicodeDecodeError) as e:
+        result.error = f"Error reading file: {e}"
+        return result
+    result.cached = cache.hits > hits
+    diagnostics.source_map = SourceMap(path=path)
+    record_diagnostics(result, diagnostics)
+    result.tokens = len(tokens)
+    result.statements = len(statements)
+    if keep_ast:
+        result.ast = statements
+    return result
+
+
+# Compile many files across a process pool. Results come back in the order of
+# `paths`; workers <= 1 compiles in the current process.
+def compile_batch(
+    paths: List[str],
+    workers: Optional[int] = None,
+    chunksize: int = 1,
+    engine: str = "regex",
+    keep_ast: bool = False,
+    cache_dir: Optional[str] = None,
+) -> BatchReport:
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    if workers <= 1:
+        results = [compile_file(path, engine, keep_ast, cache_dir) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(
+                executor.map(
+                    compile_file,
+                    paths,
+                    [engine] * len(paths),
+                    [keep_ast] * len(paths),
+                    [cache_dir] * len(paths),
+                    chunksize=chunksize,
+                )
+            )
+    return BatchReport(results, time.perf_counter() - start, workers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compile PoliteLang files in batch (non-interactive)."
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="files, directories or glob patterns to compile"
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)"
+    )
+    parser.add_argument(
+        "--chunksize", type=int, default=1, help="files handed to a worker at a time"
+    )
+    parser.add_argument(
+        "--engine", choices=LexicalAnalyzer.ENGINES, default="regex", help="lexer engine"
+    )
+    parser.add_argument(
+        "--cache-dir", default=None, help="reuse tokens and ASTs of unchanged files"
+    )
+    parser.add_argument(
+        "--clear-cache", action="store_true", help="empty the cache directory first"
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="only print failures and the summary"
+    )
+    args = parser.parse_args(argv)
+
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        print("No source code files found.")
+        return 1
+
+    if args.clear_cache and args.cache_dir:
+        CompilationCache(args.cache_dir).clear()
+
+    report = compile_batch(
+        paths, args.workers, args.chunksize, args.engine, cache_dir=args.cache_dir
+    )
+    for result in report.results:
+        if not (args.quiet and result.ok):
+            print(result)
+            for message in result.messages:
+                print(f"    {message}")
+    print(report)
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
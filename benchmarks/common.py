@@ -0,0 +1,33 @@
+import time
+
+# Statements cycled through to build large PoliteLang programs for benchmarking
+SAMPLE_STATEMENTS = [
+    "pls score = 10 thanks~\n",
+    "pls total = score + 3 * (score - 1) thanks~\n",
+    'show("Hello from PoliteLang!") thanks~\n',
+    ":) This is a friendly comment\n",
+    "Check (score >= 5) {\n",
+    '    shout("High score!") thanks~\n',
+    "} otherwise {\n",
+    '    whisper("Keep trying...") thanks~\n',
+    "}\n",
+    "During (total != 0) {\n",
+    "    pls total = total - 1 thanks~\n",
+    "}\n",
+]
+
+
+# Build a program of roughly `size` characters by repeating the sample statements
+def sample_program(size: int) -> str:
+    block = "".join(SAMPLE_STATEMENTS)
+    return block * max(1, size // len(block))
+
+
+# Run `func` `repeat` times and return the best wall-clock time in seconds
+def best_time(func, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
@@ -0,0 +1,72 @@
+# Compare compiling small files one command at a time: a cold `batch.py` run
+# per file, a `client.py` run per file against a warm daemon, and the same
+# requests sent in-process over one pipelined connection.
+# Run from the repository root: python -m benchmarks.daemon [files]
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import client
+from benchmarks.common import best_time, sample_program
+
+
+def wait_for_daemon(socket_path: str):
+    deadline = time.monotonic() + client.START_TIMEOUT
+    while not os.path.exists(socket_path):
+        if time.monotonic() > deadline:
+            raise RuntimeError("The daemon did not start")
+        time.sleep(0.02)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for index in range(count):
+            path = os.path.join(directory, f"program-{index}.txt")
+            with open(path, "w") as file:
+                file.write(sample_program(2_000 + 500 * index))
+            paths.append(path)
+        socket_path = os.path.join(directory, "daemon.sock")
+        daemon = subprocess.Popen([sys.executable, "daemon.py", "--socket", socket_path])
+        try:
+            wait_for_daemon(socket_path)
+            requests = [{"path": path} for path in paths]
+            client.request_all(requests, socket_path, start=False)  # Warm the workers
+
+            def cold():
+                for path in paths:
+                    subprocess.run(
+                        [sys.executable, "batch.py", path, "-j", "1", "-q"],
+                        stdout=subprocess.DEVNULL,
+                        check=True,
+                    )
+
+            def warm():
+                for path in paths:
+                    subprocess.run(
+                        [sys.executable, "client.py", path, "-q", "--socket", socket_path, "--no-start"],
+                        stdout=subprocess.DEVNULL,
+                        check=True,
+                    )
+
+            def pipelined():
+                client.request_all(requests, socket_path, start=False)
+
+            cases = (
+                ("cold batch.py per file", cold),
+                ("client.py per file (warm daemon)", warm),
+                ("in-process pipelined requests", pipelined),
+            )
+            for label, func in cases:
+                elapsed = best_time(func)
+                print(f"{label}: {elapsed:.3f}s for {count} files ({elapsed / count * 1000:.1f} ms/file)")
+        finally:
+            client.request({"op": "shutdown"}, socket_path, start=False)
+            daemon.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# Stress the precedence-climbing expression parser with very long operator
+# chains and deeply nested parentheses, neither of which may recurse.
+# Run from the repository root: python -m benchmarks.expressions [terms]
+import sys
+
+from lexical import LexicalAnalyzer
+from syntax import Parser
+from benchmarks.common import best_time
+
+OPERATORS = ["+", "*", "-", "/", "<", "==", ">=", "!="]
+
+
+def long_chain(terms: int) -> str:
+    parts = ["x0"]
+    for index in range(1, terms):
+        parts.append(OPERATORS[index % len(OPERATORS)])
+        parts.append(f"x{index % 97}")
+    return " ".join(parts)
+
+
+def nested_parentheses(depth: int) -> str:
+    return "(" * depth + "1" + " + 2)" * depth
+
+
+def mixed_nesting(depth: int) -> str:
+    return "(a * " * depth + "b" + " - c)" * depth
+
+
+# Depth of the tree without recursing
+def tree_depth(node) -> int:
+    deepest = 0
+    stack = [(node, 1)]
+    while stack:
+        node, depth = stack.pop()
+        deepest = max(deepest, depth)
+        stack.extend((child, depth + 1) for child in node.children)
+    return deepest
+
+
+def main():
+    terms = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    cases = (
+        (f"{terms:,}-term operator chain", long_chain(terms)),
+        (f"{terms:,} nested parentheses", nested_parentheses(terms)),
+        (f"{terms:,} nested mixed-precedence groups", mixed_nesting(terms)),
+    )
+    for label, source in cases:
+        tokens = LexicalAnalyzer(source, engine="regex").tokenize()
+        expression = Parser(tokens).parse_expression()
+        elapsed = best_time(lambda: Parser(tokens).parse_expression())
+        print(
+            f"{label}: {len(tokens):,} tokens in {elapsed:.3f}s "
+            f"({len(tokens) / elapsed:,.0f} tokens/sec), tree depth {tree_depth(expression):,}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Parse two corpora with plain nodes and with one shared hashcons.NodeFactory
+# (and one SymbolTable): random generated programs, where little beyond the
+# leaves repeats, and templated files whose statements all come from a pool
+# of a few hundred. Compares the memory the ASTs keep alive (tracemalloc), the
+# parse time and the time to find the distinct statements of the corpus: a
+# structural key built by walking each plain statement, against the shared
+# statements themselves as keys.
+# Run from the repository root: python -m benchmarks.hashcons [files] [file_size]
+import random
+import sys
+
+from generator import ProgramGenerator
+from hashcons import NodeFactory
+from lexical import LexicalAnalyzer
+from render import walk
+from symbols import SymbolTable
+from syntax import Parser
+from benchmarks.common import best_time
+from benchmarks.memory import measure
+
+
+def parse_corpus(sources, nodes=None) -> list:
+    symbols = SymbolTable()
+    corpus = []
+    for source in sources:
+        tokens = LexicalAnalyzer(source, symbols=symbols, engine="regex").iter_tokens()
+        corpus.append(Parser(tokens, None, symbols, nodes).parse_program())
+    return corpus
+
+
+# Structural key of a plain subtree: its preorder (type, value, child count)
+def structural_key(node) -> tuple:
+    return tuple((item.type, item.value, len(item.children)) for item, _, _, _ in walk([node]))
+
+
+def distinct_statements(corpus, key) -> int:
+    return len({key(statement) for statements in corpus for statement in statements})
+
+
+# Files of `size` characters made of statements drawn from a fixed pool
+def templated_sources(files: int, size: int, pool_size: int = 300) -> list:
+    generator = ProgramGenerator(seed=0)
+    pool = [generator.statement(0) for _ in range(pool_size)]
+    sources = []
+    for seed in range(files):
+        rng = random.Random(seed)
+        pieces, length = [], 0
+        while length < size:
+            pieces.append(rng.choice(pool))
+            length += len(pieces[-1])
+        sources.append("".join(pieces))
+    return sources
+
+
+def compare(label: str, sources: list):
+    print(f"{label}: {len(sources)} files, {sum(map(len, sources)):,} characters")
+    plain, plain_bytes = measure(lambda: parse_corpus(sources))
+    factory = NodeFactory()
+    shared, shared_bytes = measure(lambda: parse_corpus(sources, factory))
+    plain_seconds = best_time(lambda: parse_corpus(sources), repeat=1)
+    shared_seconds = best_time(lambda: parse_corpus(sources, NodeFactory()), repeat=1)
+
+    nodes = sum(1 for statements in plain for _ in walk(statements))
+    print(f"  nodes: {nodes:,} parsed, {len(factory):,} distinct ({nodes / len(factory):.1f}x sharing)")
+    print(
+        f"  AST memory: plain {plain_bytes / 1e6:.2f} MB, shared {shared_bytes / 1e6:.2f} MB "
+        f"with the factory's tables ({plain_bytes / shared_bytes:.2f}x)"
+    )
+    print(f"  parse time: plain {plain_seconds:.3f}s, shared {shared_seconds:.3f}s")
+
+    distinct = distinct_statements(plain, structural_key)
+    assert distinct == distinct_statements(shared, lambda statement: statement)
+    by_walk = best_time(lambda: distinct_statements(plain, structural_key))
+    by_identity = best_time(lambda: distinct_statements(shared, lambda statement: statement))
+    print(
+        f"  distinct statements ({distinct:,}): structural keys {by_walk * 1000:.1f} ms, "
+        f"shared nodes {by_identity * 1000:.1f} ms ({by_walk / by_identity:.0f}x)"
+    )
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    file_size = int(sys.argv[2]) if len(sys.argv) > 2 else 16_000
+    compare("Generated", [ProgramGenerator(seed=seed).program(file_size) for seed in range(files)])
+    compare("Templated", templated_sources(files, file_size))
+
+
+if __name__ == "__main__":
+    main()
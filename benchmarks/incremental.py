@@ -0,0 +1,60 @@
+# Per-edit latency of incremental.Document against lexing and parsing the whole
+# file again. Run from the repository root: python -m benchmarks.incremental [lines]
+import io
+import sys
+import time
+
+from incremental import Document
+from lexical import LexicalAnalyzer
+from render import render_sexpr
+from syntax import Parser
+from benchmarks.common import SAMPLE_STATEMENTS, best_time, sample_program
+
+
+def sexpr(statements) -> str:
+    output = io.StringIO()
+    render_sexpr(statements, output)
+    return output.getvalue()
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    text = sample_program(lines * len("".join(SAMPLE_STATEMENTS)) // len(SAMPLE_STATEMENTS))
+    print(f"{text.count(chr(10)):,} lines, {len(text):,} characters")
+
+    full = best_time(
+        lambda: Parser(LexicalAnalyzer(text, engine="regex").tokenize()).parse_program(), 1
+    )
+    print(f"full re-lex and re-parse: {full * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    document = Document(text)
+    print(f"initial Document build: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    # Type a statement into the middle of the file, one keystroke at a time,
+    # then delete it again with backspace
+    middle = text.index("pls total", len(text) // 2)
+    typed = "pls extra = score * 2 thanks~\n"
+    timings = []
+    for index, character in enumerate(typed):
+        start = time.perf_counter()
+        document.edit(middle + index, 0, character)
+        timings.append(time.perf_counter() - start)
+    for index in reversed(range(len(typed))):
+        start = time.perf_counter()
+        document.edit(middle + index, 1, "")
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    print(
+        f"{len(timings)} keystrokes: median {timings[len(timings) // 2] * 1000:.2f} ms, "
+        f"worst {timings[-1] * 1000:.2f} ms"
+    )
+
+    expected = Parser(LexicalAnalyzer(document.text, engine="regex").tokenize()).parse_program()
+    identical = document.text == text and sexpr(document.statements()) == sexpr(expected)
+    print("Incremental AST matches a full parse." if identical else "MISMATCH!")
+
+
+if __name__ == "__main__":
+    main()
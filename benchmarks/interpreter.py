@@ -0,0 +1,93 @@
+# Time tight During loops in the closure-compiling Interpreter and the Python
+# bytecode backend against a naive tree walker that dispatches on node.type
+# strings and keeps variables in a dict.
+# Run from the repository root: python -m benchmarks.interpreter [iterations]
+import io
+import sys
+
+from compiler import PythonCompiler, run_code
+from interpreter import BINARY_OPERATORS, Interpreter, literal_value
+from lexical import LexicalAnalyzer
+from syntax import Parser
+from benchmarks.common import best_time
+
+LOOP_PROGRAM = """
+pls i = 0 thanks~
+pls total = 0 thanks~
+During (i < {iterations}) {{
+    pls total = total + (i * (2 + 3)) thanks~
+    Check (total > 1000000) {{
+        pls total = total - 1000000 thanks~
+    }}
+    pls i = i + 1 thanks~
+}}
+show(total) thanks~
+"""
+
+
+# Baseline: evaluate the AST directly, comparing node.type on every visit
+class NaiveInterpreter:
+    def __init__(self, output):
+        self.output = output
+        self.variables = {}
+
+    def run(self, statements):
+        for statement in statements:
+            self.execute(statement)
+
+    def execute(self, node):
+        if node.type == "Assignment":
+            self.variables[node.children[0].value] = self.evaluate(node.children[1])
+        elif node.type.endswith("Print"):
+            self.output.write(str(self.evaluate(node.children[0])) + "\n")
+        elif node.type == "If":
+            if self.evaluate(node.children[0]):
+                self.run(node.children[1].children)
+            elif len(node.children) > 2:
+                self.run(node.children[2].children)
+        elif node.type == "While":
+            while self.evaluate(node.children[0]):
+                self.run(node.children[1].children)
+
+    def evaluate(self, node):
+        if node.type == "Literal":
+            return literal_value(node.value)
+        if node.type == "String":
+            return node.value
+        if node.type == "Identifier":
+            return self.variables[node.value]
+        return BINARY_OPERATORS[node.value](
+            self.evaluate(node.children[0]), self.evaluate(node.children[1])
+        )
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    source = LOOP_PROGRAM.format(iterations=iterations)
+    statements = Parser(LexicalAnalyzer(source, engine="regex").tokenize()).parse_program()
+
+    code = PythonCompiler().compile(statements)
+    runners = (
+        ("naive tree walker", lambda output: NaiveInterpreter(output).run(statements)),
+        ("Interpreter", lambda output: Interpreter(output).run(statements)),
+        ("PythonCompiler", lambda output: run_code(code, output)),
+    )
+
+    outputs = {}
+    for name, run in runners:
+        output = io.StringIO()
+        elapsed = best_time(lambda: run(output))
+        outputs[name] = output.getvalue().splitlines()[-1]
+        print(
+            f"{name:>18}: {elapsed:.3f}s for {iterations:,} iterations "
+            f"({iterations / elapsed:,.0f} iterations/sec)"
+        )
+
+    if len(set(outputs.values())) != 1:
+        print(f"Outputs differ: {outputs}")
+        sys.exit(1)
+    print(f"All printed {outputs['Interpreter']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# Compare the "loop" and "regex" lexer engines and the mmap span scanner on a
+# large generated program.
+# Run from the repository root: python -m benchmarks.lexer_engines [size_in_chars]
+import os
+import sys
+import tempfile
+
+from lexical import LexicalAnalyzer, MappedSource
+from benchmarks.common import best_time, sample_program
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    source = sample_program(size)
+    print(f"Source size: {len(source):,} characters")
+
+    streams = {}
+    for engine in LexicalAnalyzer.ENGINES:
+        tokens = LexicalAnalyzer(source, engine=engine).tokenize()
+        streams[engine] = [(token.type, token.value) for token in tokens]
+        elapsed = best_time(lambda: LexicalAnalyzer(source, engine=engine).tokenize())
+        print(
+            f"{engine:>6}: {len(tokens):,} tokens in {elapsed:.3f}s "
+            f"({len(tokens) / elapsed:,.0f} tokens/sec)"
+        )
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as file:
+        file.write(source)
+    try:
+        with MappedSource(file.name) as mapped:
+            tokens = list(LexicalAnalyzer().iter_span_tokens(mapped))
+            streams["mmap"] = [(token.type, token.value) for token in tokens]
+            elapsed = best_time(
+                lambda: list(LexicalAnalyzer().iter_span_tokens(mapped))
+            )
+            print(
+                f"{'mmap':>6}: {len(tokens):,} span tokens in {elapsed:.3f}s "
+                f"({len(tokens) / elapsed:,.0f} tokens/sec)"
+            )
+    finally:
+        os.remove(file.name)
+
+    if not streams["loop"] == streams["regex"] == streams["mmap"]:
+        print("Token streams differ between scanners!")
+        sys.exit(1)
+    print("Token streams are identical.")
+
+
+if __name__ == "__main__":
+    main()
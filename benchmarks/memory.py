@@ -0,0 +1,86 @@
+# Measure token and AST memory with tracemalloc on a large generated program.
+# Compares the slotted Token/ASTNode classes and TokenBuffer against copies of
+# the original dict-based classes.
+# Run from the repository root: python -m benchmarks.memory [size_in_chars]
+import sys
+import tracemalloc
+
+from lexical import LexicalAnalyzer, Token, TokenBuffer
+from syntax import Parser
+from benchmarks.common import sample_program
+
+
+# The original Token layout: a regular object with a per-instance __dict__
+class DictToken:
+    def __init__(self, type, value):
+        self.type = type
+        self.value = value
+
+
+# The original ASTNode layout: a __dict__ and a children list on every node
+class DictNode:
+    def __init__(self, type_, value=None):
+        self.type = type_
+        self.value = value
+        self.children = []
+
+
+# Return (result, bytes still allocated by build()) measured with tracemalloc
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def to_dict_nodes(statements):
+    converted = []
+    stack = [(statement, converted) for statement in statements]
+    while stack:
+        node, siblings = stack.pop()
+        copy = DictNode(node.type, node.value)
+        siblings.append(copy)
+        stack.extend((child, copy.children) for child in node.children)
+    return converted
+
+
+def report(label, size, count, unit):
+    print(f"{label:<28} {size / 1e6:9.2f} MB  {size / count:7.1f} bytes/{unit}")
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    source = sample_program(size)
+    print(f"Source size: {len(source):,} characters\n")
+
+    tokens, slotted_size = measure(
+        lambda: LexicalAnalyzer(source, engine="regex").tokenize()
+    )
+    # Re-wrap the same value strings to isolate the per-object cost of each layout
+    _, slotted_objects = measure(lambda: [Token(t.type, t.value) for t in tokens])
+    _, dict_objects = measure(lambda: [DictToken(t.type, t.value) for t in tokens])
+    dict_size = slotted_size - slotted_objects + dict_objects
+    _, buffer_size = measure(lambda: TokenBuffer.from_source(source))
+    count = len(tokens)
+    print(f"Tokens: {count:,}")
+    report("dict-based Token objects", dict_size, count, "token")
+    report("slotted Token objects", slotted_size, count, "token")
+    report("columnar TokenBuffer", buffer_size, count, "token")
+
+    statements, ast_size = measure(lambda: Parser(tokens).parse_program())
+    _, dict_ast_size = measure(lambda: to_dict_nodes(statements))
+    nodes = 0
+    stack = list(statements)
+    while stack:
+        node = stack.pop()
+        nodes += 1
+        stack.extend(node.children)
+    print(f"\nAST nodes: {nodes:,}")
+    report("dict-based AST nodes", dict_ast_size, nodes, "node")
+    report("slotted AST nodes", ast_size, nodes, "node")
+
+
+if __name__ == "__main__":
+    main()
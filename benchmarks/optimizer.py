@@ -0,0 +1,75 @@
+# Run a machine-generated-style program (constant Check branches, dead
+# otherwise blocks, During loops recomputing invariant operations, repeated
+# subexpressions) with and without the optimizer's passes, and print what
+# each pass did.
+# Run from the repository root: python -m benchmarks.optimizer [iterations]
+import io
+import sys
+
+from interpreter import Interpreter
+from lexical import LexicalAnalyzer
+from optimizer import PassManager
+from symbols import SymbolTable
+from syntax import Parser
+from benchmarks.common import best_time
+
+HEADER = """pls scale = 3 thanks~
+pls offset = 0 thanks~
+Given c in "abcdefg" {
+    pls offset = offset + 1 thanks~
+}
+pls debug = nah thanks~
+"""
+
+LOOP = """pls limit{n} = {iterations} thanks~
+pls base{n} = offset * scale thanks~
+pls i = 0 thanks~
+pls total{n} = 0 thanks~
+During (i < limit{n}) {{
+    Check (debug) {{
+        show("iteration") thanks~
+    }} otherwise {{
+        pls step = base{n} * scale + offset - 1 thanks~
+    }}
+    Check (yep) {{
+        pls total{n} = total{n} + step * i + step thanks~
+    }}
+    pls i = i + 1 thanks~
+}}
+pls mean{n} = total{n} * scale / limit{n} + total{n} * scale thanks~
+show(mean{n}) thanks~
+"""
+
+
+def program(iterations: int, loops: int = 4) -> str:
+    return HEADER + "".join(LOOP.format(n=n, iterations=iterations) for n in range(loops))
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    source = program(iterations)
+    symbols = SymbolTable()
+    statements = Parser(LexicalAnalyzer(source, symbols=symbols).tokenize(), None, symbols).parse_program()
+    manager = PassManager(symbols)
+    optimized = manager.run(statements)
+    print(manager.format_stats())
+
+    outputs = {}
+
+    def run(tree, label):
+        output = io.StringIO()
+        Interpreter(output).run(tree)
+        outputs[label] = output.getvalue()
+
+    plain = best_time(lambda: run(statements, "plain"))
+    fast = best_time(lambda: run(optimized, "optimized"))
+    optimize = best_time(lambda: PassManager(symbols).run(statements))
+    assert outputs["plain"] == outputs["optimized"], "the optimizer changed the output"
+    print(
+        f"\n{iterations:,} iterations x 4 loops: unoptimized {plain:.3f}s, "
+        f"optimized {fast:.3f}s ({plain / fast:.2f}x), optimizing took {optimize * 1000:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
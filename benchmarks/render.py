@@ -0,0 +1,44 @@
+# Compare the recursive string-concatenating AST dump with the streaming
+# renderers. Run from the repository root: python -m benchmarks.render [size]
+import os
+import sys
+
+from lexical import LexicalAnalyzer
+from render import render_jsonl, render_sexpr, render_text
+from syntax import Parser
+from benchmarks.common import best_time, sample_program
+
+
+# The original ASTNode.to_tree: recursion plus `ret +=` at every level
+def recursive_to_tree(node, level=0):
+    ret = "\t" * level + f"{node.type}({node.value if node.value else ''})\n"
+    for child in node.children:
+        ret += recursive_to_tree(child, level + 1)
+    return ret
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    tokens = LexicalAnalyzer(sample_program(size), engine="regex").tokenize()
+    program = Parser(tokens).parse_program()
+    # One statement nesting every other one, so the recursive dump concatenates
+    # ever longer strings
+    nested = Parser(
+        LexicalAnalyzer("During (x) {" * 500 + "pls x = x thanks~" + "}" * 500).tokenize()
+    ).parse_program()
+
+    with open(os.devnull, "w") as null:
+        rows = [
+            ("recursive to_tree", lambda ast: null.write("".join(map(recursive_to_tree, ast)))),
+            ("streaming text", lambda ast: render_text(ast, null)),
+            ("JSON Lines", lambda ast: render_jsonl(ast, null)),
+            ("S-expressions", lambda ast: render_sexpr(ast, null)),
+        ]
+        for label, ast in ((f"{len(program):,} statements", program), ("500 nested loops", nested)):
+            print(label)
+            for name, render in rows:
+                print(f"  {name:18} {best_time(lambda: render(ast)):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# Scaling benchmark: lex and parse generated programs from 1 KB to 100 MB and
+# report throughput, peak memory and how time grows with input size. With a
+# baseline, exit with status 1 when throughput or memory regressed by more than
+# the threshold.
+# Run from the repository root, e.g.
+#   python -m benchmarks.scaling --max-size 10MB --save-baseline baseline.json
+#   python -m benchmarks.scaling --max-size 10MB --baseline baseline.json --threshold 0.2
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+from typing import Optional
+
+from generator import ProgramGenerator, parse_size
+from instrumentation import Instrumentation
+from lexical import LexicalAnalyzer
+from sourcemap import open_source
+from syntax import Parser
+
+SIZES = ["1KB", "10KB", "100KB", "1MB", "10MB", "100MB"]
+PHASES = ("lex", "parse", "lex+parse")
+
+# Sizes below this are dominated by fixed costs and left out of the scaling
+# fit and of the regression gate
+FIT_MIN_SIZE = 64 * 1024
+
+# Largest size whose tokens are kept in a list to time parsing on its own;
+# above it the list would take gigabytes, and parse time is taken as the
+# difference between lex+parse and lex, which is long enough to be stable
+PRELEX_MAX_SIZE = 10 * 1024**2
+
+
+def lex(path: str, engine: str) -> int:
+    count = 0
+    with open_source(path) as file:
+        for _ in LexicalAnalyzer(engine=engine).iter_tokens(file):
+            count += 1
+    return count
+
+
+def lex_to_list(path: str, engine: str) -> list:
+    with open_source(path) as file:
+        return list(LexicalAnalyzer(engine=engine).iter_tokens(file))
+
+
+def parse(tokens: list) -> int:
+    count = 0
+    for _ in Parser(tokens).parse_program_iter():
+        count += 1
+    return count
+
+
+def lex_and_parse(path: str, engine: str) -> int:
+    count = 0
+    with open_source(path) as file:
+        parser = Parser(LexicalAnalyzer(engine=engine).iter_tokens(file))
+        for _ in parser.parse_program_iter():
+            count += 1
+    return count
+
+
+# Time (best of `repeat`) and optionally trace the peak memory of lexing, of
+# parsing a pre-lexed token list, and of the streamed pipeline on one file.
+# Above PRELEX_MAX_SIZE, parsing is timed as lex+parse minus lex.
+def measure(path: str, engine: str, repeat: int, memory: bool) -> dict:
+    size = os.path.getsize(path)
+    token_list = lex_to_list(path, engine) if size <= PRELEX_MAX_SIZE else None
+    best = {}
+    for _ in range(repeat):
+        instrumentation = Instrumentation()
+        with instrumentation.phase("lex"):
+            tokens = lex(path, engine)
+        if token_list is not None:
+            with instrumentation.phase("parse"):
+                parse(token_list)
+        with instrumentation.phase("lex+parse"):
+            statements = lex_and_parse(path, engine)
+        for name, phase in instrumentation.phases.items():
+            best[name] = min(best.get(name, math.inf), phase["wall_seconds"])
+    if token_list is None:
+        best["parse"] = max(best["lex+parse"] - best["lex"], 1e-9)
+    del token_list
+
+    results = {}
+    for name in PHASES:
+        seconds = best[name]
+        results[name] = {
+            "seconds": seconds,
+            "mb_per_second": size / seconds / 1024**2,
+            "tokens_per_second": tokens / seconds,
+        }
+    results["tokens"] = tokens
+    results["statements"] = statements
+
+    if memory:
+        instrumentation = Instrumentation(memory=True)
+        with instrumentation.phase("lex"):
+            lex(path, engine)
+        with instrumentation.phase("lex+parse"):
+            lex_and_parse(path, engine)
+        instrumentation.close()
+        for name, phase in instrumentation.phases.items():
+            results[name]["peak_memory_bytes"] = phase["peak_memory_bytes"]
+    return results
+
+
+# Least-squares slope of log(time) against log(size): about 1.0 means linear.
+# None when there are fewer than two distinct sizes to fit.
+def scaling_exponent(points) -> Optional[float]:
+    points = [(math.log(size), math.log(seconds)) for size, seconds in points]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if not variance:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+# Regressions of `report` against `baseline` beyond the relative threshold
+def compare(report: dict, baseline: dict, threshold: float) -> list:
+    regressions = []
+    for size, phases in report["results"].items():
+        if parse_size(size) < FIT_MIN_SIZE:
+            continue  # Too short to time reliably
+        for name in PHASES:
+            current = phases[name]
+            previous = baseline.get("results", {}).get(size, {}).get(name)
+            if previous is None:
+                continue
+            if current["mb_per_second"] < previous["mb_per_second"] * (1 - threshold):
+                regressions.append(
+                    f"{name} @ {size}: {current['mb_per_second']:.2f} MB/s, "
+                    f"baseline {previous['mb_per_second']:.2f} MB/s"
+                )
+            if "peak_memory_bytes" in current and "peak_memory_bytes" in previous:
+                if current["peak_memory_bytes"] > previous["peak_memory_bytes"] * (1 + threshold):
+                    regressions.append(
+                        f"{name} @ {size}: peak {current['peak_memory_bytes']:,} bytes, "
+                        f"baseline {previous['peak_memory_bytes']:,} bytes"
+                    )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lexer/parser scaling benchmark.")
+    parser.add_argument("--max-size", type=parse_size, default=parse_size("100MB"))
+    parser.add_argument("--sizes", nargs="+", default=SIZES, help="input sizes to sweep")
+    parser.add_argument("--engine", choices=LexicalAnalyzer.ENGINES, default="regex")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per size up to 1MB")
+    parser.add_argument(
+        "--memory-limit",
+        type=parse_size,
+        default=parse_size("10MB"),
+        help="trace peak memory for sizes up to this (tracemalloc is slow)",
+    )
+    parser.add_argument("--output", default=None, help="write the JSON report here")
+    parser.add_argument("--baseline", default=None, help="JSON report to compare against")
+    parser.add_argument("--save-baseline", default=None, help="store this run as a baseline")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="allowed relative regression (0.2 = 20%%)"
+    )
+    args = parser.parse_args(argv)
+
+    sizes = sorted(
+        (size for size in args.sizes if parse_size(size) <= args.max_size), key=parse_size
+    )
+    report = {"engine": args.engine, "seed": args.seed, "results": {}}
+
+    columns = " ".join(f"{name + ' MB/s':>15}" for name in PHASES)
+    print(f"{'size':>7} {'tokens':>12} {columns} {'peak memory':>14}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = os.path.join(directory, f"program-{size}.txt")
+            with open(path, "w") as file:
+                ProgramGenerator(seed=args.seed).write(file, parse_size(size))
+            repeat = args.repeat if parse_size(size) <= 1024**2 else 1
+            memory = parse_size(size) <= args.memory_limit
+            results = measure(path, args.engine, repeat, memory)
+            report["results"][size] = results
+            os.remove(path)
+
+            peak = results["lex+parse"].get("peak_memory_bytes")
+            print(
+                f"{size:>7} {results['tokens']:>12,} "
+                + " ".join(f"{results[name]['mb_per_second']:>15.2f}" for name in PHASES)
+                + (f" {peak:>14,}" if peak is not None else f" {'-':>14}")
+            )
+
+    report["scaling"] = {
+        name: scaling_exponent(
+            (parse_size(size), results[name]["seconds"])
+            for size, results in report["results"].items()
+            if parse_size(size) >= FIT_MIN_SIZE
+        )
+        for name in PHASES
+    }
+    for name, exponent in report["scaling"].items():
+        if exponent is None:
+            print(f"{name}: too few sizes of {FIT_MIN_SIZE // 1024}KB or more to fit a scaling exponent")
+        else:
+            print(f"{name}: time grows as size^{exponent:.2f}")
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as file:
+                json.dump(report, file, indent=2)
+                file.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(report, json.load(file), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+# Measure what each AST output backend adds to startup: the import time of
+# the compiler with no backend loaded (the headless path) and with each
+# backend loaded, from `python -X importtime` in a fresh interpreter, plus the
+# wall-clock time of that interpreter.
+# Run from the repository root: python -m benchmarks.startup [repeat]
+import subprocess
+import sys
+import time
+
+from backends import BACKENDS
+
+HEADLESS = "import main"
+
+
+# Total microseconds of the top-level imports `python -X importtime -c code` reports
+def import_microseconds(code: str) -> int:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not name[1:].startswith(" "):  # Top level: no indentation after the bar
+            total += int(cumulative)
+    return total
+
+
+def wall_seconds(code: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    cases = [("headless (no backend)", HEADLESS)]
+    for name in BACKENDS:
+        cases.append((f"backend '{name}'", f"{HEADLESS}; import backends; backends.load_backend({name!r})"))
+
+    headless = None
+    for label, code in cases:
+        import_microseconds(code)  # Write the .pyc files before timing
+        imports = min(import_microseconds(code) for _ in range(repeat)) / 1000
+        wall = min(wall_seconds(code) for _ in range(repeat))
+        if headless is None:
+            headless = imports
+        print(
+            f"{label:<24} imports {imports:8.1f} ms ({imports - headless:+7.1f} ms), "
+            f"interpreter {wall * 1000:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
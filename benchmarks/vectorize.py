@@ -0,0 +1,79 @@
+# Time element-wise Given loops over million-element sequences run one
+# iteration at a time and as batched NumPy array operations, over a range
+# literal, over a list of ints and over a list of floats, with and without a
+# print in the body. The lists are built by doubling a 1,000-item literal so
+# that lexing and parsing a million literals is not part of the setup.
+# Run from the repository root: python -m benchmarks.vectorize [doublings]
+import io
+import sys
+
+from interpreter import Interpreter
+from lexical import LexicalAnalyzer
+from symbols import SymbolTable
+from syntax import Parser
+from benchmarks.common import best_time
+
+SETUP = """pls scale = 3 thanks~
+pls ints = [{ints}] thanks~
+pls floats = [{floats}] thanks~
+pls n = 0 thanks~
+During (n < {doublings}) {{
+    pls ints = ints + ints thanks~
+    pls floats = floats + floats thanks~
+    pls n = n + 1 thanks~
+}}
+"""
+
+ARITHMETIC = """Given x in {sequence} {{
+    pls y = x * x + scale thanks~
+    pls z = y / 2 - x * scale thanks~
+    pls big = z > 1000 thanks~
+}}
+"""
+
+PRINTING = """Given x in {sequence} {{
+    pls y = x * scale - 1 thanks~
+    show(y) thanks~
+}}
+"""
+
+
+def parse(source: str) -> list:
+    symbols = SymbolTable()
+    tokens = LexicalAnalyzer(source, symbols=symbols, engine="regex").tokenize()
+    return Parser(tokens, None, symbols).parse_program()
+
+
+def main():
+    doublings = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    items = 1000 * 2**doublings
+    setup = SETUP.format(
+        ints=", ".join(str(i) for i in range(1000)),
+        floats=", ".join(f"{i}.25" for i in range(1000)),
+        doublings=doublings,
+    )
+    cases = []
+    for label, sequence in (("range", f"[0 : {items}]"), ("int list", "ints"), ("float list", "floats")):
+        cases.append((label, ARITHMETIC.format(sequence=sequence)))
+        cases.append((f"{label} + show", PRINTING.format(sequence=sequence)))
+
+    for label, body in cases:
+        statements = parse(setup + body)
+        results = {}
+
+        def run(vectorize):
+            output = io.StringIO()
+            variables = Interpreter(output, vectorize=vectorize).run(statements)
+            results[vectorize] = (output.getvalue(), variables)
+
+        scalar = best_time(lambda: run(False))
+        batched = best_time(lambda: run(True))
+        assert results[False] == results[True], f"{label}: batched run differs from scalar"
+        print(
+            f"{label:>17}: {items:,} items, scalar {scalar:.3f}s, "
+            f"batched {batched:.3f}s ({scalar / batched:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
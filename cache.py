@@ -0,0 +1,300 @@
+import hashlib
+import marshal
+import os
+import time
+from array import array
+from typing import List, Optional, Tuple
+
+import grammar
+import lexical
+import syntax
+from diagnostics import Diagnostic, Diagnostics
+from hashcons import PLAIN_CLASSES
+from lexical import LexicalAnalyzer, Token, TokenType
+from sourcemap import decode_source
+from symbols import SymbolTable
+
+# Bump when the on-disk entry layout changes
+CACHE_FORMAT = 6
+
+
+# Version stamp of the lexer/parser: a hash of their source files and of the
+# grammar file, so any change to the grammar or to the tree they build
+# invalidates existing entries
+def grammar_version() -> str:
+    digest = hashlib.sha256(str(CACHE_FORMAT).encode())
+    for path in (lexical.__file__, grammar.__file__, grammar.GRAMMAR_PATH, syntax.__file__):
+        with open(path, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()[:16]
+
+
+GRAMMAR_VERSION = grammar_version()
+
+TOKEN_TYPES = list(TokenType)  # Type code -> TokenType
+TOKEN_CODES = {token_type: code for code, token_type in enumerate(TOKEN_TYPES)}
+
+
+# Encode tokens as (type codes, values, start offsets); equal values are stored once
+def encode_tokens(tokens: List[Token]):
+    shared = {}
+    codes = array("B", [TOKEN_CODES[token.type] for token in tokens]).tobytes()
+    values = tuple(shared.setdefault(token.value, token.value) for token in tokens)
+    starts = array("Q", [token.start for token in tokens]).tobytes()
+    return codes, values, starts
+
+
+# Symbol IDs are per session, so identifiers are interned again into `symbols`
+def decode_tokens(encoded, symbols: SymbolTable) -> List[Token]:
+    codes, values, encoded_starts = encoded
+    starts = array("Q")
+    starts.frombytes(encoded_starts)
+    identifier = TOKEN_CODES[TokenType.IDENTIFIER]
+    intern = symbols.intern
+    return [
+        Token(
+            TOKEN_TYPES[code], value, start, intern(value) if code == identifier else None
+        )
+        for code, value, start in zip(codes, values, starts)
+    ]
+
+
+# Encode top-level statements as flat preorder columns: class names, node
+# types, values and child counts. Keeping them flat avoids both Python recursion
+# and marshal's nesting limit on deep trees, and loads faster than nested tuples.
+# Token values become (code, value, start). Symbol IDs are not stored: decode_ast
+# interns the names of Identifier nodes into the session's table.
+def encode_ast(statements) -> tuple:
+    class_names, types, values, child_counts = [], [], [], array("I")
+    stack = list(reversed(statements))
+    while stack:
+        node = stack.pop()
+        value = node.value
+        if isinstance(value, Token):
+            value = (TOKEN_CODES[value.type], value.value, value.start)
+        cls = type(node)
+        class_names.append(PLAIN_CLASSES.get(cls, cls).__name__)
+        types.append(node.type)
+        values.append(value)
+        child_counts.append(len(node.children))
+        stack.extend(reversed(node.children))
+    return (
+        len(statements),
+        tuple(class_names),
+        tuple(types),
+        tuple(values),
+        child_counts.tobytes(),
+    )
+
+
+def encode_diagnostics(diagnostics: Diagnostics) -> tuple:
+    return tuple(
+        (item.phase, item.message, item.offset, item.token_index) for item in diagnostics
+    )
+
+
+def decode_diagnostics(encoded) -> Diagnostics:
+    diagnostics = Diagnostics()
+    diagnostics.extend(Diagnostic(*item) for item in encoded)
+    return diagnostics
+
+
+def decode_ast(encoded, symbols: SymbolTable) -> list:
+    count, class_names, types, values, child_counts = encoded
+    classes = {name: getattr(syntax, name) for name in set(class_names)}
+    counts = array("I")
+    counts.frombytes(child_counts)
+
+    statements = []
+    pending = [[statements, count]]  # [children list, children still to fill]
+    for class_name, type_, value, child_count in zip(class_names, types, values, counts):
+        if isinstance(value, tuple):
+            value = Token(TOKEN_TYPES[value[0]], value[1], value[2])
+        cls = classes[class_name]
+        node = cls.__new__(cls)
+        node.type = type_
+        node.value = value
+        if cls is syntax.IdentifierNode:
+            node.symbol = symbols.intern(value)
+
+        parent = pending[-1]
+        parent[0].append(node)
+        parent[1] -= 1
+        if not parent[1]:
+            pending.pop()
+        if child_count:
+            node.children = []
+            pending.append([node.children, child_count])
+        else:
+            node.children = syntax.NO_CHILDREN
+    return statements
+
+
+# Persistent compilation cache. Entries are keyed by a hash of the source bytes
+# and GRAMMAR_VERSION and hold the token stream, AST and diagnostics in marshal
+# format.
+# When the directory grows past max_bytes, least recently used entries
+# (oldest modification time, refreshed on every hit) are evicted.
+# Several processes may share the directory (batch.py -j N), each knowing
+# only the entries it wrote since it last scanned it, so each one rescans
+# the directory whenever it has written another 1/RESCAN_FRACTION of
+# max_bytes, and evicts from what it finds. Entries of other processes can
+# push the directory past max_bytes by at most that much per writer, until
+# the next rescan.
+class CompilationCache:
+    SUFFIX = ".polite-cache"
+    RESCAN_FRACTION = 16
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.entries = None  # key -> (size, mtime), scanned on the first write
+        self.unscanned = 0  # Bytes written since the directory was last scanned
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, source: bytes) -> str:
+        return hashlib.sha256(GRAMMAR_VERSION.encode() + source).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    # Return (tokens, ast, diagnostics) for the source, or None on a miss.
+    # Identifiers get their symbol IDs from `symbols` (a new table by default).
+    def get(
+        self, source: bytes, symbols: Optional[SymbolTable] = None
+    ) -> Optional[Tuple[List[Token], list, Diagnostics]]:
+        entry = self.load(self.key(source), marshal.loads)
+        if entry is None:
+            return None
+        symbols = symbols if symbols is not None else SymbolTable()
+        tokens, ast, diagnostics = entry
+        return (
+            decode_tokens(tokens, symbols),
+            decode_ast(ast, symbols),
+            decode_diagnostics(diagnostics),
+        )
+
+    def put(self, source: bytes, tokens: List[Token], ast: list, diagnostics=()):
+        data = marshal.dumps(
+            (encode_tokens(tokens), encode_ast(ast), encode_diagnostics(diagnostics))
+        )
+        self.store(self.key(source), data)
+
+    # Read and decode the entry for a key, counting the hit or miss
+    def load(self, key: str, decode):
+        path = self.path(key)
+        try:
+            with open(path, "rb") as file:
+                value = decode(file.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            pass  # Evicted by another process since it was read
+        if self.entries is not None and key in self.entries:
+            self.entries[key] = (self.entries[key][0], time.time())
+        return value
+
+    # Write the encoded entry for a key, then evict down to max_bytes
+    def store(self, key: str, data: bytes):
+        path = self.path(key)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(data)
+        os.replace(temporary, path)  # Readers never see a partial entry
+
+        self.unscanned += len(data)
+        if self.unscanned * self.RESCAN_FRACTION >= self.max_bytes:
+            self.entries = None  # See the entries other processes wrote meanwhile
+        self.scan()
+        self.entries[key] = (len(data), time.time())
+        self.evict()
+
+    # Return cached (tokens, ast, diagnostics), lexing and parsing on a miss.
+    # The parser recovers from syntax errors, so sources with errors are cached
+    # too, together with every diagnostic and the statements that did parse.
+    def compile(self, source: bytes, engine: str = "regex", symbols: Optional[SymbolTable] = None):
+        symbols = symbols if symbols is not None else SymbolTable()
+        cached = self.get(source, symbols)
+        if cached is not None:
+            return cached
+        diagnostics = Diagnostics()
+        lexer = LexicalAnalyzer(
+            decode_source(source), engine=engine, diagnostics=diagnostics, symbols=symbols
+        )
+        tokens = []
+
+        # Stream the tokens into the parser, as uncached compiles do, so
+        # lexical and syntax errors are reported in the same order
+        def record(stream):
+            for token in stream:
+                tokens.append(token)
+                yield token
+
+        ast = syntax.Parser(record(lexer.iter_tokens()), diagnostics, symbols).parse_program()
+        self.put(source, tokens, ast, diagnostics)
+        return tokens, ast, diagnostics
+
+    # Remove the entry for one source, or every entry when source is None
+    def invalidate(self, source: Optional[bytes] = None):
+        if source is None:
+            self.entries = None  # Include the entries of other processes
+        self.scan()
+        keys = list(self.entries) if source is None else [self.key(source)]
+        for key in keys:
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+            self.entries.pop(key, None)
+
+    def clear(self):
+        self.invalidate()
+
+    def scan(self):
+        if self.entries is not None:
+            return
+        self.entries = {}
+        self.unscanned = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.SUFFIX):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # Evicted by another process during the scan
+                key = entry.name[: -len(self.SUFFIX)]
+                self.entries[key] = (stat.st_size, stat.st_mtime)
+
+    def evict(self):
+        total = sum(size for size, _ in self.entries.values())
+        if total <= self.max_bytes:
+            return
+        for key in sorted(self.entries, key=lambda key: self.entries[key][1]):
+            if total <= self.max_bytes:
+                break
+            size, _ = self.entries.pop(key)
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        self.entries = None  # Include the entries of other processes
+        self.scan()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": sum(size for size, _ in self.entries.values()),
+        }
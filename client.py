@@ -0,0 +1,195 @@
+import argparse
+import json
+import marshal
+import os
+import socket
+import subprocess
+import sys
+import time
+from array import array
+from typing import List
+
+from protocol import DEFAULT_SOCKET, ProtocolError, recv_frame, send_frame
+
+# Thin command-line client of the compile daemon (daemon.py). It imports only
+# the stdlib and protocol.py; lexing and parsing happen in the warm daemon,
+# which is started in the background when none is listening yet.
+
+DAEMON = os.path.join(os.path.dirname(os.path.abspath(__file__)), "daemon.py")
+
+# Seconds to wait for a freshly started daemon to accept connections
+START_TIMEOUT = 10.0
+
+
+class ClientError(Exception):
+    pass
+
+
+# Connect to the daemon, starting one in the background when none is listening
+def connect(socket_path: str = DEFAULT_SOCKET, start: bool = True) -> socket.socket:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        return sock
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        if not start:
+            raise ClientError(f"No daemon is listening on {socket_path}") from None
+
+    subprocess.Popen(
+        [sys.executable, DAEMON, "--socket", socket_path],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,  # Keep running after this client exits
+    )
+    deadline = time.monotonic() + START_TIMEOUT
+    while True:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(socket_path)
+            return sock
+        except (FileNotFoundError, ConnectionRefusedError):
+            sock.close()
+            if time.monotonic() > deadline:
+                raise ClientError(f"The daemon did not start on {socket_path}") from None
+            time.sleep(0.02)
+
+
+# Send every request over one connection without waiting, then collect the
+# responses (which may arrive in any order) and return them in request order
+def request_all(
+    requests: List[dict], socket_path: str = DEFAULT_SOCKET, start: bool = True
+) -> List[dict]:
+    responses = [None] * len(requests)
+    with connect(socket_path, start) as sock:
+        for index, request in enumerate(requests):
+            send_frame(sock, json.dumps({**request, "id": index}).encode())
+        for _ in requests:
+            response = marshal.loads(recv_frame(sock))
+            if response.get("id") is None:
+                raise ClientError(response.get("error", "Malformed response"))
+            responses[response["id"]] = response
+    return responses
+
+
+def request(payload: dict, socket_path: str = DEFAULT_SOCKET, start: bool = True) -> dict:
+    return request_all([payload], socket_path, start)[0]
+
+
+# Print the token columns of a response as main.py lists tokens
+def print_tokens(response: dict):
+    codes, values, _ = response["tokens"]
+    names = response["token_types"]
+    print("Tokens generated by the lexical analyzer:")
+    print("\n".join(f"Type: {names[code]}, Value: {value}" for code, value in zip(codes, values)))
+
+
+# Print the flat preorder AST columns of a response as the indented text tree
+# of Parser.display_ast, a blank line after each top-level statement
+def print_ast(encoded):
+    _, _, types, values, encoded_counts = encoded
+    counts = array("I")
+    counts.frombytes(encoded_counts)
+    lines = ["Abstract Syntax Tree (AST):"]
+    remaining = []  # Children still to print at each open level
+    for type_, value, count in zip(types, values, counts):
+        if isinstance(value, tuple):  # Encoded Token: (type code, value, start)
+            value = value[1]
+        indent = "\t" * len(remaining)
+        lines.append(f"{indent}{type_}({value if value else ''})")
+        if count:
+            remaining.append(count)
+            continue
+        while remaining:
+            remaining[-1] -= 1
+            if remaining[-1]:
+                break
+            remaining.pop()
+        else:
+            lines.append("")  # End of a top-level statement
+    print("\n".join(lines))
+
+
+def print_result(path: str, response: dict, show_tokens: bool, show_ast: bool, quiet: bool):
+    if not response.get("ok") and "error" in response:
+        print(f"ERROR {path}: {response['error']}")
+        return
+    messages = response["messages"]
+    if quiet:
+        if messages:
+            print(f"ERROR {path}:" if response["errors"] else f"WARN  {path}:")
+            for _, message in messages:
+                print(f"    {message}")
+        return
+
+    print(f"\nCompiling '{path}'...\n")
+    for phase, message in messages:
+        if phase == "lexical":
+            print(message)
+    if show_tokens:
+        print_tokens(response)
+    print("\n--- Syntax Analysis ---\n")
+    syntax_messages = [message for phase, message in messages if phase == "syntax"]
+    if syntax_messages:
+        print(f"Syntax Error: {len(syntax_messages)} error(s) found")
+        print("\n".join(syntax_messages))
+    elif show_ast:
+        print_ast(response["ast"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compile PoliteLang files through the warm compile daemon."
+    )
+    parser.add_argument("files", nargs="*", help="source files to compile ('-' reads stdin)")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="daemon socket path")
+    parser.add_argument("--engine", default="regex", help="lexer engine")
+    parser.add_argument("--tokens", action="store_true", help="print only the tokens")
+    parser.add_argument("--ast", action="store_true", help="print only the AST")
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="only print files with diagnostics"
+    )
+    parser.add_argument(
+        "--no-start", action="store_true", help="fail instead of starting a daemon"
+    )
+    parser.add_argument("--stats", action="store_true", help="print the daemon's counters")
+    parser.add_argument("--shutdown", action="store_true", help="stop the daemon")
+    args = parser.parse_args(argv)
+
+    show_tokens = args.tokens or not args.ast
+    show_ast = args.ast or not args.tokens
+    include = []
+    if not args.quiet:
+        include = [name for name, shown in (("tokens", show_tokens), ("ast", show_ast)) if shown]
+    requests = []
+    for path in args.files:
+        if path == "-":
+            requests.append({"source": sys.stdin.read(), "engine": args.engine, "include": include})
+        else:
+            requests.append({"path": os.path.abspath(path), "engine": args.engine, "include": include})
+    if args.stats:
+        requests.append({"op": "stats"})
+    if args.shutdown:
+        requests.append({"op": "shutdown"})
+    if not requests:
+        parser.error("nothing to do: give files, --stats or --shutdown")
+
+    try:
+        responses = request_all(requests, args.socket, start=not (args.no_start or args.shutdown))
+    except (ClientError, ProtocolError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    failed = False
+    for path, response in zip(args.files, responses):
+        print_result(path, response, show_tokens, show_ast, args.quiet)
+        failed = failed or not response.get("ok")
+    if args.stats:
+        stats = responses[len(args.files)]
+        print(", ".join(f"{key}: {value}" for key, value in stats.items() if key not in ("id", "ok")))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
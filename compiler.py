@@ -0,0 +1,317 @@
+import argparse
+import ast
+import hashlib
+import importlib.util
+import marshal
+import sys
+from types import CodeType
+from typing import List, Optional
+
+import interpreter
+import optimizer
+from cache import GRAMMAR_VERSION, CompilationCache
+from interpreter import InterpreterError, OutputBuffer, format_value, literal_value
+from diagnostics import Diagnostics
+from lexical import LexicalAnalyzer
+from sourcemap import SourceMap, decode_source
+from symbols import SymbolTable
+from syntax import ASTNode, Parser, SyntaxError, raise_for_errors
+
+# Name of the generated function holding the whole program
+ENTRY_POINT = "__polite_main__"
+
+# Skeleton of every generated module. The program body replaces the `pass`;
+# the function returns the assigned variables by PoliteLang name, like
+# Interpreter.run. __polite_names__ maps Python names back to PoliteLang names.
+MODULE_TEMPLATE = f"""
+__polite_names__ = {{}}
+def {ENTRY_POINT}(write, format):
+    pass
+    return {{
+        __polite_names__[name]: value
+        for name, value in locals().items()
+        if name in __polite_names__
+    }}
+"""
+
+# Python AST operator node for each PoliteLang binary operator
+ARITHMETIC_OPERATORS = {"+": ast.Add, "-": ast.Sub, "*": ast.Mult, "/": ast.Div}
+COMPARISON_OPERATORS = {
+    "<": ast.Lt,
+    ">": ast.Gt,
+    "<=": ast.LtE,
+    ">=": ast.GtE,
+    "==": ast.Eq,
+    "!=": ast.NotEq,
+}
+
+
+# Python variable name for a PoliteLang identifier
+def python_name(name: str) -> str:
+    mangled = "v_" + name
+    if mangled.isidentifier():
+        return mangled
+    return "x_" + name.encode("utf-8").hex()  # e.g. identifiers with superscript digits
+
+
+# Lowers PoliteLang statements to a Python module defining
+#   def __polite_main__(write, format): ...
+# where every PoliteLang variable is a local of the generated function:
+# Check/otherwise become if/else, During becomes while and Given becomes for.
+class PythonCompiler:
+    def __init__(self):
+        self.names = {}  # Python name -> PoliteLang name
+        self.statement_lowerers = {
+            "Assignment": self.lower_assignment,
+            "ShowPrint": self.lower_print,
+            "WhisperPrint": self.lower_print,
+            "ShoutPrint": self.lower_print,
+            "If": self.lower_if,
+            "While": self.lower_while,
+            "ForEach": self.lower_for,
+        }
+
+    def lower(self, statements: List[ASTNode]) -> ast.Module:
+        module = ast.parse(MODULE_TEMPLATE)
+        names, function = module.body
+        function.body[:-1] = self.lower_block(statements)
+        # Variables are collected while lowering, fill the name table afterwards
+        names.value = ast.Dict(
+            keys=[ast.Constant(key) for key in self.names],
+            values=[ast.Constant(value) for value in self.names.values()],
+        )
+        # Generated nodes get the location of the function. ast.walk does not
+        # recurse, unlike ast.fix_missing_locations, so deep expressions are fine.
+        for node in ast.walk(module):
+            if "lineno" in node._attributes and not hasattr(node, "lineno"):
+                node.lineno = node.end_lineno = function.lineno
+                node.col_offset = node.end_col_offset = 0
+        return module
+
+    # CPython's compiler recurses over the generated AST and rejects one that
+    # is nested too deeply (e.g. a sum of thousands of terms)
+    def compile(self, statements: List[ASTNode], filename: str = "<politelang>") -> CodeType:
+        try:
+            return compile(self.lower(statements), filename, "exec")
+        except (RecursionError, MemoryError):
+            raise InterpreterError("Program nested too deeply to compile to Python") from None
+
+    def name(self, node: ASTNode, context) -> ast.Name:
+        name = node.value
+        mangled = python_name(name)
+        self.names[mangled] = name
+        return ast.Name(mangled, context)
+
+    # Statements
+
+    def lower_block(self, statements) -> list:
+        body = []
+        for statement in statements:
+            lowerer = self.statement_lowerers.get(statement.type)
+            if lowerer is None:
+                raise InterpreterError(f"Cannot execute {statement.type} statement")
+            body.append(lowerer(statement))
+        return body or [ast.Pass()]
+
+    def lower_assignment(self, node: ASTNode):
+        return ast.Assign(
+            targets=[self.name(node.children[0], ast.Store())],
+            value=self.lower_expression(node.children[1]),
+        )
+
+    def lower_print(self, node: ASTNode):
+        text = ast.Call(
+            ast.Name("format", ast.Load()), [self.lower_expression(node.children[0])], []
+        )
+        if node.type == "WhisperPrint":
+            text = ast.Call(ast.Attribute(text, "lower", ast.Load()), [], [])
+        elif node.type == "ShoutPrint":
+            text = ast.Call(ast.Attribute(text, "upper", ast.Load()), [], [])
+        return ast.Expr(ast.Call(ast.Name("write", ast.Load()), [text], []))
+
+    def lower_if(self, node: ASTNode):
+        else_body = []
+        if len(node.children) > 2:
+            else_body = self.lower_block(node.children[2].children)
+        return ast.If(
+            test=self.lower_expression(node.children[0]),
+            body=self.lower_block(node.children[1].children),
+            orelse=else_body,
+        )
+
+    def lower_while(self, node: ASTNode):
+        return ast.While(
+            test=self.lower_expression(node.children[0]),
+            body=self.lower_block(node.children[1].children),
+            orelse=[],
+        )
+
+    def lower_for(self, node: ASTNode):
+        return ast.For(
+            target=self.name(node.children[0], ast.Store()),
+            iter=self.lower_expression(node.children[1]),
+            body=self.lower_block(node.children[2].children),
+            orelse=[],
+        )
+
+    # Expressions
+
+    # Lowered bottom-up with an explicit stack so long expressions don't recurse
+    def lower_expression(self, root: ASTNode):
+        results = []  # Lowered subtrees whose parent is not lowered yet
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            count = len(node.children)
+            if count and not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node.children))
+                continue
+            operands = []
+            if count:
+                operands = results[-count:]
+                del results[-count:]
+            results.append(self.lower_node(node, operands))
+        return results[0]
+
+    # The Python AST of one expression node, given its lowered children
+    def lower_node(self, node: ASTNode, operands: list):
+        if node.type == "Literal":
+            return ast.Constant(literal_value(node.value))
+        if node.type == "String":
+            return ast.Constant(node.value)
+        if node.type == "Boolean":
+            return ast.Constant(node.value == "yep")
+        if node.type == "Identifier":
+            return self.name(node, ast.Load())
+        if node.type == "List":
+            return ast.List(operands, ast.Load())
+        if node.type == "Range":
+            return ast.Call(ast.Name("range", ast.Load()), operands, [])
+        if node.type != "BinaryOperation":
+            raise InterpreterError(f"Cannot evaluate {node.type} expression")
+
+        left, right = operands
+        if node.value in ARITHMETIC_OPERATORS:
+            return ast.BinOp(left, ARITHMETIC_OPERATORS[node.value](), right)
+        if node.value in COMPARISON_OPERATORS:
+            return ast.Compare(left, [COMPARISON_OPERATORS[node.value]()], [right])
+        raise InterpreterError(f"Unsupported operator '{node.value}' in expression")
+
+
+# Run a module code object produced by PythonCompiler.compile and return the
+# final variable values by name
+def run_code(code: CodeType, output=None) -> dict:
+    output = output if isinstance(output, OutputBuffer) else OutputBuffer(output)
+    namespace = {"__builtins__": {"locals": locals, "range": range}}
+    exec(code, namespace)
+    try:
+        return namespace[ENTRY_POINT](output.write_line, format_value)
+    except NameError as e:  # Includes UnboundLocalError
+        raise InterpreterError(f"Variable is used before it is assigned: {e}") from None
+    except (TypeError, ValueError, ZeroDivisionError, OverflowError) as e:
+        raise InterpreterError(str(e)) from None
+    finally:
+        output.flush()
+
+
+# Version stamp of the generated code: the grammar, this lowering (and the
+# literal/format helpers it uses), the optimizer and the running Python's
+# bytecode format
+def backend_version() -> str:
+    digest = hashlib.sha256(GRAMMAR_VERSION.encode() + importlib.util.MAGIC_NUMBER)
+    for module in (interpreter, optimizer, sys.modules[__name__]):
+        with open(module.__file__, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()[:16]
+
+
+BACKEND_VERSION = backend_version()
+
+
+# On-disk cache of compiled code objects in marshal format, keyed by a hash of
+# the source, BACKEND_VERSION and whether the AST was optimized; shares
+# eviction and statistics with CompilationCache
+class CodeCache(CompilationCache):
+    SUFFIX = ".polite-code"
+
+    def key(self, source: bytes, optimize: bool = False) -> str:
+        stamp = BACKEND_VERSION + ("-O" if optimize else "")
+        return hashlib.sha256(stamp.encode() + source).hexdigest()
+
+    def get_code(self, source: bytes, optimize: bool = False) -> Optional[CodeType]:
+        return self.load(self.key(source, optimize), marshal.loads)
+
+    def put_code(self, source: bytes, code: CodeType, optimize: bool = False):
+        self.store(self.key(source, optimize), marshal.dumps(code))
+
+
+# Lex and parse a whole source, reporting every lexical and syntax error, and
+# run the optimizer's default passes over the AST when `optimize` is set
+def parse(source: bytes, optimize: bool = False) -> List[ASTNode]:
+    text = decode_source(source)
+    diagnostics = Diagnostics(SourceMap(text))
+    symbols = SymbolTable()
+    lexer = LexicalAnalyzer(text, engine="regex", diagnostics=diagnostics, symbols=symbols)
+    statements = Parser(lexer.iter_tokens(), diagnostics, symbols).parse_program()
+    raise_for_errors(diagnostics)
+    if optimize:
+        statements = optimizer.PassManager(symbols).run(statements)
+    return statements
+
+
+# Lex, parse and lower a source to a code object, reusing the cached code
+# object when the cache already holds one for this source
+def compile_source(
+    source: bytes,
+    filename: str = "<politelang>",
+    cache: Optional[CodeCache] = None,
+    optimize: bool = False,
+) -> CodeType:
+    if cache is not None:
+        code = cache.get_code(source, optimize)
+        if code is not None:
+            return code
+    code = PythonCompiler().compile(parse(source, optimize), filename)
+    if cache is not None:
+        cache.put_code(source, code, optimize)
+    return code
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compile a PoliteLang program to Python bytecode and run it."
+    )
+    parser.add_argument("program", help="PoliteLang source file")
+    parser.add_argument("--cache-dir", default=None, help="cache compiled code objects here")
+    parser.add_argument(
+        "--show-python", action="store_true", help="print the generated Python instead of running"
+    )
+    parser.add_argument(
+        "-O", "--optimize", action="store_true", help="optimize the AST first (see optimizer.py)"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        with open(args.program, "rb") as file:
+            source = file.read()
+        if args.show_python:
+            module = PythonCompiler().lower(parse(source, args.optimize))
+            try:
+                print(ast.unparse(module))
+            except RecursionError:  # ast.unparse recurses like compile()
+                raise InterpreterError("Program nested too deeply to print as Python") from None
+            return 0
+        cache = CodeCache(args.cache_dir) if args.cache_dir else None
+        run_code(compile_source(source, args.program, cache, args.optimize))
+    except SyntaxError as e:
+        print(f"Syntax Error: {e}")
+        return 1
+    except InterpreterError as e:
+        print(f"Runtime Error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+import argparse
+import asyncio
+import json
+import marshal
+import os
+import signal
+import socket
+import stat
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from cache import TOKEN_TYPES, encode_ast, encode_tokens
+from diagnostics import Diagnostics
+from lexical import LexicalAnalyzer
+from protocol import DEFAULT_SOCKET, HEADER, MAX_FRAME, ProtocolError, frame
+from sourcemap import SourceMap, open_source
+from symbols import SymbolTable
+from syntax import Parser
+
+
+class DaemonError(Exception):
+    pass
+
+
+# Names of the token type codes in compile responses
+TOKEN_TYPE_NAMES = [token_type.value for token_type in TOKEN_TYPES]
+
+
+# Read one frame from an asyncio stream; None when the peer closed cleanly
+async def read_frame(reader: asyncio.StreamReader) -> Optional[bytes]:
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise ProtocolError("Connection closed inside a frame header") from None
+        return None
+    (length,) = HEADER.unpack(header)
+    if length > MAX_FRAME:
+        raise ProtocolError(f"Frame of {length:,} bytes exceeds {MAX_FRAME:,}")
+    try:
+        return await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        raise ProtocolError("Connection closed inside a frame") from None
+
+
+# Run in each worker process once, so the first request does not pay for
+# building the lexer's master pattern
+def warm_up():
+    LexicalAnalyzer.master_pattern()
+
+
+# Types of the optional fields of a compile request
+REQUEST_FIELDS = {"path": str, "source": str, "engine": str, "include": list}
+
+
+# Why a compile request's fields are malformed, or None when they are usable
+def invalid_request(request: dict) -> Optional[str]:
+    for name, expected in REQUEST_FIELDS.items():
+        value = request.get(name)
+        if value is not None and not isinstance(value, expected):
+            return f"Field '{name}' must be a {'string' if expected is str else 'list'}"
+    if not all(isinstance(item, str) for item in request.get("include") or ()):
+        return "Field 'include' must be a list of strings"
+    if request.get("path") is None and request.get("source") is None:
+        return "Request has neither 'path' nor 'source'"
+    return None
+
+
+# Lex and parse one compile request and return the marshal-encoded response.
+# Request fields: "path" (read by the daemon) or "source", optional "engine"
+# and "include" (any of "tokens", "ast"). The response has "ok", the
+# diagnostics as (phase, message) pairs in "messages", the number of syntax
+# errors in "errors", token and statement counts, and the requested
+# encodings: "tokens" as cache.encode_tokens columns with "token_types"
+# naming the type codes, and "ast" as cache.encode_ast columns.
+def compile_request(request: dict) -> bytes:
+    response = {"id": request.get("id")}
+    source = request.get("source")
+    if source is None:
+        try:
+            with open_source(request["path"]) as file:
+                source = file.read()
+        except (OSError, UnicodeDecodeError) as e:
+            response.update(ok=False, error=f"Error reading file: {e}")
+            return marshal.dumps(response)
+
+    diagnostics = Diagnostics(SourceMap(source))
+    symbols = SymbolTable()
+    try:
+        lexer = LexicalAnalyzer(
+            source, engine=request.get("engine", "regex"), diagnostics=diagnostics, symbols=symbols
+        )
+    except ValueError as e:
+        response.update(ok=False, error=str(e))
+        return marshal.dumps(response)
+    tokens = lexer.tokenize()
+    statements = Parser(tokens, diagnostics, symbols).parse_program()
+
+    response.update(
+        ok=not diagnostics,
+        errors=diagnostics.count("syntax"),
+        messages=[(item.phase, item.format(diagnostics.source_map)) for item in diagnostics],
+        token_count=len(tokens),
+        statement_count=len(statements),
+    )
+    include = request.get("include") or ()
+    if "tokens" in include:
+        response["tokens"] = encode_tokens(tokens)
+        response["token_types"] = TOKEN_TYPE_NAMES
+    if "ast" in include:
+        response["ast"] = encode_ast(statements)
+    return marshal.dumps(response)
+
+
+# Long-running compile server on a Unix domain socket. Each connection may
+# send any number of requests without waiting for the answers; every request
+# is handled as its own task and the CPU work runs in a pool of warm worker
+# processes (workers=0 compiles in a thread of this process instead).
+# Responses carry the request's "id" and are written as they complete, so
+# they may arrive out of order.
+# Besides compiling ({"op": "compile", ...}, the default), requests can ask
+# for {"op": "stats"} or {"op": "shutdown"}.
+class CompileServer:
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, workers: Optional[int] = None):
+        self.socket_path = socket_path
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.pool = None
+        self.stopping = None  # asyncio.Event, created on the server's loop
+        self.started = time.time()
+        self.requests = 0
+        self.failures = 0
+        self.active = 0
+        self.connections = 0
+        self.writers = set()  # Open connections, closed on shutdown
+        self.handlers = set()  # Connection tasks, awaited on shutdown
+
+    async def serve(self):
+        self.stopping = asyncio.Event()
+        remove_stale_socket(self.socket_path)
+        if self.workers:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_up)
+        else:
+            warm_up()
+        loop = asyncio.get_running_loop()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_number, self.stopping.set)
+
+        previous_umask = os.umask(0o177)  # The socket is only usable by this user
+        try:
+            server = await asyncio.start_unix_server(self.handle, path=self.socket_path)
+        finally:
+            os.umask(previous_umask)
+        try:
+            async with server:
+                await self.stopping.wait()
+                for writer in list(self.writers):
+                    writer.close()
+                await asyncio.gather(*self.handlers, return_exceptions=True)
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown(cancel_futures=True)
+            try:
+                os.remove(self.socket_path)
+            except FileNotFoundError:
+                pass
+
+    # Read requests from one connection until it closes, answering each as it finishes
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self.writers.add(writer)
+        self.handlers.add(asyncio.current_task())
+        pending = set()
+        try:
+            while True:
+                payload = await read_frame(reader)
+                if payload is None:
+                    break
+                task = asyncio.create_task(self.respond(payload, writer))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        except (ProtocolError, ConnectionError):
+            pass  # The client went away; its unanswered requests are dropped
+        finally:
+            for task in pending:
+                task.cancel()
+            self.writers.discard(writer)
+            self.handlers.discard(asyncio.current_task())
+            writer.close()
+
+    # Answer one request. Errors are reported with the request's id, so a
+    # client pipelining many requests can match them like any other response;
+    # only a request that cannot be decoded gets the id None.
+    async def respond(self, payload: bytes, writer: asyncio.StreamWriter):
+        self.requests += 1
+        self.active += 1
+        request_id = None
+        try:
+            try:
+                request = json.loads(payload)
+            except ValueError as e:
+                raise DaemonError(f"Malformed request: {e}") from None
+            if not isinstance(request, dict):
+                raise DaemonError("Request must be an object")
+            request_id = request.get("id")
+            response = await self.dispatch(request)
+        except Exception as e:  # Report the failure instead of dropping the connection
+            self.failures += 1
+            error = str(e) if isinstance(e, DaemonError) else f"Daemon error: {e}"
+            response = marshal.dumps({"id": request_id, "ok": False, "error": error})
+        finally:
+            self.active -= 1
+        writer.write(frame(response))
+        await writer.drain()
+
+    async def dispatch(self, request: dict) -> bytes:
+        op = request.get("op", "compile")
+        if op == "compile":
+            problem = invalid_request(request)
+            if problem is not None:
+                raise DaemonError(problem)
+            pool = self.pool
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(pool, compile_request, request)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed); replace the pool for later requests
+                if pool is self.pool:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_up)
+                raise DaemonError("A worker process died while compiling this request") from None
+        if op == "stats":
+            return marshal.dumps({"id": request.get("id"), "ok": True, **self.stats()})
+        if op == "shutdown":
+            self.stopping.set()
+            return marshal.dumps({"id": request.get("id"), "ok": True})
+        return marshal.dumps({"id": request.get("id"), "ok": False, "error": f"Unknown op '{op}'"})
+
+    def stats(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "workers": self.workers,
+            "uptime_seconds": time.time() - self.started,
+            "requests": self.requests,
+            "failures": self.failures,
+            "active": self.active,
+            "connections": self.connections,
+        }
+
+
+# Remove a socket file left by a daemon that is no longer running; refuse to
+# start when another daemon still answers on it, or when the path is not a socket
+def remove_stale_socket(path: str):
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise DaemonError(f"{path} exists and is not a socket; not removing it")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.remove(path)
+    else:
+        raise DaemonError(f"A daemon is already listening on {path}")
+    finally:
+        probe.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm PoliteLang compile daemon (Unix socket).")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="socket path to listen on")
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=None,
+        help="worker processes (default: CPU count; 0 compiles in-process)",
+    )
+    args = parser.parse_args(argv)
+
+    server = CompileServer(args.socket, args.workers)
+    try:
+        asyncio.run(server.serve())
+    except DaemonError as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
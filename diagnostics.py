@@ -0,0 +1,87 @@
+import sys
+from typing import Iterator, List, Optional
+
+from sourcemap import SourceMap
+
+
+# One lexical or syntax error. The location is a character offset in the
+# source when the reporter knows it, otherwise the index of the offending token.
+class Diagnostic:
+    __slots__ = ("phase", "message", "offset", "token_index")
+
+    def __init__(
+        self,
+        phase: str,
+        message: str,
+        offset: Optional[int] = None,
+        token_index: Optional[int] = None,
+    ):
+        self.phase = phase  # "lexical" or "syntax"
+        self.message = message
+        self.offset = offset
+        self.token_index = token_index
+
+    # Line and column when a source map is given, otherwise the raw offset
+    def location(self, source_map: Optional[SourceMap] = None) -> str:
+        if self.offset is not None:
+            if source_map is not None:
+                return source_map.location(self.offset)
+            return f"position {self.offset}"
+        if self.token_index is not None:
+            return f"token {self.token_index}"
+        return "unknown location"
+
+    def format(self, source_map: Optional[SourceMap] = None) -> str:
+        return f"Error: {self.message} at {self.location(source_map)}"
+
+    def __str__(self):
+        return self.format()
+
+
+# Collects the diagnostics of every phase of one compilation, so a single pass
+# can report all errors; nothing is printed until emit() is called. With a
+# source map, offsets are shown as line and column; the map is only consulted
+# when diagnostics are formatted.
+class Diagnostics:
+    def __init__(self, source_map: Optional[SourceMap] = None):
+        self.items: List[Diagnostic] = []
+        self.source_map = source_map
+
+    def report(
+        self,
+        phase: str,
+        message: str,
+        offset: Optional[int] = None,
+        token_index: Optional[int] = None,
+    ):
+        self.items.append(Diagnostic(phase, message, offset, token_index))
+
+    def extend(self, diagnostics: Iterator[Diagnostic]):
+        self.items.extend(diagnostics)
+
+    def count(self, phase: Optional[str] = None) -> int:
+        if phase is None:
+            return len(self.items)
+        return sum(1 for diagnostic in self.items if diagnostic.phase == phase)
+
+    def messages(self) -> List[str]:
+        return [diagnostic.format(self.source_map) for diagnostic in self.items]
+
+    # Write every diagnostic to the stream in a single call
+    def emit(self, stream=None):
+        if self.items:
+            stream = stream if stream is not None else sys.stdout
+            stream.write("".join(message + "\n" for message in self.messages()))
+            stream.flush()
+
+    def clear(self):
+        self.items.clear()
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+    def __iter__(self) -> Iterator[Diagnostic]:
+        return iter(self.items)
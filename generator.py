@@ -0,0 +1,198 @@
+import argparse
+import random
+import sys
+from typing import Iterator, List, Optional
+
+# Operators that may join two operands of a generated expression
+EXPRESSION_OPERATORS = ["+", "-", "*", "/", "<", ">", "<=", ">=", "==", "!="]
+PRINT_KEYWORDS = ["show", "whisper", "shout"]
+WORDS = ["hello", "polite", "thank you", "kind regards", "have a nice day", "please"]
+
+# Ways a statement is broken when an invalid program is requested. Unterminated
+# strings are left out: they would swallow the rest of the file.
+MUTATIONS = [
+    "missing_end",  # pls x = 1          (no thanks~)
+    "illegal_identifier",  # pls 1x = 1 thanks~
+    "unknown_symbol",  # pls x = 1 @ 2 thanks~
+    "unbalanced_parenthesis",  # show((x) thanks~
+    "missing_operand",  # pls x = 1 + thanks~
+    "stray_brace",  # } on its own
+]
+
+
+# Seeded generator of PoliteLang programs for benchmarks and fuzzing. The same
+# seed and settings always produce the same program.
+#   max_depth           deepest nesting of Check/During/Given blocks
+#   expression_terms    most operands in one expression
+#   string_density      chance that an operand or printed value is a string literal
+#   comment_density     chance of a comment line before a statement
+#   error_rate          chance that a statement is deliberately broken
+#   block_statements    most statements in one block
+class ProgramGenerator:
+    def __init__(
+        self,
+        seed: int = 0,
+        max_depth: int = 3,
+        expression_terms: int = 6,
+        string_density: float = 0.1,
+        comment_density: float = 0.1,
+        error_rate: float = 0.0,
+        block_statements: int = 4,
+        variables: int = 32,
+    ):
+        self.random = random.Random(seed)
+        self.max_depth = max_depth
+        self.expression_terms = max(1, expression_terms)
+        self.string_density = string_density
+        self.comment_density = comment_density
+        self.error_rate = error_rate
+        self.block_statements = max(1, block_statements)
+        self.variables = [f"v{index}" for index in range(variables)] + ["score", "total", "i"]
+        self.errors = 0  # Statements broken so far
+
+    # Yield program text in pieces of about chunk_size characters until `size`
+    # characters have been produced; only whole top-level statements are emitted
+    def chunks(self, size: int, chunk_size: int = 64 * 1024) -> Iterator[str]:
+        produced = 0
+        while produced < size:
+            pieces: List[str] = []
+            length = 0
+            while length < chunk_size and produced + length < size:
+                statement = self.statement(0)
+                pieces.append(statement)
+                length += len(statement)
+            produced += length
+            yield "".join(pieces)
+
+    def program(self, size: int) -> str:
+        return "".join(self.chunks(size))
+
+    def write(self, stream, size: int):
+        for chunk in self.chunks(size):
+            stream.write(chunk)
+
+    # One statement with its comment and nested blocks, as lines indented to `depth`
+    def statement(self, depth: int) -> str:
+        rng = self.random
+        indent = "    " * depth
+        text = ""
+        if rng.random() < self.comment_density:
+            text += f"{indent}:) {rng.choice(WORDS)}\n"
+        if rng.random() < self.error_rate:
+            self.errors += 1
+            return text + indent + self.broken_statement() + "\n"
+
+        roll = rng.random()
+        if depth < self.max_depth and roll < 0.3:
+            return text + self.block_statement(depth)
+        if roll < 0.65:
+            return text + f"{indent}pls {self.variable()} = {self.expression()} thanks~\n"
+        keyword = rng.choice(PRINT_KEYWORDS)
+        return text + f"{indent}{keyword}({self.expression()}) thanks~\n"
+
+    def block_statement(self, depth: int) -> str:
+        rng = self.random
+        indent = "    " * depth
+        kind = rng.choice(("Check", "During", "Given"))
+        if kind == "Given":
+            header = f"Given {self.variable()} in {self.expression()} {{\n"
+        else:
+            header = f"{kind} ({self.expression()}) {{\n"
+        text = indent + header + self.block(depth + 1) + indent + "}"
+        if kind == "Check" and rng.random() < 0.5:
+            text += " otherwise {\n" + self.block(depth + 1) + indent + "}"
+        return text + "\n"
+
+    def block(self, depth: int) -> str:
+        count = self.random.randint(1, self.block_statements)
+        return "".join(self.statement(depth) for _ in range(count))
+
+    def expression(self) -> str:
+        rng = self.random
+        terms = rng.randint(1, self.expression_terms)
+        parts = [self.operand()]
+        for _ in range(terms - 1):
+            parts.append(rng.choice(EXPRESSION_OPERATORS))
+            parts.append(self.operand())
+        if terms > 2 and rng.random() < 0.3:
+            # Group a random operator's operands in parentheses
+            position = rng.randrange(0, len(parts) - 2, 2)
+            parts[position] = "(" + parts[position]
+            parts[position + 2] += ")"
+        return " ".join(parts)
+
+    def operand(self) -> str:
+        rng = self.random
+        if rng.random() < self.string_density:
+            return f'"{rng.choice(WORDS)}"'
+        roll = rng.random()
+        if roll < 0.45:
+            return self.variable()
+        if roll < 0.8:
+            return str(rng.randint(0, 1000))
+        if roll < 0.9:
+            return f"{rng.randint(0, 100)}.{rng.randint(0, 99)}"
+        return rng.choice(("yep", "nah"))
+
+    def variable(self) -> str:
+        return self.random.choice(self.variables)
+
+    def broken_statement(self) -> str:
+        rng = self.random
+        mutation = rng.choice(MUTATIONS)
+        name = self.variable()
+        if mutation == "missing_end":
+            return f"pls {name} = {self.expression()}"
+        if mutation == "illegal_identifier":
+            return f"pls {rng.randint(1, 9)}{name} = {self.expression()} thanks~"
+        if mutation == "unknown_symbol":
+            return f"pls {name} = {self.operand()} @ {self.operand()} thanks~"
+        if mutation == "unbalanced_parenthesis":
+            return f"{rng.choice(PRINT_KEYWORDS)}(({self.expression()}) thanks~"
+        if mutation == "missing_operand":
+            return f"pls {name} = {self.operand()} + thanks~"
+        return "}"
+
+
+# Parse sizes such as 512, 64KB, 10MB or 1GB into a number of characters
+def parse_size(text: str) -> int:
+    units = {"KB": 1024, "MB": 1024**2, "GB": 1024**3, "B": 1}
+    text = text.strip().upper()
+    for unit, factor in units.items():
+        if text.endswith(unit):
+            return int(float(text[: -len(unit)]) * factor)
+    return int(text)
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic PoliteLang program.")
+    parser.add_argument("size", type=parse_size, help="approximate size, e.g. 64KB or 10MB")
+    parser.add_argument("-o", "--output", default=None, help="write here instead of stdout")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-depth", type=int, default=3, help="deepest block nesting")
+    parser.add_argument("--expression-terms", type=int, default=6, help="most operands per expression")
+    parser.add_argument("--string-density", type=float, default=0.1)
+    parser.add_argument("--comment-density", type=float, default=0.1)
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="fraction of deliberately broken statements"
+    )
+    args = parser.parse_args(argv)
+
+    generator = ProgramGenerator(
+        seed=args.seed,
+        max_depth=args.max_depth,
+        expression_terms=args.expression_terms,
+        string_density=args.string_density,
+        comment_density=args.comment_density,
+        error_rate=args.error_rate,
+    )
+    if args.output is None:
+        generator.write(sys.stdout, args.size)
+    else:
+        with open(args.output, "w") as file:
+            generator.write(file, args.size)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,322 @@
+import argparse
+import os
+import sys
+from typing import Dict, List, Optional, Set
+
+from lexical import KIND_TEXT, TokenKind
+
+# The grammar the Parser is built from
+GRAMMAR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "politelang.grammar")
+
+# Predict table cell with no production: a syntax error
+NO_PRODUCTION = -1
+
+
+class GrammarError(Exception):
+    pass
+
+
+# One alternative of a rule. Symbols are encoded for the parsing engine in
+# `rhs`: a terminal as its TokenKind (>= 0) and a nonterminal as ~id (< 0).
+# A trailing reference to the rule's own nonterminal is left out of `rhs` and
+# sets `loops` instead, so the engine repeats the rule in place.
+class Production:
+    __slots__ = ("index", "nonterminal", "symbols", "action", "rhs", "loops")
+
+    def __init__(self, index: int, nonterminal: str, symbols: List[str], action: Optional[str]):
+        self.index = index
+        self.nonterminal = nonterminal
+        self.symbols = symbols
+        self.action = action
+        self.rhs = ()
+        self.loops = False
+
+    def __str__(self):
+        text = f"{self.nonterminal} ::= {' '.join(self.symbols) or 'ε'}"
+        return f"{text} -> {self.action}" if self.action else text
+
+
+# A grammar file with its FIRST and FOLLOW sets and LL(1) predict table
+# (nonterminal id -> TokenKind -> production index). Building the table
+# raises GrammarError on any LL(1) conflict.
+class Grammar:
+    def __init__(self):
+        self.start: Optional[str] = None
+        self.nonterminals: List[str] = []  # Nonterminal id -> name
+        self.ids: Dict[str, int] = {}  # Nonterminal name -> id
+        self.rules: Dict[str, List[Production]] = {}
+        self.productions: List[Production] = []
+        self.defaults: Dict[str, Production] = {}  # %default alternatives
+        self.fallbacks: Dict[str, Production] = {}  # Production for cells without an entry
+        self.externals: Dict[str, Set[TokenKind]] = {}  # Parsed by Parser.parse_<name>
+        self.recover: Set[str] = set()
+        self.nullable: Set[str] = set()
+        self.first: Dict[str, Set[TokenKind]] = {}
+        self.follow: Dict[str, Set[TokenKind]] = {}
+        self.table: List[List[int]] = []
+        self.predicted: List[List[int]] = []  # The table before fallbacks were filled in
+
+    @classmethod
+    def parse(cls, text: str, path: str = "<grammar>") -> "Grammar":
+        grammar = cls()
+        for number, line in logical_lines(text):
+            location = f"{path}:{number}"
+            if line.startswith("%"):
+                grammar.directive(line, location)
+            elif "::=" in line:
+                name, _, alternatives = line.partition("::=")
+                grammar.rule(name.strip(), alternatives, location)
+            else:
+                raise GrammarError(f"{location}: expected a rule or a directive")
+        grammar.build()
+        return grammar
+
+    def directive(self, line: str, location: str):
+        words = line.split()
+        if words[0] == "%start" and len(words) == 2:
+            self.start = words[1]
+        elif words[0] == "%recover" and len(words) == 2:
+            self.recover.add(words[1])
+        elif words[0] == "%external" and len(words) > 3 and words[2] == ":":
+            self.define(words[1], location)
+            self.externals[words[1]] = {terminal(word, location) for word in words[3:]}
+        else:
+            raise GrammarError(f"{location}: malformed directive '{line}'")
+
+    def rule(self, name: str, alternatives: str, location: str):
+        if not name.isidentifier() or not name.islower():
+            raise GrammarError(f"{location}: '{name}' is not a nonterminal name")
+        self.define(name, location)
+        productions = self.rules[name] = []
+        for alternative in alternatives.split("|"):
+            words = alternative.split()
+            is_default = "%default" in words
+            if is_default:
+                words.remove("%default")
+            action = None
+            if "->" in words:
+                arrow = words.index("->")
+                if arrow != len(words) - 2:
+                    raise GrammarError(f"{location}: '->' must be followed by one action name")
+                action = words[-1]
+                words = words[:arrow]
+            production = Production(len(self.productions), name, words, action)
+            self.productions.append(production)
+            productions.append(production)
+            if is_default:
+                if name in self.defaults:
+                    raise GrammarError(f"{location}: '{name}' has more than one %default")
+                self.defaults[name] = production
+
+    def define(self, name: str, location: str):
+        if name in self.ids:
+            raise GrammarError(f"{location}: '{name}' is defined twice")
+        self.ids[name] = len(self.nonterminals)
+        self.nonterminals.append(name)
+
+    # Check and encode every production, then compute the sets and the table
+    def build(self):
+        if self.start not in self.rules:
+            raise GrammarError("The %start nonterminal has no rule")
+        for name in self.recover:
+            if name not in self.rules:
+                raise GrammarError(f"%recover names unknown nonterminal '{name}'")
+        for production in self.productions:
+            symbols = production.symbols
+            production.loops = bool(symbols) and symbols[-1] == production.nonterminal
+            if production.loops:
+                symbols = symbols[:-1]
+            if production.action is None and len(symbols) > 1:
+                raise GrammarError(f"'{production}' has several symbols but no action")
+            production.rhs = tuple(self.encode(symbol) for symbol in symbols)
+        self.compute_first()
+        self.compute_follow()
+        self.build_table()
+
+    def encode(self, symbol: str) -> int:
+        if symbol in self.ids:
+            return ~self.ids[symbol]
+        if symbol.islower():
+            raise GrammarError(f"Nonterminal '{symbol}' has no rule")
+        return terminal(symbol, "grammar")
+
+    # FIRST set of a symbol sequence, and whether the whole sequence is nullable
+    def sequence_first(self, symbols: List[str]):
+        first = set()
+        for symbol in symbols:
+            if symbol not in self.ids:
+                first.add(TokenKind[symbol])
+                return first, False
+            first |= self.first[symbol]
+            if symbol not in self.nullable:
+                return first, False
+        return first, True
+
+    def compute_first(self):
+        self.first = {name: set(self.externals.get(name, ())) for name in self.nonterminals}
+        changed = True
+        while changed:
+            changed = False
+            for production in self.productions:
+                name = production.nonterminal
+                first, nullable = self.sequence_first(production.symbols)
+                if not first <= self.first[name]:
+                    self.first[name] |= first
+                    changed = True
+                if nullable and name not in self.nullable:
+                    self.nullable.add(name)
+                    changed = True
+
+    def compute_follow(self):
+        self.follow = {name: set() for name in self.nonterminals}
+        self.follow[self.start].add(TokenKind.EOF)
+        changed = True
+        while changed:
+            changed = False
+            for production in self.productions:
+                symbols = production.symbols
+                for position, symbol in enumerate(symbols):
+                    if symbol not in self.ids:
+                        continue
+                    first, nullable = self.sequence_first(symbols[position + 1 :])
+                    follow = first | self.follow[production.nonterminal] if nullable else first
+                    if not follow <= self.follow[symbol]:
+                        self.follow[symbol] |= follow
+                        changed = True
+
+    # Predict production p of A on every kind in FIRST(p), and on FOLLOW(A)
+    # when p is nullable; remaining cells take A's %default production, or its
+    # only production, so the error is reported at the terminal it expects
+    def build_table(self):
+        width = len(TokenKind)
+        self.table = [[NO_PRODUCTION] * width for _ in self.nonterminals]
+        conflicts = []
+        for production in self.productions:
+            name = production.nonterminal
+            row = self.table[self.ids[name]]
+            first, nullable = self.sequence_first(production.symbols)
+            predict = first | self.follow[name] if nullable else first
+            for kind in sorted(predict):
+                if row[kind] not in (NO_PRODUCTION, production.index):
+                    conflicts.append(
+                        f"{name} on {kind.name}: '{self.productions[row[kind]]}' and '{production}'"
+                    )
+                row[kind] = production.index
+        if conflicts:
+            raise GrammarError("Grammar is not LL(1):\n  " + "\n  ".join(conflicts))
+        self.predicted = [list(row) for row in self.table]
+        self.fallbacks = dict(self.defaults)
+        for name, productions in self.rules.items():
+            if len(productions) == 1:
+                self.fallbacks.setdefault(name, productions[0])
+        for name, production in self.fallbacks.items():
+            row = self.table[self.ids[name]]
+            for kind in range(width):
+                if row[kind] == NO_PRODUCTION:
+                    row[kind] = production.index
+
+    # The predict table with unit alternatives (A ::= B, no action) followed
+    # through, so the parser enters B's production without a frame for A.
+    # Chains stop before %recover and external nonterminals.
+    def collapsed_table(self) -> List[List[int]]:
+        table = [list(row) for row in self.table]
+        for row in table:
+            for kind, index in enumerate(row):
+                seen = set()
+                while index != NO_PRODUCTION and index not in seen:
+                    seen.add(index)
+                    production = self.productions[index]
+                    symbols = production.symbols
+                    if production.action or len(symbols) != 1 or symbols[0] not in self.rules:
+                        break
+                    if symbols[0] in self.recover:
+                        break
+                    index = self.table[self.ids[symbols[0]]][kind]
+                row[kind] = index
+        return table
+
+    def format_sets(self) -> str:
+        lines = []
+        for name in self.nonterminals:
+            first = " ".join(sorted(kind.name for kind in self.first[name]))
+            follow = " ".join(sorted(kind.name for kind in self.follow[name]))
+            nullable = " ε" if name in self.nullable else ""
+            lines.append(f"FIRST({name}) = {{{first}{nullable}}}")
+            lines.append(f"FOLLOW({name}) = {{{follow}}}")
+        return "\n".join(lines)
+
+    # Predict table rows, with the cells without an entry shown as (otherwise)
+    def format_table(self) -> str:
+        lines = []
+        for name in self.nonterminals:
+            if name in self.externals:
+                continue
+            lines.append(f"{name}:")
+            default = self.fallbacks.get(name)
+            for kind, index in enumerate(self.predicted[self.ids[name]]):
+                if index != NO_PRODUCTION:
+                    lines.append(f"  {TokenKind(kind).name:<14} {self.productions[index]}")
+            if default is not None:
+                lines.append(f"  {'(otherwise)':<14} {default}")
+        return "\n".join(lines)
+
+
+# (line number, text) of every rule or directive: comments removed and lines
+# starting with | joined to the rule above
+def logical_lines(text: str):
+    lines = []
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        if line.startswith("|"):
+            if not lines:
+                raise GrammarError(f"line {number}: '|' continues no rule")
+            lines[-1] = (lines[-1][0], lines[-1][1] + " " + line)
+        else:
+            lines.append((number, line))
+    return lines
+
+
+def terminal(name: str, location: str) -> TokenKind:
+    try:
+        return TokenKind[name]
+    except KeyError:
+        raise GrammarError(f"{location}: unknown terminal '{name}'") from None
+
+
+def load_grammar(path: str = GRAMMAR_PATH) -> Grammar:
+    with open(path, "r", encoding="utf-8") as file:
+        return Grammar.parse(file.read(), path)
+
+
+# Display text of a terminal in error messages: its lexeme, or the kind name
+def terminal_text(kind: int) -> str:
+    return KIND_TEXT.get(kind, TokenKind(kind).name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Check a PoliteLang grammar and print its FIRST/FOLLOW sets and LL(1) predict table."
+    )
+    parser.add_argument("grammar", nargs="?", default=GRAMMAR_PATH)
+    parser.add_argument("--sets", action="store_true", help="print only FIRST/FOLLOW sets")
+    parser.add_argument("--table", action="store_true", help="print only the predict table")
+    args = parser.parse_args(argv)
+
+    try:
+        grammar = load_grammar(args.grammar)
+    except GrammarError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if not args.table:
+        print(grammar.format_sets())
+    if not args.sets:
+        if not args.table:
+            print()
+        print(grammar.format_table())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
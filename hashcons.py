@@ -0,0 +1,123 @@
+from typing import Optional
+from weakref import WeakValueDictionary
+
+from syntax import NO_CHILDREN, ASTNode, IdentifierNode
+
+# Hash-consed AST nodes. A NodeFactory hands out one shared, immutable node
+# per distinct subtree, so the thousands of identical Literal, Identifier and
+# whole print statements of a machine-generated corpus are each stored once.
+# Nodes from one factory are structurally equal exactly when they are the
+# same object: equality is `is`, and each node carries its structural hash,
+# so comparing subtrees or using them as dict keys is O(1) at any depth.
+
+
+class ImmutableNodeError(AttributeError):
+    pass
+
+
+# Shared node: children are a tuple of shared nodes, attributes are frozen
+class SharedNode(ASTNode):
+    __slots__ = ("structural_hash", "__weakref__")
+
+    def __setattr__(self, name, value):
+        raise ImmutableNodeError(f"Shared {self.type} node is immutable")
+
+    def __delattr__(self, name):
+        raise ImmutableNodeError(f"Shared {self.type} node is immutable")
+
+    def __hash__(self):
+        return self.structural_hash
+
+    def add_child(self, child):
+        raise ImmutableNodeError(f"Shared {self.type} node is immutable")
+
+
+class SharedIdentifierNode(IdentifierNode):
+    __slots__ = ("structural_hash", "__weakref__")
+
+    __setattr__ = SharedNode.__setattr__
+    __delattr__ = SharedNode.__delattr__
+    __hash__ = SharedNode.__hash__
+    add_child = SharedNode.add_child
+
+
+# Mutable class each shared class stands for, e.g. for copies and encodings
+PLAIN_CLASSES = {SharedNode: ASTNode, SharedIdentifierNode: IdentifierNode}
+
+
+# Interns AST nodes in a weak-value table keyed by their structural hash, so
+# a node is dropped from the table once no tree uses it. The hash is the same
+# int object as the node's structural_hash, so the table stores no key of its
+# own; the rare nodes whose hash is taken by a different node are keyed by
+# their full (type, value, symbol, children) in a second table.
+# Identifiers are keyed by their symbol ID too: to share them across files,
+# parse the files with one SymbolTable as well as one factory.
+class NodeFactory:
+    def __init__(self):
+        self.table = WeakValueDictionary()  # Structural hash -> node
+        self.collisions = WeakValueDictionary()  # (type, value, symbol, children) -> node
+        self.requests = 0  # Nodes asked for
+        self.created = 0  # Nodes that were not in the table
+
+    def __len__(self):
+        return len(self.table) + len(self.collisions)
+
+    # The shared node with these fields; `children` must be shared nodes
+    def node(self, type_: str, value=None, children: tuple = NO_CHILDREN, symbol: Optional[int] = None):
+        self.requests += 1
+        children = children if children else NO_CHILDREN
+        structural_hash = hash((type_, value, symbol, children))
+        found = self.table.get(structural_hash)
+        if (
+            found is not None
+            and found.type == type_
+            and found.value == value
+            and getattr(found, "symbol", None) == symbol
+            and found.children == children  # Shared children compare by identity
+        ):
+            return found
+        key = None
+        if found is not None or self.collisions:
+            key = (type_, value, symbol, children)
+            shared = self.collisions.get(key)
+            if shared is not None:
+                return shared
+
+        node = object.__new__(SharedNode if symbol is None else SharedIdentifierNode)
+        setattr_ = object.__setattr__
+        setattr_(node, "type", type_)
+        setattr_(node, "value", value)
+        setattr_(node, "children", children)
+        if symbol is not None:
+            setattr_(node, "symbol", symbol)
+        setattr_(node, "structural_hash", structural_hash)
+        if found is None:
+            self.table[structural_hash] = node
+        else:
+            self.collisions[key] = node
+        self.created += 1
+        return node
+
+    # The shared equivalent of a tree of plain nodes, built bottom-up with an
+    # explicit stack so deep trees don't recurse. Shared subtrees are kept.
+    def intern(self, root: Optional[ASTNode]) -> Optional[ASTNode]:
+        if root is None or type(root) in PLAIN_CLASSES:
+            return root
+        results = []  # Shared nodes whose parent is not built yet
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if type(node) in PLAIN_CLASSES:
+                results.append(node)
+                continue
+            count = len(node.children)
+            if count and not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node.children))
+                continue
+            children = NO_CHILDREN
+            if count:
+                children = tuple(results[-count:])
+                del results[-count:]
+            results.append(self.node(node.type, node.value, children, getattr(node, "symbol", None)))
+        return results[0]
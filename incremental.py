@@ -0,0 +1,157 @@
+from bisect import bisect_left
+from typing import Iterator, List, Optional
+
+from diagnostics import Diagnostic, Diagnostics
+from lexical import LexicalAnalyzer, Token
+from sourcemap import SourceMap
+from symbols import SymbolTable
+from syntax import ASTNode, Parser
+
+
+# One top-level statement of a Document: its tokens, its AST (None when the
+# statement had a syntax error) and its diagnostics. Token and diagnostic
+# offsets are relative to the segment's start, so an edit before the segment
+# only moves the start kept in Document.starts.
+class Segment:
+    __slots__ = ("tokens", "statement", "diagnostics")
+
+    def __init__(self, tokens: List[Token], statement: Optional[ASTNode], diagnostics):
+        self.tokens = tokens
+        self.statement = statement
+        self.diagnostics = diagnostics
+
+
+# Outcome of Document.edit: segments[first:first + removed] of the previous
+# version were replaced by segments[first:first + inserted] of the new one
+class EditResult:
+    __slots__ = ("first", "removed", "inserted", "relexed_tokens")
+
+    def __init__(self, first: int, removed: int, inserted: int, relexed_tokens: int):
+        self.first = first
+        self.removed = removed
+        self.inserted = inserted
+        self.relexed_tokens = relexed_tokens
+
+    def __repr__(self):
+        return (
+            f"EditResult(first={self.first}, removed={self.removed}, "
+            f"inserted={self.inserted}, relexed_tokens={self.relexed_tokens})"
+        )
+
+
+# A source text kept lexed and parsed across editor-style edits.
+# edit() re-lexes and re-parses from the top-level statement before the edit
+# and stops as soon as the new parse reaches the start of an old statement
+# that lies entirely after the edit: lexing and parsing from a statement
+# boundary only depend on the text that follows, so every later segment
+# (tokens, AST subtrees and diagnostics) is reused unchanged. Symbol IDs stay
+# valid across edits because every re-lex interns into the same table.
+class Document:
+    def __init__(self, text: str = ""):
+        self.text = text
+        self.symbols = SymbolTable()
+        self.segments: List[Segment] = []
+        self.starts: List[int] = []  # Absolute offset of each segment's first token
+        self.reparse(0, 0, len(text))
+
+    # Replace `removed` characters at `offset` with `inserted`
+    def edit(self, offset: int, removed: int, inserted: str) -> EditResult:
+        if offset < 0 or removed < 0 or offset + removed > len(self.text):
+            raise ValueError(f"Edit ({offset}, {removed}) is outside the document")
+        self.text = self.text[:offset] + inserted + self.text[offset + removed :]
+
+        # Restart one statement before the one the edit falls in: that statement's
+        # parse may depend on the first token after it (e.g. "otherwise")
+        first = max(0, bisect_left(self.starts, offset) - 2)
+        return self.reparse(first, len(inserted) - removed, offset + len(inserted))
+
+    # Lex and parse the text from segment `first` on, until a statement would
+    # start at or after new offset `resync_from` (the end of the inserted text)
+    # where an old segment started; `delta` is the change in text length
+    def reparse(self, first: int, delta: int, resync_from: int) -> EditResult:
+        restart = self.starts[first] if first else 0  # Text before the first statement may have changed
+        diagnostics = Diagnostics()
+        lexer = LexicalAnalyzer(
+            self.text, engine="regex", diagnostics=diagnostics, symbols=self.symbols
+        )
+        lexer.position = restart
+        pulled = []  # Tokens handed to the parser, in order
+
+        def record(tokens):
+            for token in tokens:
+                pulled.append(token)
+                yield token
+
+        parser = Parser(record(lexer.iter_tokens()), diagnostics, self.symbols)
+        starts, segments, syntax_reports = [], [], []
+        old = first  # Next old segment that may be reusable
+        end = len(self.starts)
+        while True:
+            token = parser.current_token()
+            if token is None:
+                break
+            if token.start >= resync_from:
+                old_start = token.start - delta
+                old = bisect_left(self.starts, old_start, old, end)
+                if old < end and self.starts[old] == old_start:
+                    break  # Resynchronized: the rest of the document is unchanged
+            begin = parser.position
+            reported = len(diagnostics)
+            statement = parser.parse_statement_or_recover()
+            starts.append(token.start)
+            segments.append(Segment(pulled[begin : parser.position], statement, []))
+            syntax_reports.append((reported, len(diagnostics)))
+        resynchronized = token is not None
+        old_end = old if resynchronized else end
+        boundary = token.start if resynchronized else len(self.text)
+
+        self.attach(starts, segments, syntax_reports, diagnostics, boundary)
+        self.starts[first:old_end] = starts
+        self.segments[first:old_end] = segments
+        if delta:
+            tail = first + len(starts)
+            self.starts[tail:] = [start + delta for start in self.starts[tail:]]
+        return EditResult(first, old_end - first, len(segments), len(pulled))
+
+    # Give the new segments relative token offsets and their own diagnostics:
+    # syntax errors belong to the statement being parsed when they were
+    # reported, lexical errors to the segment their offset falls in
+    def attach(self, starts, segments, syntax_reports, diagnostics, boundary):
+        for start, segment in zip(starts, segments):
+            for token in segment.tokens:
+                token.start -= start
+        for index, (begin, stop) in enumerate(syntax_reports):
+            for diagnostic in diagnostics.items[begin:stop]:
+                if diagnostic.phase == "syntax":
+                    offset = diagnostic.offset if diagnostic.offset is not None else boundary
+                    segments[index].diagnostics.append(
+                        Diagnostic("syntax", diagnostic.message, offset - starts[index])
+                    )
+        for diagnostic in diagnostics:
+            if diagnostic.phase == "lexical" and diagnostic.offset < boundary and starts:
+                index = max(0, bisect_left(starts, diagnostic.offset + 1) - 1)
+                segments[index].diagnostics.append(
+                    Diagnostic("lexical", diagnostic.message, diagnostic.offset - starts[index])
+                )
+
+    # Top-level statements that parsed without errors
+    def statements(self) -> Iterator[ASTNode]:
+        for segment in self.segments:
+            if segment.statement is not None:
+                yield segment.statement
+
+    # Every token with its absolute start offset
+    def tokens(self) -> Iterator[Token]:
+        for start, segment in zip(self.starts, self.segments):
+            for token in segment.tokens:
+                yield Token(token.type, token.value, start + token.start, token.symbol)
+
+    # All diagnostics with absolute offsets, in source order
+    def diagnostics(self) -> Diagnostics:
+        collected = Diagnostics(SourceMap(self.text))
+        for start, segment in zip(self.starts, self.segments):
+            collected.extend(
+                Diagnostic(item.phase, item.message, start + item.offset)
+                for item in sorted(segment.diagnostics, key=lambda item: item.offset)
+            )
+        return collected
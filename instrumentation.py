@@ -0,0 +1,179 @@
+import cProfile
+import json
+import platform
+import pstats
+import time
+import tracemalloc
+from collections import Counter
+from typing import Iterable, Iterator, Optional
+
+from lexical import Token
+
+# Number of functions kept per profiled phase in the report, by cumulative time
+PROFILE_TOP = 25
+
+
+# Context manager that does nothing, shared by every NullInstrumentation phase
+class NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_PHASE = NullPhase()
+
+
+# Default instrumentation: every hook returns immediately, and count_tokens
+# hands the token iterator back unwrapped, so the hot paths pay nothing
+class NullInstrumentation:
+    enabled = False
+
+    def phase(self, name: str):
+        return NULL_PHASE
+
+    def count_tokens(self, tokens: Iterable[Token]) -> Iterable[Token]:
+        return tokens
+
+    def count_nodes(self, statements):
+        pass
+
+    def report(self) -> dict:
+        return {}
+
+    def write_report(self, path: str):
+        pass
+
+    def close(self):
+        pass
+
+
+NULL = NullInstrumentation()
+
+
+# Wall and CPU time of one phase, plus its peak traced memory and profile
+class Phase:
+    __slots__ = ("instrumentation", "name", "profiler", "wall", "cpu")
+
+    def __init__(self, instrumentation: "Instrumentation", name: str):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.profiler = None
+
+    def __enter__(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        if self.name in self.instrumentation.profile_phases:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.instrumentation.record(self, wall, cpu)
+        return False
+
+
+# Opt-in instrumentation: per-phase wall/CPU timers, token counts per TokenType,
+# AST node counts per node type, peak memory via tracemalloc (memory=True) and
+# cProfile capture for the phases named in profile_phases. report() returns
+# everything as a JSON-serializable dict.
+class Instrumentation(NullInstrumentation):
+    enabled = True
+
+    def __init__(self, memory: bool = False, profile_phases: Iterable[str] = ()):
+        self.profile_phases = set(profile_phases)
+        self.phases = {}  # Phase name -> measurements, in the order phases first ran
+        self.tokens = Counter()
+        self.nodes = Counter()
+        self.memory = memory
+        self.started_tracing = memory and not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+
+    def phase(self, name: str) -> Phase:
+        return Phase(self, name)
+
+    def record(self, phase: Phase, wall: float, cpu: float):
+        entry = self.phases.setdefault(
+            phase.name, {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0}
+        )
+        entry["calls"] += 1
+        entry["wall_seconds"] += wall
+        entry["cpu_seconds"] += cpu
+        if self.memory and tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+            entry["peak_memory_bytes"] = max(entry.get("peak_memory_bytes", 0), peak)
+        if phase.profiler is not None:
+            entry["profile"] = profile_summary(phase.profiler)
+
+    # Count tokens per TokenType as they stream past
+    def count_tokens(self, tokens: Iterable[Token]) -> Iterator[Token]:
+        counts = self.tokens
+        for token in tokens:
+            counts[token.type.value] += 1
+            yield token
+
+    # Count AST nodes per node type, without recursing
+    def count_nodes(self, statements):
+        counts = self.nodes
+        stack = list(statements)
+        while stack:
+            node = stack.pop()
+            counts[node.type] += 1
+            stack.extend(node.children)
+
+    def report(self) -> dict:
+        report = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "phases": self.phases,
+            "tokens": {"total": sum(self.tokens.values()), "by_type": dict(self.tokens)},
+            "nodes": {"total": sum(self.nodes.values()), "by_type": dict(self.nodes)},
+        }
+        if self.memory:
+            peaks = [phase.get("peak_memory_bytes", 0) for phase in self.phases.values()]
+            report["peak_memory_bytes"] = max(peaks, default=0)
+        return report
+
+    def write_report(self, path: str):
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=2)
+            file.write("\n")
+
+    def close(self):
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+
+# The most expensive functions of a profile, by cumulative time
+def profile_summary(profiler: cProfile.Profile, top: int = PROFILE_TOP) -> list:
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+    return [
+        {
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "total_seconds": round(total, 6),
+            "cumulative_seconds": round(cumulative, 6),
+        }
+        for (filename, line, name), (_, calls, total, cumulative, _) in rows
+    ]
+
+
+# Instrumentation writing a report, or the shared no-op one when no report is requested
+def create(
+    report: Optional[str] = None, memory: bool = False, profile_phases: Iterable[str] = ()
+) -> NullInstrumentation:
+    if report is None:
+        return NULL
+    return Instrumentation(memory, profile_phases)
@@ -0,0 +1,384 @@
+import argparse
+import operator
+import re
+import sys
+from typing import List
+
+from diagnostics import Diagnostics
+from lexical import LexicalAnalyzer
+from sourcemap import SourceMap, open_source
+from symbols import SymbolTable
+from syntax import ASTNode, Parser, SyntaxError, raise_for_errors
+from vectorize import VectorizedLoop
+
+
+class InterpreterError(Exception):
+    pass
+
+
+# Python functions behind each PoliteLang binary operator
+BINARY_OPERATORS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "<": operator.lt,
+    ">": operator.gt,
+    "<=": operator.le,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# Marks a variable slot that has not been assigned yet
+UNSET = object()
+
+INTEGER = re.compile(r"[0-9]+")
+FLOAT = re.compile(r"[0-9]+\.[0-9]*")
+
+
+# Convert the text of a Literal (number) node to a Python value. String
+# literals are String nodes, whose value is used as is.
+def literal_value(text: str):
+    if INTEGER.fullmatch(text):
+        return int(text)
+    if FLOAT.fullmatch(text):
+        return float(text)
+    return text
+
+
+# Format a value the way PoliteLang prints it
+def format_value(value) -> str:
+    if value is True:
+        return "yep"
+    if value is False:
+        return "nah"
+    if isinstance(value, list):
+        return "[" + ", ".join(format_value(item) for item in value) + "]"
+    if isinstance(value, range):
+        step = f" : {value.step}" if value.step != 1 else ""
+        return f"[{value.start} : {value.stop}{step}]"
+    return str(value)
+
+
+# Collects printed lines and writes them to the output stream in batches
+class OutputBuffer:
+    def __init__(self, stream=None, max_lines: int = 4096):
+        self.stream = stream if stream is not None else sys.stdout
+        self.max_lines = max_lines
+        self.lines = []
+
+    def write_line(self, text: str):
+        self.lines.append(text)
+        if len(self.lines) >= self.max_lines:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            self.stream.write("\n".join(self.lines) + "\n")
+            self.lines.clear()
+        self.stream.flush()
+
+
+# Tree-walking interpreter. The AST is first compiled into nested closures:
+# each node's handler is looked up once by node type, BinaryOperation trees of
+# literals are folded into constants, and every variable is resolved to an
+# integer slot of a flat frame list, so running the program does no string
+# comparisons or name lookups. The slot of a variable is the SymbolTable ID
+# the lexer and parser gave its Identifier nodes.
+# With `vectorize`, Given loops with element-wise bodies run as batched NumPy
+# operations when NumPy is installed (see vectorize.py).
+class Interpreter:
+    def __init__(self, output=None, vectorize: bool = True):
+        self.output = output if isinstance(output, OutputBuffer) else OutputBuffer(output)
+        self.vectorize = vectorize
+        self.names = {}  # Symbol ID (= index in the frame) -> variable name
+        self.statement_compilers = {
+            "Assignment": self.compile_assignment,
+            "ShowPrint": self.compile_print,
+            "WhisperPrint": self.compile_print,
+            "ShoutPrint": self.compile_print,
+            "If": self.compile_if,
+            "While": self.compile_while,
+            "ForEach": self.compile_for,
+        }
+        self.expression_compilers = {
+            "Literal": self.compile_constant,
+            "String": self.compile_constant,
+            "Boolean": self.compile_constant,
+            "Identifier": self.compile_identifier,
+            "BinaryOperation": self.compile_binary_operation,
+            "List": self.compile_list,
+            "Range": self.compile_range,
+        }
+
+    # Run top-level statements and return the final variable values by name
+    def run(self, statements: List[ASTNode]) -> dict:
+        try:
+            program = self.compile_block(statements)
+        except RecursionError:
+            raise InterpreterError("Program nested too deeply to compile") from None
+        frame = [UNSET] * (max(self.names, default=-1) + 1)
+        try:
+            program(frame)
+        except (TypeError, ValueError, ZeroDivisionError, OverflowError) as e:
+            raise InterpreterError(str(e)) from None
+        except RecursionError:
+            # Evaluating an expression calls one closure per nested operation
+            raise InterpreterError("Expression nested too deeply to evaluate") from None
+        finally:
+            self.output.flush()
+        return {name: frame[slot] for slot, name in self.names.items() if frame[slot] is not UNSET}
+
+    def slot(self, node: ASTNode) -> int:
+        self.names[node.symbol] = node.value
+        return node.symbol
+
+    # Statements
+
+    def compile_statement(self, node: ASTNode):
+        compiler = self.statement_compilers.get(node.type)
+        if compiler is None:
+            raise InterpreterError(f"Cannot execute {node.type} statement")
+        return compiler(node)
+
+    def compile_block(self, statements):
+        compiled = [self.compile_statement(statement) for statement in statements]
+        if len(compiled) == 1:
+            return compiled[0]
+
+        def block(frame):
+            for statement in compiled:
+                statement(frame)
+
+        return block
+
+    def compile_assignment(self, node: ASTNode):
+        slot = self.slot(node.children[0])
+        evaluate, value = self.compile_expression(node.children[1])
+        if value is not UNSET:
+
+            def assign_constant(frame):
+                frame[slot] = value
+
+            return assign_constant
+
+        def assign(frame):
+            frame[slot] = evaluate(frame)
+
+        return assign
+
+    def compile_print(self, node: ASTNode):
+        evaluate, _ = self.compile_expression(node.children[0])
+        write_line = self.output.write_line
+        line = self.printer(node)
+
+        def print_value(frame):
+            write_line(line(evaluate(frame)))
+
+        return print_value
+
+    # The function turning a value into the output line of a print statement
+    def printer(self, node: ASTNode):
+        if node.type == "WhisperPrint":
+            return lambda value: format_value(value).lower()
+        if node.type == "ShoutPrint":
+            return lambda value: format_value(value).upper()
+        return format_value
+
+    def compile_if(self, node: ASTNode):
+        condition, _ = self.compile_expression(node.children[0])
+        if_body = self.compile_block(node.children[1].children)
+        if len(node.children) < 3:
+
+            def run_if(frame):
+                if condition(frame):
+                    if_body(frame)
+
+            return run_if
+
+        else_body = self.compile_block(node.children[2].children)
+
+        def run_if_else(frame):
+            if condition(frame):
+                if_body(frame)
+            else:
+                else_body(frame)
+
+        return run_if_else
+
+    def compile_while(self, node: ASTNode):
+        condition, _ = self.compile_expression(node.children[0])
+        body = self.compile_block(node.children[1].children)
+
+        def run_while(frame):
+            while condition(frame):
+                body(frame)
+
+        return run_while
+
+    def compile_for(self, node: ASTNode):
+        slot = self.slot(node.children[0])
+        iterable, _ = self.compile_expression(node.children[1])
+        body = self.compile_block(node.children[2].children)
+        batched = None
+        if self.vectorize:
+            batched = VectorizedLoop.plan(
+                node, self.slot, lambda constant: self.compile_constant(constant)[1], self.printer
+            )
+
+        if batched is not None:
+            write_line = self.output.write_line
+
+            def run_batched_for(frame):
+                sequence = iterable(frame)
+                if batched.run(sequence, frame, write_line, UNSET):
+                    return
+                for item in sequence:
+                    frame[slot] = item
+                    body(frame)
+
+            return run_batched_for
+
+        def run_for(frame):
+            for item in iterable(frame):
+                frame[slot] = item
+                body(frame)
+
+        return run_for
+
+    # Expressions. Each compiler returns (evaluate, value): value is the folded
+    # constant when the subtree has no variables, otherwise UNSET. Compilers
+    # receive the (evaluate, value) pairs of the node's children, compiled
+    # bottom-up with an explicit stack so long expressions don't recurse.
+
+    def compile_expression(self, root: ASTNode):
+        results = []  # Compiled subtrees whose parent is not compiled yet
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            compiler = self.expression_compilers.get(node.type)
+            if compiler is None:
+                raise InterpreterError(f"Cannot evaluate {node.type} expression")
+            count = len(node.children)
+            if count and not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node.children))
+                continue
+            operands = []
+            if count:
+                operands = results[-count:]
+                del results[-count:]
+            results.append(compiler(node, operands))
+        return results[0]
+
+    def compile_constant(self, node: ASTNode, operands=()):
+        if node.type == "Boolean":
+            value = node.value == "yep"
+        elif node.type == "String":
+            value = node.value
+        else:
+            value = literal_value(node.value)
+        return (lambda frame: value), value
+
+    def compile_identifier(self, node: ASTNode, operands=()):
+        name = node.value
+        slot = self.slot(node)
+
+        def load(frame):
+            value = frame[slot]
+            if value is UNSET:
+                raise InterpreterError(f"Variable '{name}' is used before it is assigned")
+            return value
+
+        return load, UNSET
+
+    def compile_list(self, node: ASTNode, items: list):
+        if all(value is not UNSET for _, value in items):
+            value = [value for _, value in items]
+            return (lambda frame: value), value
+        evaluators = [evaluate for evaluate, _ in items]
+        return (lambda frame: [evaluate(frame) for evaluate in evaluators]), UNSET
+
+    # [start : stop : step] is Python's range(start, stop, step)
+    def compile_range(self, node: ASTNode, bounds: list):
+        if all(value is not UNSET for _, value in bounds):
+            try:
+                value = range(*(value for _, value in bounds))
+            except (TypeError, ValueError):
+                pass  # Left to fail at run time
+            else:
+                return (lambda frame: value), value
+        evaluators = [evaluate for evaluate, _ in bounds]
+        return (lambda frame: range(*[evaluate(frame) for evaluate in evaluators])), UNSET
+
+    def compile_binary_operation(self, node: ASTNode, operands: list):
+        function = BINARY_OPERATORS.get(node.value)
+        if function is None:
+            raise InterpreterError(f"Unsupported operator '{node.value}' in expression")
+        (left, left_value), (right, right_value) = operands
+
+        if left_value is not UNSET and right_value is not UNSET:
+            # Constant folding; failures such as 1 / 0 are left to raise at run time
+            try:
+                value = function(left_value, right_value)
+            except (TypeError, ValueError, ZeroDivisionError, OverflowError):
+                pass
+            else:
+                return (lambda frame: value), value
+        if right_value is not UNSET:
+            # Common case such as i + 1: skip the call for the constant side
+            return (lambda frame: function(left(frame), right_value)), UNSET
+        if left_value is not UNSET:
+            return (lambda frame: function(left_value, right(frame))), UNSET
+        return (lambda frame: function(left(frame), right(frame))), UNSET
+
+
+# Lex, parse and run a PoliteLang source file, first running the optimizer's
+# default passes over the AST when `optimize` is set. The optimizer's
+# temporaries are not among the returned variables.
+def run_file(path: str, engine: str = "regex", optimize: bool = False, vectorize: bool = True) -> dict:
+    diagnostics = Diagnostics(SourceMap(path=path))
+    with open_source(path) as file:
+        symbols = SymbolTable()
+        lexer = LexicalAnalyzer(engine=engine, diagnostics=diagnostics, symbols=symbols)
+        statements = Parser(lexer.iter_tokens(file), diagnostics, symbols).parse_program()
+    raise_for_errors(diagnostics)
+    temporaries = ()
+    if optimize:
+        from optimizer import PassManager  # The optimizer imports this module
+
+        manager = PassManager(symbols)
+        statements = manager.run(statements)
+        temporaries = manager.temporaries
+    variables = Interpreter(vectorize=vectorize).run(statements)
+    for name in temporaries:
+        variables.pop(name, None)
+    return variables
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a PoliteLang program.")
+    parser.add_argument("program", help="PoliteLang source file")
+    parser.add_argument(
+        "-O", "--optimize", action="store_true", help="optimize the AST first (see optimizer.py)"
+    )
+    parser.add_argument(
+        "--scalar",
+        action="store_true",
+        help="run every Given loop one iteration at a time (no NumPy batches)",
+    )
+    args = parser.parse_args(argv)
+    try:
+        run_file(args.program, optimize=args.optimize, vectorize=not args.scalar)
+    except SyntaxError as e:
+        print(f"Syntax Error: {e}")
+        return 1
+    except InterpreterError as e:
+        print(f"Runtime Error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,21 @@
+import mmap
+import os
 import re
-from enum import Enum
-from typing import List
+from array import array
+from enum import Enum, IntEnum
+from typing import Iterator, List, Optional
+
+from diagnostics import Diagnostics
+from sourcemap import SourceMap
+from symbols import SymbolTable
 
 
 # Simplified token types for PoliteLang
 class TokenType(Enum):
     KEYWORD = "KEYWORD"  # For all language keywords (e.g., show, whisper, pls, thanks~)
     IDENTIFIER = "IDENTIFIER"  # For variable names
-    LITERAL = "LITERAL"  # For literals (strings, integers, floats, booleans)
+    LITERAL = "LITERAL"  # For number literals (integers and floats)
+    STRING = "STRING"  # For string literals, without their quotes
     OPERATOR = "OPERATOR"  # For arithmetic and relational operators
     SEPARATOR = "SEPARATOR"  # For delimiters like (), {}, etc.
     END_STATEMENT = "END_STATEMENT"  # For statement terminators (thanks~)
@@ -16,11 +24,126 @@ class TokenType(Enum):
     ILLEGAL_IDENTIFIER = "ILLEGAL_IDENTIFIER"  # For invalid identifiers
 
 
+# Fine-grained token kinds: one per keyword, operator and separator, and one per
+# remaining TokenType. The parser's predict table (see grammar.py) is indexed by
+# kind, and grammar files name terminals by these member names.
+class TokenKind(IntEnum):
+    EOF = 0  # End of input, never stored on a token
+    IDENTIFIER = 1
+    LITERAL = 2
+    ILLEGAL_IDENTIFIER = 3
+    UNKNOWN = 4
+    COMMENT = 5
+    THANKS = 6
+    PLS = 7
+    SHOW = 8
+    WHISPER = 9
+    SHOUT = 10
+    YEP = 11
+    NAH = 12
+    CHECK = 13
+    OTHERWISE = 14
+    DURING = 15
+    GIVEN = 16
+    IN = 17
+    PLUS = 18
+    MINUS = 19
+    STAR = 20
+    SLASH = 21
+    LESS = 22
+    GREATER = 23
+    LESS_EQUAL = 24
+    GREATER_EQUAL = 25
+    EQUAL_EQUAL = 26
+    NOT_EQUAL = 27
+    ASSIGN = 28
+    LPAREN = 29
+    RPAREN = 30
+    LBRACE = 31
+    RBRACE = 32
+    LBRACKET = 33
+    RBRACKET = 34
+    COLON = 35
+    COMMA = 36
+    STRING = 37
+
+
+# Lexeme of every kind that has a fixed spelling
+KIND_TEXT = {
+    TokenKind.THANKS: "thanks~",
+    TokenKind.PLS: "pls",
+    TokenKind.SHOW: "show",
+    TokenKind.WHISPER: "whisper",
+    TokenKind.SHOUT: "shout",
+    TokenKind.YEP: "yep",
+    TokenKind.NAH: "nah",
+    TokenKind.CHECK: "Check",
+    TokenKind.OTHERWISE: "otherwise",
+    TokenKind.DURING: "During",
+    TokenKind.GIVEN: "Given",
+    TokenKind.IN: "in",
+    TokenKind.PLUS: "+",
+    TokenKind.MINUS: "-",
+    TokenKind.STAR: "*",
+    TokenKind.SLASH: "/",
+    TokenKind.LESS: "<",
+    TokenKind.GREATER: ">",
+    TokenKind.LESS_EQUAL: "<=",
+    TokenKind.GREATER_EQUAL: ">=",
+    TokenKind.EQUAL_EQUAL: "==",
+    TokenKind.NOT_EQUAL: "!=",
+    TokenKind.ASSIGN: "=",
+    TokenKind.LPAREN: "(",
+    TokenKind.RPAREN: ")",
+    TokenKind.LBRACE: "{",
+    TokenKind.RBRACE: "}",
+    TokenKind.LBRACKET: "[",
+    TokenKind.RBRACKET: "]",
+    TokenKind.COLON: ":",
+    TokenKind.COMMA: ",",
+}
+LEXEME_KINDS = {text: kind for kind, text in KIND_TEXT.items()}
+LEXEME_BYTES_KINDS = {text.encode(): kind for kind, text in KIND_TEXT.items()}  # For SpanTokens
+
+# Kind of the tokens of each TokenType whose lexeme does not decide the kind
+TYPE_KINDS = {
+    TokenType.IDENTIFIER: TokenKind.IDENTIFIER,
+    TokenType.LITERAL: TokenKind.LITERAL,
+    TokenType.STRING: TokenKind.STRING,
+    TokenType.ILLEGAL_IDENTIFIER: TokenKind.ILLEGAL_IDENTIFIER,
+    TokenType.UNKNOWN: TokenKind.UNKNOWN,
+    TokenType.COMMENT: TokenKind.COMMENT,
+}
+
+
+# Kind of a token from its type and value (keywords, operators, separators
+# and thanks~ are told apart by their lexeme)
+def token_kind(type: TokenType, value: str) -> TokenKind:
+    kind = TYPE_KINDS.get(type)
+    if kind is None:
+        kind = LEXEME_KINDS.get(value, TokenKind.UNKNOWN)
+    return kind
+
+
 # Token class to store type and value of each token
 class Token:
-    def __init__(self, type: TokenType, value: str):
+    # No per-instance __dict__, tokens are created in bulk
+    __slots__ = ("type", "value", "start", "symbol", "kind")
+
+    def __init__(
+        self,
+        type: TokenType,
+        value: str,
+        start: Optional[int] = None,
+        symbol: Optional[int] = None,
+        kind: Optional[TokenKind] = None,
+    ):
         self.type = type  # The type of the token
         self.value = value  # The actual string value of the token
+        self.start = start  # Offset of the token's first character in the source (see SourceMap)
+        self.symbol = symbol  # SymbolTable ID of an identifier, None for other tokens
+        # TokenKind, derived from type and value unless the scanner already knows it
+        self.kind = token_kind(type, value) if kind is None else kind
 
     def __str__(self):
         return f"Type: {self.type.value}, Value: {self.value}"
@@ -28,119 +151,326 @@ class Token:
 
 # LexicalAnalyzer for PoliteLang
 class LexicalAnalyzer:
-    def __init__(self, source: str):
-        self.source = source  # Source code input as a string
+    # Define sets of keywords, operators, and separators (shared by every instance)
+    KEYWORDS = {
+        "show",
+        "whisper",
+        "shout",
+        "pls",
+        "thanks~",
+        "yep",
+        "nah",
+        "Check",
+        "otherwise",
+        "During",
+        "Given",
+        "in",
+    }
+    OPERATORS = {"+", "-", "*", "/", "<", ">", ">=", "<=", "==", "!=", "="}
+    SEPARATORS = {"(", ")", "{", "}", "[", "]", ":", ","}
+
+    # Available scanner engines: the original character loop and the master-pattern scanner
+    ENGINES = ("loop", "regex")
+
+    # Master patterns for the regex engine (str) and span scanner (bytes), compiled
+    # once per process by master_pattern() and master_bytes_pattern()
+    _MASTER_PATTERN = None
+    _MASTER_BYTES_PATTERN = None
+
+    # Number of characters iter_tokens reads from a stream at a time
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(
+        self,
+        source: str = "",
+        engine: str = "loop",
+        diagnostics: Optional[Diagnostics] = None,
+        symbols: Optional[SymbolTable] = None,
+    ):
+        self.source = source  # Source code input as a string (the current chunk when streaming)
         self.position = 0  # Position tracker for character analysis
+        self.offset = 0  # Offset of self.source[0] within the whole input
+        self.token_start = 0  # Offset of the token being scanned within the whole input
+        self.pending_errors = []  # (message, offset) of the token being scanned, reported once it is kept
+        # Lexical errors are collected here instead of being printed
+        self.diagnostics = diagnostics if diagnostics is not None else Diagnostics()
+        # Identifier names are interned here; share the table with the Parser
+        self.symbols = symbols if symbols is not None else SymbolTable()
 
-        # Define sets of keywords, operators, and separators
-        self.KEYWORDS = {
-            "show",
-            "whisper",
-            "shout",
-            "pls",
-            "thanks~",
-            "yep",
-            "nah",
-            "Check",
-            "otherwise",
-            "During",
-            "Given",
-        }
-        self.OPERATORS = {"+", "-", "*", "/", "<", ">", ">=", "<=", "==", "!=", "="}
-        self.SEPARATORS = {"(", ")", "{", "}", "[", "]", ":", ","}
+        if engine not in self.ENGINES:
+            raise ValueError(
+                f"Unknown lexer engine '{engine}', expected one of {self.ENGINES}"
+            )
+        self.engine = engine
+
+    # Named (group, pattern) rules of the master pattern, built from KEYWORDS,
+    # OPERATORS and SEPARATORS. Alternatives are listed in the same order as the
+    # checks in next_token_loop, so the first alternative that matches is the
+    # token the loop would produce. Only ASCII is matched for token starts;
+    # anything else falls back to the loop.
+    @classmethod
+    def master_rules(cls):
+        multi_operators = sorted(
+            (op for op in cls.OPERATORS if len(op) > 1), key=lambda x: -len(x)
+        )
+        single_operators = sorted(op for op in cls.OPERATORS if len(op) == 1)
+        return [
+            ("SKIP", r"\s+"),
+            ("COMMENT", r":\)[^\n]*\n?"),
+            ("STRING", r'"[^"]*"?'),
+            ("END_STATEMENT", re.escape("thanks~")),
+            ("MULTI_OPERATOR", "|".join(map(re.escape, multi_operators))),
+            ("OPERATOR", "[" + re.escape("".join(single_operators)) + "]"),
+            ("SEPARATOR", "[" + re.escape("".join(sorted(cls.SEPARATORS))) + "]"),
+            ("WORD", r"[A-Za-z_]\w*"),
+            ("NUMBER", r"[0-9]+(?:\.[0-9]*)?(?P<ILLEGAL>[A-Za-z]\w*)?"),
+        ]
+
+    # Build the single master pattern used by the regex engine
+    @classmethod
+    def master_pattern(cls):
+        if LexicalAnalyzer._MASTER_PATTERN is None:
+            LexicalAnalyzer._MASTER_PATTERN = re.compile(
+                "|".join(f"(?P<{name}>{pattern})" for name, pattern in cls.master_rules())
+            )
+        return LexicalAnalyzer._MASTER_PATTERN
+
+    # Build the bytes master pattern used by iter_span_tokens. Keywords get their
+    # own alternative so telling them from identifiers needs no lexeme slicing.
+    @classmethod
+    def master_bytes_pattern(cls):
+        if LexicalAnalyzer._MASTER_BYTES_PATTERN is None:
+            words = sorted(
+                (keyword for keyword in cls.KEYWORDS if re.fullmatch(r"\w+", keyword)),
+                key=lambda x: -len(x),
+            )
+            rules = []
+            for name, pattern in cls.master_rules():
+                if name == "WORD":
+                    rules.append(("KEYWORD", f"(?:{'|'.join(words)})(?!\\w)"))
+                rules.append((name, pattern))
+            LexicalAnalyzer._MASTER_BYTES_PATTERN = re.compile(
+                "|".join(f"(?P<{name}>{pattern})" for name, pattern in rules).encode()
+            )
+        return LexicalAnalyzer._MASTER_BYTES_PATTERN
 
     # Tokenize the input string and return a list of tokens
     def tokenize(self) -> List[Token]:
-        tokens = []
+        return list(self.iter_tokens())
 
+    # Lazily yield tokens. Without a stream the tokens come from self.source.
+    # With a text stream, the input is read in chunks of chunk_size characters;
+    # a token that runs into the end of a chunk (e.g. "thanks~", ">=", a string
+    # literal or a comment cut in half) is re-scanned once more input arrives,
+    # so only the unfinished tail of the previous chunk is kept in memory.
+    # Chunks are collected until they are at least as long as that tail, so a
+    # token spanning many chunks (an unterminated string, a long comment or
+    # run of whitespace) is copied and re-scanned O(log n) times, not per chunk.
+    def iter_tokens(self, stream=None, chunk_size: int = CHUNK_SIZE) -> Iterator[Token]:
+        scan = self.scan_regex if self.engine == "regex" else self.scan_loop
+        if stream is None:
+            yield from scan(final=True)
+            return
+
+        self.source = ""
+        self.position = 0
+        self.offset = 0
+        pieces = []  # Chunks read since the last scan
+        pending = 0  # Characters in pieces
+        while True:
+            chunk = stream.read(chunk_size)
+            final = not chunk
+            pieces.append(chunk)
+            pending += len(chunk)
+            if not final and pending < len(self.source) - self.position:
+                continue
+            self.offset += self.position
+            self.source = self.source[self.position :] + "".join(pieces)
+            self.position = 0
+            pieces.clear()
+            pending = 0
+            yield from scan(final)
+            if final:
+                return
+
+    # Scan tokens from the current position, checking each character in turn.
+    # Unless final is set, stop before a token that reaches the end of self.source.
+    def scan_loop(self, final: bool = True) -> Iterator[Token]:
         while self.position < len(self.source):
-            current_char = self.source[self.position]
+            start = self.position
+            token = self.next_token_loop()
+            if not final and self.position >= len(self.source):
+                # The token may continue in the next chunk, scan it again later
+                self.position = start
+                self.pending_errors.clear()
+                return
+            self.flush_errors()
+            if token is not None:
+                yield token
 
-            # Skip whitespace
-            if current_char.isspace():
-                self.position += 1
+    # Scan tokens from the current position using the master pattern.
+    # Input the pattern does not cover (non-ASCII or unrecognized characters)
+    # is handed to next_token_loop one token at a time.
+    # Unless final is set, stop before a token that reaches the end of self.source.
+    def scan_regex(self, final: bool = True) -> Iterator[Token]:
+        source = self.source
+        length = len(source)
+        match = self.master_pattern().match
+        keywords = self.KEYWORDS
+        lexeme_kinds = LEXEME_KINDS
+        symbol_ids, names, intern = self.symbols.ids, self.symbols.names, self.symbols.intern
+        simple_types = {
+            "OPERATOR": TokenType.OPERATOR,
+            "MULTI_OPERATOR": TokenType.OPERATOR,
+            "SEPARATOR": TokenType.SEPARATOR,
+            "END_STATEMENT": TokenType.END_STATEMENT,
+        }
+
+        offset = self.offset
+        position = self.position
+        while position < length:
+            m = match(source, position)
+            if m is None or (
+                # A non-ASCII digit or letter may continue the number
+                m.lastgroup == "NUMBER"
+                and m.end() < length
+                and not source[m.end()].isascii()
+            ):
+                self.position = position
+                token = self.next_token_loop()
+                if not final and self.position >= length:
+                    # The token may continue in the next chunk, scan it again later
+                    self.position = position
+                    self.pending_errors.clear()
+                    return
+                position = self.position
+                self.flush_errors()
+                if token is not None:
+                    yield token
                 continue
 
-            # Check for comments starting with :)
-            elif self.source.startswith(":)", self.position):
-                self.skip_comment()
+            if not final and m.end() >= length:
+                # The token may continue in the next chunk, scan it again later
+                break
+
+            kind = m.lastgroup
+            start = offset + position
+            position = m.end()
+            if kind == "SKIP" or kind == "COMMENT":
                 continue
 
-            # Identify string literals enclosed in double quotes
-            elif current_char == '"':
-                string_literal = (
-                    self.read_string()
-                )  # Capture entire string between quotes
-                tokens.append(Token(TokenType.LITERAL, string_literal))
-
-            # Check for end of statement "thanks~"
-            elif self.source.startswith("thanks~", self.position):
-                tokens.append(Token(TokenType.END_STATEMENT, "thanks~"))
-                self.position += len("thanks~")
-
-            # Check for multi-character operators (e.g., >=, <=, ==, !=)
-            elif any(
-                self.source.startswith(op, self.position)
-                for op in self.OPERATORS
-                if len(op) > 1
-            ):
-                for op in sorted(
-                    self.OPERATORS, key=lambda x: -len(x)
-                ):  # Sort operators by length descending
-                    if self.source.startswith(op, self.position):
-                        tokens.append(Token(TokenType.OPERATOR, op))
-                        self.position += len(op)
-                        break
-
-            # Check for single-character operators
-            elif current_char in self.OPERATORS:
-                tokens.append(Token(TokenType.OPERATOR, current_char))
-                self.position += 1
-
-            # Check for separators
-            elif current_char in self.SEPARATORS:
-                tokens.append(Token(TokenType.SEPARATOR, current_char))
-                self.position += 1
-
-            # Check for keywords or identifiers
-            elif current_char.isalpha() or current_char == "_":
-                identifier = self.read_identifier()
-                if identifier in self.KEYWORDS:
-                    tokens.append(Token(TokenType.KEYWORD, identifier))
+            text = m.group()
+            token_type = simple_types.get(kind)
+            if token_type is not None:
+                token = Token(token_type, text, start, None, lexeme_kinds[text])
+            elif kind == "WORD":
+                if text in keywords:
+                    token = Token(TokenType.KEYWORD, text, start, None, lexeme_kinds[text])
                 else:
-                    tokens.append(self.validate_identifier(identifier))
-
-            # Check for literals (numbers or strings)
-            elif current_char.isdigit():
-                number = self.read_number()
-                if (
-                    self.position < len(self.source)
-                    and self.source[self.position].isalpha()
-                ):
-                    # Handle case like "1score" where a digit is followed by an alphabetic character
-                    illegal_identifier = self.read_identifier()
-                    print(
-                        f"Error: Illegal identifier '{number + illegal_identifier}' - identifiers cannot start with a digit."
-                    )
-                    tokens.append(
-                        Token(TokenType.ILLEGAL_IDENTIFIER, number + illegal_identifier)
+                    symbol = symbol_ids.get(text)
+                    if symbol is None:
+                        symbol = intern(text)
+                    # The interned name is shared by every occurrence
+                    token = Token(
+                        TokenType.IDENTIFIER, names[symbol], start, symbol, TokenKind.IDENTIFIER
                     )
+            elif kind == "STRING":
+                if len(text) > 1 and text[-1] == '"':
+                    token = Token(TokenType.STRING, text[1:-1], start, None, TokenKind.STRING)
                 else:
-                    tokens.append(Token(TokenType.LITERAL, number))
+                    self.error("Unterminated string literal", start)
+                    self.flush_errors()
+                    # Return partial string
+                    token = Token(TokenType.STRING, text[1:], start, None, TokenKind.STRING)
+            elif m.group("ILLEGAL"):
+                self.error(
+                    f"Illegal identifier '{text}' - identifiers cannot start with a digit.",
+                    start,
+                )
+                self.flush_errors()
+                token = Token(
+                    TokenType.ILLEGAL_IDENTIFIER, text, start, None, TokenKind.ILLEGAL_IDENTIFIER
+                )
+            else:
+                token = Token(TokenType.LITERAL, text, start, None, TokenKind.LITERAL)
+            self.position = position  # Keep position just past the token being yielded
+            yield token
+        self.position = position
 
-            # # Handle unknown characters
-            # else:
-            #     tokens.append(Token(TokenType.UNKNOWN, current_char))
-            #     self.position += 1
+    # Scan one token at the current position, checking each character in turn.
+    # Returns None for skipped input (whitespace and comments).
+    def next_token_loop(self):
+        current_char = self.source[self.position]
+        self.token_start = self.offset + self.position
 
-            # Handle unknown characters
-            else:
-                print(
-                    f"Error: Unrecognized symbol '{current_char}' at position {self.position}"
+        # Skip whitespace
+        if current_char.isspace():
+            self.position += 1
+            return None
+
+        # Check for comments starting with :)
+        elif self.source.startswith(":)", self.position):
+            self.skip_comment()
+            return None
+
+        # Identify string literals enclosed in double quotes
+        elif current_char == '"':
+            string_literal = self.read_string()  # Capture entire string between quotes
+            return Token(TokenType.STRING, string_literal, self.token_start)
+
+        # Check for end of statement "thanks~"
+        elif self.source.startswith("thanks~", self.position):
+            self.position += len("thanks~")
+            return Token(TokenType.END_STATEMENT, "thanks~", self.token_start)
+
+        # Check for multi-character operators (e.g., >=, <=, ==, !=)
+        elif any(
+            self.source.startswith(op, self.position)
+            for op in self.OPERATORS
+            if len(op) > 1
+        ):
+            for op in sorted(
+                self.OPERATORS, key=lambda x: -len(x)
+            ):  # Sort operators by length descending
+                if self.source.startswith(op, self.position):
+                    self.position += len(op)
+                    return Token(TokenType.OPERATOR, op, self.token_start)
+
+        # Check for single-character operators
+        elif current_char in self.OPERATORS:
+            self.position += 1
+            return Token(TokenType.OPERATOR, current_char, self.token_start)
+
+        # Check for separators
+        elif current_char in self.SEPARATORS:
+            self.position += 1
+            return Token(TokenType.SEPARATOR, current_char, self.token_start)
+
+        # Check for keywords or identifiers
+        elif current_char.isalpha() or current_char == "_":
+            identifier = self.read_identifier()
+            if identifier in self.KEYWORDS:
+                return Token(TokenType.KEYWORD, identifier, self.token_start)
+            return self.validate_identifier(identifier)
+
+        # Check for literals (numbers or strings)
+        elif current_char.isdigit():
+            number = self.read_number()
+            if self.position < len(self.source) and self.source[self.position].isalpha():
+                # Handle case like "1score" where a digit is followed by an alphabetic character
+                illegal_identifier = self.read_identifier()
+                self.error(
+                    f"Illegal identifier '{number + illegal_identifier}' - identifiers cannot start with a digit."
                 )
-                tokens.append(Token(TokenType.UNKNOWN, current_char))
-                self.position += 1
-        return tokens
+                return Token(
+                    TokenType.ILLEGAL_IDENTIFIER, number + illegal_identifier, self.token_start
+                )
+            return Token(TokenType.LITERAL, number, self.token_start)
+
+        # Handle unknown characters
+        self.error(f"Unrecognized symbol '{current_char}'")
+        self.position += 1
+        return Token(TokenType.UNKNOWN, current_char, self.token_start)
 
     # Read an identifier (variable name) or keyword
     def read_identifier(self):
@@ -154,11 +484,18 @@ class LexicalAnalyzer:
     # Validate an identifier (checking if it starts with a digit)
     def validate_identifier(self, identifier: str) -> Token:
         if identifier[0].isdigit():
-            print(
-                f"Error: Illegal identifier '{identifier}' - identifiers cannot start with a digit."
+            self.error(
+                f"Illegal identifier '{identifier}' - identifiers cannot start with a digit."
             )
-            return Token(TokenType.ILLEGAL_IDENTIFIER, identifier)
-        return Token(TokenType.IDENTIFIER, identifier)
+            return Token(TokenType.ILLEGAL_IDENTIFIER, identifier, self.token_start)
+        symbol = self.symbols.intern(identifier)
+        return Token(
+            TokenType.IDENTIFIER,
+            self.symbols.names[symbol],
+            self.token_start,
+            symbol,
+            TokenKind.IDENTIFIER,
+        )
 
     # Read a number (integer or float)
     def read_number(self):
@@ -182,15 +519,218 @@ class LexicalAnalyzer:
 
         # Error handling for missing closing quote
         if self.position >= len(self.source) or self.source[self.position] != '"':
-            print("Error: Unterminated string literal")  # Error message
+            self.error("Unterminated string literal")  # Error message
             return self.source[start : self.position]  # Return partial string
 
         string_literal = self.source[start : self.position]
         self.position += 1  # Skip the closing quote
         return string_literal
 
+    # Scan a MappedSource with the bytes master pattern and yield SpanTokens whose
+    # start/end are byte offsets of the token value; no lexeme strings are created.
+    # Non-ASCII input outside string literals and comments is decoded and handed
+    # to next_token_loop, so the tokens match those of the str engines.
+    def iter_span_tokens(self, source: "MappedSource") -> Iterator["SpanToken"]:
+        buffer = source.buffer
+        length = len(buffer)
+        match = self.master_bytes_pattern().match
+        simple_types = {
+            "KEYWORD": TokenType.KEYWORD,
+            "WORD": TokenType.IDENTIFIER,
+            "OPERATOR": TokenType.OPERATOR,
+            "MULTI_OPERATOR": TokenType.OPERATOR,
+            "SEPARATOR": TokenType.SEPARATOR,
+            "END_STATEMENT": TokenType.END_STATEMENT,
+        }
+
+        position = 0
+        while position < length:
+            m = match(buffer, position)
+            if m is None or (
+                # A non-ASCII character may continue the word or number
+                m.lastgroup in ("KEYWORD", "WORD", "NUMBER")
+                and m.end() < length
+                and buffer[m.end()] >= 0x80
+            ):
+                token, end = self.scan_mapped_fallback(source, position)
+                if token is not None:
+                    yield token
+                position = end
+                continue
+
+            kind = m.lastgroup
+            start = position
+            position = m.end()
+            if kind == "SKIP" or kind == "COMMENT":
+                continue
+
+            token_type = simple_types.get(kind)
+            if token_type is not None:
+                yield SpanToken(token_type, start, position, source)
+            elif kind == "STRING":
+                if position - start > 1 and buffer[position - 1] == 0x22:
+                    yield SpanToken(TokenType.STRING, start + 1, position - 1, source)
+                else:
+                    self.diagnostics.report("lexical", "Unterminated string literal", start)
+                    yield SpanToken(TokenType.STRING, start + 1, position, source)
+            elif m.start("ILLEGAL") != -1:
+                self.diagnostics.report(
+                    "lexical",
+                    f"Illegal identifier '{source.text(start, position)}' - identifiers cannot start with a digit.",
+                    start,
+                )
+                yield SpanToken(TokenType.ILLEGAL_IDENTIFIER, start, position, source)
+            else:
+                yield SpanToken(TokenType.LITERAL, start, position, source)
+
+    # Decode the word-like run at a byte position of a MappedSource and scan one
+    # token of it with next_token_loop. Returns (token or None, end byte offset).
+    def scan_mapped_fallback(self, source: "MappedSource", position: int):
+        window_end = re.compile(rb"(?s:.)[\w.\x80-\xff]*").match(
+            source.buffer, position
+        ).end()
+        window = source.buffer[position:window_end].decode("utf-8", "surrogateescape")
+        lexer = LexicalAnalyzer(window, diagnostics=self.diagnostics, symbols=self.symbols)
+        lexer.offset = position
+        token = lexer.next_token_loop()
+        lexer.flush_errors()
+        end = position + len(
+            window[: lexer.position].encode("utf-8", "surrogateescape")
+        )
+        if token is None:
+            return None, end
+        return SpanToken(token.type, position, end, source), end
+
+    # Record a lexical error for the token being scanned, located at its start
+    # unless an offset is given
+    def error(self, message: str, offset: Optional[int] = None):
+        self.pending_errors.append((message, self.token_start if offset is None else offset))
+
+    # Report the errors of a token to the diagnostics once it is kept in the token stream
+    def flush_errors(self):
+        for message, offset in self.pending_errors:
+            self.diagnostics.report("lexical", message, offset)
+        self.pending_errors.clear()
+
     # Skip a comment line starting with :)
     def skip_comment(self):
         while self.position < len(self.source) and self.source[self.position] != "\n":
             self.position += 1
-        self.position += 1  # Skip the newline character
\ No newline at end of file
+        self.position += 1  # Skip the newline character
+
+# Token stored as the byte span of its value in a MappedSource; the value
+# string is decoded only when token.value is read
+class SpanToken:
+    __slots__ = ("type", "start", "end", "source", "kind")
+    symbol = None  # Span tokens are not interned; the Parser interns their names
+
+    def __init__(self, type: TokenType, start: int, end: int, source: "MappedSource"):
+        self.type = type
+        self.start = start  # Byte offset where the value starts
+        self.end = end  # Byte offset just past the value
+        self.source = source
+        # TokenKind, from the type or the lexeme's bytes without decoding them
+        kind = TYPE_KINDS.get(type)
+        if kind is None:
+            kind = LEXEME_BYTES_KINDS.get(source.buffer[start:end], TokenKind.UNKNOWN)
+        self.kind = kind
+
+    @property
+    def value(self) -> str:
+        return self.source.text(self.start, self.end)
+
+    def __str__(self):
+        return f"Type: {self.type.value}, Value: {self.value}"
+
+
+# Read-only memory map of a UTF-8 source file. Lexemes are decoded on demand
+# and line/column numbers of byte offsets come from a SourceMap of the buffer,
+# whose newline index is built on first use.
+class MappedSource:
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "rb")
+        if os.fstat(self.file.fileno()).st_size:
+            self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.buffer = b""  # Empty files cannot be mapped
+        self.source_map = SourceMap(self.buffer)
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def text(self, start: int, end: int) -> str:
+        return self.buffer[start:end].decode("utf-8", "surrogateescape")
+
+    # Return the 1-based (line, column) of a byte offset
+    def line_col(self, offset: int):
+        return self.source_map.line_col(offset)
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Columnar token storage: one type code byte per token in an array('B') plus
+# the start offset of the token and the end offset of its value in the source,
+# instead of a Token object and a value string per token. Tokens are
+# materialized only when accessed.
+class TokenBuffer:
+    TYPES = list(TokenType)  # Type code -> TokenType
+    CODES = {token_type: code for code, token_type in enumerate(TYPES)}
+
+    def __init__(self, source: str):
+        self.source = source
+        offset_code = "I" if len(source) <= 0xFFFFFFFF else "Q"
+        self.types = array("B")
+        self.starts = array(offset_code)
+        self.ends = array(offset_code)
+
+    # Lex the source and store every token's type code and offsets
+    @classmethod
+    def from_source(cls, source: str, engine: str = "regex") -> "TokenBuffer":
+        buffer = cls(source)
+        codes = cls.CODES
+        types, starts, ends = buffer.types, buffer.starts, buffer.ends
+        lexer = LexicalAnalyzer(source, engine=engine)
+        for token in lexer.iter_tokens():
+            # The lexer stops just past the token; string values exclude the closing quote
+            end = lexer.position
+            if (
+                token.type == TokenType.STRING
+                and end - 1 > token.start
+                and source[end - 1] == '"'
+            ):
+                end -= 1
+            types.append(codes[token.type])
+            starts.append(token.start)
+            ends.append(end)
+        return buffer
+
+    def __len__(self):
+        return len(self.types)
+
+    def token_type(self, index: int) -> TokenType:
+        return self.TYPES[self.types[index]]
+
+    def value(self, index: int) -> str:
+        start = self.starts[index]
+        if self.source[start] == '"':  # String literal: the value starts after the quote
+            start += 1
+        return self.source[start : self.ends[index]]
+
+    def __getitem__(self, index: int) -> Token:
+        return Token(self.token_type(index), self.value(index), self.starts[index])
+
+    def __iter__(self) -> Iterator[Token]:
+        types, source, all_types = self.types, self.source, self.TYPES
+        for code, start, end in zip(types, self.starts, self.ends):
+            value_start = start + 1 if source[start] == '"' else start
+            yield Token(all_types[code], source[value_start:end], start)
@@ -1,9 +1,50 @@
+import argparse
 import os
+import sys
+from backends import BACKENDS, BackendError, load_backend
+from diagnostics import Diagnostics
+from instrumentation import NULL, create
 from lexical import LexicalAnalyzer
-from syntax import Parser, SyntaxError
+from sourcemap import SourceMap, open_source
+from symbols import SymbolTable
+from syntax import Parser
 
+# Phases of compile_program that can be timed and profiled
+PHASES = ("lex", "parse", "output")
+
+
+def main(argv=None):
+    options = argparse.ArgumentParser(description="Compile a PoliteLang test case interactively.")
+    options.add_argument(
+        "--report", default=None, help="write per-phase timings and counts to this JSON file"
+    )
+    options.add_argument(
+        "--trace-memory", action="store_true", help="record peak memory per phase in the report (tracemalloc)"
+    )
+    options.add_argument(
+        "--profile",
+        action="append",
+        default=[],
+        choices=PHASES,
+        help="capture a cProfile of this phase in the report (repeatable)",
+    )
+    options.add_argument(
+        "-b",
+        "--backend",
+        action="append",
+        default=None,
+        choices=sorted(BACKENDS),
+        help="AST output backend (repeatable; default: text). 'pretty' draws the "
+        "tree with PrettyPrintTree",
+    )
+    options.add_argument(
+        "--no-ast", action="store_true", help="print no AST at all (headless)"
+    )
+    args = options.parse_args(argv)
+    if (args.trace_memory or args.profile) and not args.report:
+        options.error("--trace-memory and --profile are recorded in the report; add --report FILE")
+    backends = [] if args.no_ast else args.backend or ["text"]
 
-def main():
     test_cases_folder = "Test-Cases"
 
     # Ensure the folder exists
@@ -39,20 +80,35 @@ def main():
         except ValueError:
             print("Invalid input. Please enter a number.")
 
-    # Read the selected program
+    print(f"\nCompiling '{selected_file}'...\n")
+
     file_path = os.path.join(test_cases_folder, selected_file)
+    instrumentation = create(args.report, args.trace_memory, args.profile)
     try:
-        with open(file_path, "r") as file:
-            source_code = file.read()
-    except Exception as e:
-        print(f"Error reading file '{selected_file}': {e}")
-        return
+        compile_program(file_path, selected_file, instrumentation, backends)
+    finally:
+        if args.report:
+            instrumentation.write_report(args.report)
+            print(f"\nInstrumentation report written to '{args.report}'")
+        instrumentation.close()
 
-    print(f"\nCompiling '{selected_file}'...\n")
 
-    # Perform lexical analysis
-    lexer = LexicalAnalyzer(source_code)
-    tokens = lexer.tokenize()
+# Lex, parse and display one program with the given output backends, timing
+# each phase. Only the selected backends are imported.
+def compile_program(file_path, selected_file, instrumentation=NULL, backends=("text",)):
+    # Perform lexical analysis, reading the selected program in chunks
+    # Lexical and syntax errors, reported after each phase by line and column
+    diagnostics = Diagnostics(SourceMap(path=file_path))
+    symbols = SymbolTable()  # Shared by the lexer and parser
+    lexer = LexicalAnalyzer(diagnostics=diagnostics, symbols=symbols)
+    try:
+        with instrumentation.phase("lex"), open_source(file_path) as file:
+            tokens = list(instrumentation.count_tokens(lexer.iter_tokens(file)))
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Error reading file '{selected_file}': {e}")
+        return
+    diagnostics.emit()
+    diagnostics.clear()
 
     print("Tokens generated by the lexical analyzer:")
     for token in tokens:
@@ -60,14 +116,23 @@ def main():
 
     print("\n--- Syntax Analysis ---\n")
 
-    # Perform syntax analysis
-    parser = Parser(tokens)
-    try:
+    # Perform syntax analysis, recovering from errors to report all of them
+    parser = Parser(tokens, diagnostics, symbols)
+    with instrumentation.phase("parse"):
         ast = parser.parse_program()
-        parser.display_ast(ast)  # Display the tree-like structure of the AST
-        parser.visualize_ast(ast)  # Visualize the AST using PrettyPrintTree
-    except SyntaxError as e:
-        print(f"Syntax Error: {e}")
+    instrumentation.count_nodes(ast)
+    if diagnostics:
+        print(f"Syntax Error: {len(diagnostics)} error(s) found")
+        diagnostics.emit()
+        return
+    for backend in backends:
+        try:
+            render = load_backend(backend)
+        except BackendError as e:
+            print(f"Error: {e}")
+            continue
+        with instrumentation.phase("output"):
+            render(ast, sys.stdout)
 
 
 if __name__ == "__main__":
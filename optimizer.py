@@ -0,0 +1,670 @@
+import argparse
+import sys
+import time
+from typing import Dict, List, Optional, Set
+
+from hashcons import PLAIN_CLASSES
+from interpreter import BINARY_OPERATORS, UNSET, literal_value
+from render import walk
+from symbols import SymbolTable
+from syntax import ASTNode, AssignmentNode, IdentifierNode, IfNode
+
+# Optimization passes over the statement AST, run in order by a PassManager.
+# Every pass returns a new statement list and never modifies the nodes it is
+# given: changed nodes are copied and unchanged subtrees are shared, so the
+# parser's tree stays valid. The passes preserve the output of programs that
+# run without runtime errors; a program that fails may fail differently.
+# Temporaries introduced by cse and licm are variables named $cse<n> and
+# $licm<n>, which no source identifier can collide with.
+
+
+# Value of a Literal, String or Boolean node as the interpreter sees it, or UNSET
+def constant_value(node: ASTNode):
+    if node.type == "Literal":
+        return literal_value(node.value)
+    if node.type == "String":
+        return node.value
+    if node.type == "Boolean":
+        return node.value == "yep"
+    return UNSET
+
+
+# Literal, String or Boolean node for a value, or None when no literal reads
+# back as exactly that value (e.g. negative numbers, which the lexer has no
+# literal for)
+def constant_node(value) -> Optional[ASTNode]:
+    if isinstance(value, bool):
+        return ASTNode("Boolean", "yep" if value else "nah")
+    if isinstance(value, str):
+        return ASTNode("String", value)
+    text = repr(value) if isinstance(value, float) else str(value)
+    parsed = literal_value(text)
+    if type(parsed) is not type(value) or parsed != value:
+        return None
+    return ASTNode("Literal", text)
+
+
+def same_constant(node: ASTNode, other: Optional[ASTNode]) -> bool:
+    return other is not None and node.type == other.type and node.value == other.value
+
+
+# A copy of `node` with other children, or `node` itself when they are the same
+def rebuild(node: ASTNode, children: List[ASTNode]) -> ASTNode:
+    if len(children) == len(node.children) and all(
+        new is old for new, old in zip(children, node.children)
+    ):
+        return node
+    cls = type(node)
+    copy = object.__new__(PLAIN_CLASSES.get(cls, cls))  # Shared nodes are copied as plain nodes
+    copy.type = node.type
+    copy.value = node.value
+    copy.children = children
+    return copy
+
+
+def block_node(statements: List[ASTNode]) -> ASTNode:
+    block = ASTNode("Block")
+    if statements:
+        block.children = statements
+    return block
+
+
+# Symbols of every variable assigned anywhere in the statements, including
+# the variables of Given loops
+def assigned_symbols(statements) -> Set[int]:
+    symbols = set()
+    for node, _, _, _ in walk(statements):
+        if node.type == "Assignment" or node.type == "ForEach":
+            symbols.add(node.children[0].symbol)
+    return symbols
+
+
+# Whether running the statement can write output
+def prints(statement: ASTNode) -> bool:
+    return any(node.type.endswith("Print") for node, _, _, _ in walk((statement,)))
+
+
+def count_nodes(statements) -> int:
+    return sum(1 for _ in walk(statements))
+
+
+# Fresh variable named `$<prefix><n>`, interned into the program's table
+def temporary(symbols: SymbolTable, prefix: str) -> IdentifierNode:
+    number = 1
+    while f"${prefix}{number}" in symbols:
+        number += 1
+    name = f"${prefix}{number}"
+    return IdentifierNode(name, symbols.intern(name))
+
+
+# Expressions each statement evaluates once, in the current state, by child index
+EVALUATED_CHILDREN = {
+    "Assignment": (1,),
+    "ShowPrint": (0,),
+    "WhisperPrint": (0,),
+    "ShoutPrint": (0,),
+    "If": (0,),
+    "ForEach": (1,),
+}
+
+
+# Base class of the passes. `counters` collects what the pass changed, for
+# the statistics of the PassManager.
+class OptimizationPass:
+    name = ""
+
+    def __init__(self):
+        self.counters: Dict[str, int] = {}
+
+    def count(self, counter: str, amount: int = 1):
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def run(self, statements: List[ASTNode], symbols: SymbolTable) -> List[ASTNode]:
+        raise NotImplementedError
+
+
+# Replace reads of variables that hold a known constant with the constant,
+# and fold operations on constants with the interpreter's operators. Values
+# flow forward through each block; a Check merges the constants both branches
+# agree on, and variables assigned inside a loop are unknown in and after it.
+class ConstantPropagation(OptimizationPass):
+    name = "constant-propagation"
+
+    def run(self, statements, symbols):
+        return self.block(statements, {})
+
+    # `constants` (symbol -> constant node) is updated to the state after the block
+    def block(self, statements, constants: Dict[int, ASTNode]) -> List[ASTNode]:
+        return [self.statement(statement, constants) for statement in statements]
+
+    def statement(self, node: ASTNode, constants: Dict[int, ASTNode]) -> ASTNode:
+        children = node.children
+        if node.type == "Assignment":
+            target = children[0]
+            expression = self.expression(children[1], constants)
+            if constant_value(expression) is UNSET:
+                constants.pop(target.symbol, None)
+            else:
+                constants[target.symbol] = expression
+            return rebuild(node, [target, expression])
+
+        if node.type == "If":
+            condition = self.expression(children[0], constants)
+            branches, states = [], []
+            for block in children[1:]:
+                state = dict(constants)
+                branches.append(rebuild(block, self.block(block.children, state)))
+                states.append(state)
+            if len(states) == 1:
+                states.append(dict(constants))  # No otherwise: nothing runs
+            value = constant_value(condition)
+            if value is not UNSET:
+                merged = states[0] if value else states[1]
+            else:
+                merged = {
+                    symbol: constant
+                    for symbol, constant in states[0].items()
+                    if same_constant(constant, states[1].get(symbol))
+                }
+            constants.clear()
+            constants.update(merged)
+            return rebuild(node, [condition, *branches])
+
+        if node.type == "While" or node.type == "ForEach":
+            iterable = self.expression(children[1], constants) if node.type == "ForEach" else None
+            for symbol in assigned_symbols((node,)):
+                constants.pop(symbol, None)
+            body = children[-1]
+            body = rebuild(body, self.block(body.children, dict(constants)))
+            if node.type == "ForEach":
+                return rebuild(node, [children[0], iterable, body])
+            return rebuild(node, [self.expression(children[0], constants), body])
+
+        return rebuild(node, [self.expression(child, constants) for child in children])
+
+    # Rewritten bottom-up with an explicit stack so long expressions don't recurse
+    def expression(self, root: ASTNode, constants: Dict[int, ASTNode]) -> ASTNode:
+        results = []  # Rewritten subtrees whose parent is not rewritten yet
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if node.type == "Identifier":
+                constant = constants.get(node.symbol)
+                if constant is not None:
+                    self.count("propagated")
+                results.append(node if constant is None else constant)
+                continue
+            count = len(node.children)
+            if count and not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node.children))
+                continue
+            children = []
+            if count:
+                children = results[-count:]
+                del results[-count:]
+            results.append(self.fold(node, children))
+        return results[0]
+
+    # `node` with its rewritten children, folded when it is an operation on constants
+    def fold(self, node: ASTNode, children: List[ASTNode]) -> ASTNode:
+        if node.type != "BinaryOperation":  # Literals, or the items of a list or range
+            return rebuild(node, children)
+        left, right = children
+        function = BINARY_OPERATORS.get(node.value)
+        left_value, right_value = constant_value(left), constant_value(right)
+        if function is not None and left_value is not UNSET and right_value is not UNSET:
+            try:
+                folded = constant_node(function(left_value, right_value))
+            except (TypeError, ValueError, ZeroDivisionError, OverflowError):
+                folded = None  # Left to fail at run time (e.g. 1 / 0, or a huge int / 3)
+            if folded is not None:
+                self.count("folded")
+                return folded
+        return rebuild(node, [left, right])
+
+
+# Remove Check statements with a constant condition, keeping the statements
+# of the branch that runs, and During loops whose condition is always false
+class DeadBranchElimination(OptimizationPass):
+    name = "dead-branch-elimination"
+
+    def run(self, statements, symbols):
+        return self.block(statements)
+
+    def block(self, statements) -> List[ASTNode]:
+        result = []
+        for node in statements:
+            children = node.children
+            if node.type == "If":
+                value = constant_value(children[0])
+                if value is not UNSET:
+                    self.count("branches_removed")
+                    taken = children[1] if value else children[2] if len(children) > 2 else None
+                    if taken is not None:
+                        result.extend(self.block(taken.children))
+                    continue
+                branches = [rebuild(block, self.block(block.children)) for block in children[1:]]
+                node = rebuild(node, [children[0], *branches])
+            elif node.type == "While":
+                value = constant_value(children[0])
+                if value is not UNSET and not value:
+                    self.count("loops_removed")
+                    continue
+                node = rebuild(node, [children[0], rebuild(children[1], self.block(children[1].children))])
+            elif node.type == "ForEach":
+                node = rebuild(node, [*children[:2], rebuild(children[2], self.block(children[2].children))])
+            result.append(node)
+        return result
+
+
+# Common-subexpression elimination by value numbering. Within each block,
+# operations that compute the same value more than once (same operator and
+# operands, and no assignment to their variables in between) are computed
+# once into a temporary before the statement that first needs them. Only
+# expressions that read a variable are considered; the interpreter already
+# folds the others. Loop conditions, evaluated once per iteration, are left
+# to licm.
+class CommonSubexpressionElimination(OptimizationPass):
+    name = "cse"
+
+    def run(self, statements, symbols):
+        self.symbols = symbols
+        return self.block(statements)
+
+    def block(self, statements) -> List[ASTNode]:
+        statements = [self.nested(statement) for statement in statements]
+
+        # Number every operation evaluated directly by the block's statements
+        numbers: Dict[tuple, int] = {}  # Structure -> value number
+        versions: Dict[int, int] = {}  # Symbol -> number of assignments so far
+        shapes: List[tuple] = []  # Value number -> (operator, left, right) numbers
+        sizes: List[int] = []  # Value number -> operations in the expression
+        variable: List[bool] = []  # Value number -> reads a variable
+        occurrences: Dict[int, int] = {}
+        order: List[tuple] = []  # (value number, nodes in the subtree) in preorder
+
+        # Number an expression bottom-up with an explicit stack, recording
+        # each node in `order` in preorder
+        def number(root: ASTNode):
+            results = []  # Value numbers of subtrees whose parent is not numbered yet
+            stack = [(root, None)]  # (node, its position in `order` once visited)
+            while stack:
+                node, position = stack.pop()
+                if position is None:
+                    position = len(order)
+                    order.append(None)
+                    if node.children:
+                        stack.append((node, position))
+                        stack.extend((child, None) for child in reversed(node.children))
+                        continue
+                children = ()
+                if node.children:
+                    children = tuple(results[-len(node.children):])
+                    del results[-len(node.children):]
+                if node.type == "Identifier":
+                    key = ("Identifier", node.symbol, versions.get(node.symbol, 0))
+                elif node.type == "BinaryOperation":
+                    key = (node.value, *children)
+                else:  # Literals, lists and ranges
+                    key = (node.type, node.value, *children)
+                value_number = numbers.get(key)
+                if value_number is None:
+                    value_number = numbers[key] = len(shapes)
+                    shapes.append(children)
+                    sizes.append(1 + sum(sizes[child] for child in children) if children else 0)
+                    variable.append(
+                        node.type == "Identifier" or any(variable[child] for child in children)
+                    )
+                if node.type == "BinaryOperation":
+                    occurrences[value_number] = occurrences.get(value_number, 0) + 1
+                order[position] = (value_number, len(order) - position)
+                results.append(value_number)
+
+        for node in statements:
+            for index in EVALUATED_CHILDREN.get(node.type, ()):
+                number(node.children[index])
+            if node.type == "Assignment":
+                symbol = node.children[0].symbol
+                versions[symbol] = versions.get(symbol, 0) + 1
+            elif node.type in ("If", "While", "ForEach"):
+                for symbol in assigned_symbols((node,)):
+                    versions[symbol] = versions.get(symbol, 0) + 1
+
+        # Largest expressions first: once one is shared, the copies of its
+        # parts inside the other occurrences are no longer evaluated
+        shared = set()
+        for value_number in sorted(occurrences, key=lambda n: -sizes[n]):
+            count = occurrences[value_number]
+            if count < 2 or not variable[value_number]:
+                continue
+            shared.add(value_number)
+            parts: Dict[int, int] = {}
+            stack = list(shapes[value_number])
+            while stack:
+                part = stack.pop()
+                if part in occurrences:
+                    parts[part] = parts.get(part, 0) + 1
+                    stack.extend(shapes[part])
+            for part, multiplicity in parts.items():
+                occurrences[part] -= (count - 1) * multiplicity
+        if not shared:
+            return statements
+
+        temporaries: Dict[int, IdentifierNode] = {}
+        result: List[ASTNode] = []
+        cursor = 0  # Position in `order` of the node being replaced
+
+        # Nodes are visited in the order they were numbered, with an explicit
+        # stack; a shared operation is assigned to its temporary once its
+        # operands are rewritten
+        def replace(root: ASTNode) -> ASTNode:
+            nonlocal cursor
+            results = []  # Rewritten subtrees whose parent is not rewritten yet
+            stack = [(root, None)]  # (node, its value number once visited)
+            while stack:
+                node, value_number = stack.pop()
+                if value_number is None:
+                    value_number, span = order[cursor]
+                    if value_number in temporaries:
+                        cursor += span
+                        self.count("eliminated")
+                        results.append(temporaries[value_number])
+                        continue
+                    cursor += 1
+                    if node.children:
+                        stack.append((node, value_number))
+                        stack.extend((child, None) for child in reversed(node.children))
+                        continue
+                children = []
+                if node.children:
+                    children = results[-len(node.children):]
+                    del results[-len(node.children):]
+                expression = rebuild(node, children)
+                if value_number in shared:
+                    temporary_node = temporaries[value_number] = temporary(self.symbols, "cse")
+                    result.append(AssignmentNode(temporary_node, expression))
+                    self.count("temporaries")
+                    expression = temporary_node
+                results.append(expression)
+            return results[0]
+
+        for node in statements:
+            evaluated = EVALUATED_CHILDREN.get(node.type, ())
+            children = [
+                replace(child) if index in evaluated else child
+                for index, child in enumerate(node.children)
+            ]
+            result.append(rebuild(node, children))
+        return result
+
+    # Optimize the blocks inside a statement on their own
+    def nested(self, node: ASTNode) -> ASTNode:
+        if node.type not in ("If", "While", "ForEach"):
+            return node
+        children = [
+            rebuild(child, self.block(child.children)) if child.type == "Block" else child
+            for child in node.children
+        ]
+        return rebuild(node, children)
+
+
+# Loop-invariant code motion. Operations in a During condition or evaluated
+# directly by the statements of a loop body (not inside nested blocks, which
+# may not run) whose variables the loop never assigns are computed once
+# before the loop. Only statements before the first one that can print are
+# considered: a hoisted operation may raise (1 / 0, "a" - 1), and must not do
+# so before output the loop would have written first. The loop is wrapped in a Check of its condition (During)
+# or of the sequence it walks (Given), so nothing is computed for a loop
+# that does not run:
+#     During (c) { body }  ->  Check (c) { pls $licm1 = ... thanks~ During (c) { body } }
+# Inner loops are optimized first.
+class LoopInvariantCodeMotion(OptimizationPass):
+    name = "licm"
+
+    def run(self, statements, symbols):
+        self.symbols = symbols
+        return self.block(statements)
+
+    def block(self, statements) -> List[ASTNode]:
+        result = []
+        for node in statements:
+            if node.type in ("If", "While", "ForEach"):
+                node = rebuild(
+                    node,
+                    [
+                        rebuild(child, self.block(child.children)) if child.type == "Block" else child
+                        for child in node.children
+                    ],
+                )
+            if node.type == "While" or node.type == "ForEach":
+                node = self.hoist(node, result)
+            result.append(node)
+        return result
+
+    # Rewrite one loop, appending any statements that must run before the
+    # returned statement to `result`
+    def hoist(self, loop: ASTNode, result: List[ASTNode]) -> ASTNode:
+        body = loop.children[-1]
+        assigned = assigned_symbols((loop,))
+        temporaries: Dict[tuple, IdentifierNode] = {}
+        hoisted: List[ASTNode] = []
+
+        # The rewritten expression, whether the loop leaves its value
+        # unchanged, and whether it reads a variable. Invariant operations are
+        # hoisted by the first operation above them that is not invariant.
+        # Scanned bottom-up with an explicit stack so long expressions don't recurse.
+        def scan(root: ASTNode):
+            results = []  # Scanned subtrees whose parent is not scanned yet
+            stack = [(root, False)]
+            while stack:
+                node, expanded = stack.pop()
+                if node.type == "Identifier":
+                    results.append((node, node.symbol not in assigned, True))
+                    continue
+                count = len(node.children)
+                if count and not expanded:
+                    stack.append((node, True))
+                    stack.extend((child, False) for child in reversed(node.children))
+                    continue
+                scanned = []
+                if count:
+                    scanned = results[-count:]
+                    del results[-count:]
+                if all(invariant for _, invariant, _ in scanned) and (
+                    node.type != "BinaryOperation" or node.value in BINARY_OPERATORS
+                ):
+                    results.append((node, True, any(reads for _, _, reads in scanned)))
+                else:
+                    results.append((rebuild(node, [hoist(*child) for child in scanned]), False, True))
+            return results[0]
+
+        def hoist(node: ASTNode, invariant: bool, reads: bool) -> ASTNode:
+            if not (invariant and reads and node.type == "BinaryOperation"):
+                return node
+            key = structure(node)
+            temporary_node = temporaries.get(key)
+            if temporary_node is None:
+                temporary_node = temporaries[key] = temporary(self.symbols, "licm")
+                hoisted.append(AssignmentNode(temporary_node, node))
+            self.count("hoisted")
+            return temporary_node
+
+        def replace(node: ASTNode) -> ASTNode:
+            return hoist(*scan(node))
+
+        statements = []
+        printed = False  # An earlier statement of the body can print
+        for node in body.children:
+            if printed:
+                statements.append(node)
+                continue
+            evaluated = EVALUATED_CHILDREN.get(node.type, ())
+            children = [
+                replace(child) if index in evaluated else child
+                for index, child in enumerate(node.children)
+            ]
+            statements.append(rebuild(node, children))
+            printed = prints(node)
+        if loop.type == "While":
+            condition = loop.children[0]
+            rewritten, invariant, _ = scan(condition)
+            if invariant:  # The loop runs never or forever; nothing to gain
+                rewritten = condition
+            rewritten = rebuild(loop, [rewritten, rebuild(body, statements)])
+        else:
+            rewritten = rebuild(loop, [*loop.children[:2], rebuild(body, statements)])
+        if not hoisted:
+            return loop
+
+        self.count("loops")
+        if loop.type == "While":
+            guard = condition
+        else:
+            iterable = rewritten.children[1]
+            if iterable.type == "BinaryOperation":  # Evaluate the sequence once
+                sequence = temporary(self.symbols, "licm")
+                result.append(AssignmentNode(sequence, iterable))
+                iterable = sequence
+                rewritten = rebuild(rewritten, [rewritten.children[0], sequence, rewritten.children[2]])
+            guard = iterable
+        return IfNode(guard, block_node([*hoisted, rewritten]))
+
+
+# Hashable structure of an expression, for matching equal expressions: its
+# nodes in preorder with their child counts. The key is flat, so deep
+# expressions neither recurse here nor when the key is hashed or compared.
+def structure(node: ASTNode) -> tuple:
+    return tuple(
+        ("Identifier", item.symbol)
+        if item.type == "Identifier"
+        else (item.type, item.value, len(item.children))
+        for item, _, _, _ in walk((node,))
+    )
+
+
+PASSES = {
+    optimization.name: optimization
+    for optimization in (
+        ConstantPropagation,
+        DeadBranchElimination,
+        CommonSubexpressionElimination,
+        LoopInvariantCodeMotion,
+    )
+}
+
+DEFAULT_PASSES = tuple(PASSES)
+
+
+# What one pass did: its time, the AST size around it and its counters
+class PassStats:
+    __slots__ = ("name", "seconds", "nodes_before", "nodes_after", "counters")
+
+    def __init__(self, name: str, seconds: float, nodes_before: int, nodes_after: int, counters: dict):
+        self.name = name
+        self.seconds = seconds
+        self.nodes_before = nodes_before
+        self.nodes_after = nodes_after
+        self.counters = counters
+
+    def as_dict(self) -> dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __str__(self):
+        counters = ", ".join(f"{key} {value:,}" for key, value in sorted(self.counters.items()))
+        return (
+            f"{self.name:<24} {self.seconds * 1000:8.2f} ms  "
+            f"nodes {self.nodes_before:,} -> {self.nodes_after:,}  {counters or 'no changes'}"
+        )
+
+
+# Runs optimization passes in order over a program's statements, recording
+# PassStats for each. `symbols` must be the table the program was parsed
+# with, so temporaries get IDs of their own; `temporaries` holds the names of
+# those the passes introduced, e.g. to leave them out of the final variables.
+class PassManager:
+    def __init__(self, symbols: SymbolTable, passes=DEFAULT_PASSES):
+        unknown = [name for name in passes if name not in PASSES]
+        if unknown:
+            raise ValueError(
+                f"Unknown optimization pass(es) {', '.join(unknown)} "
+                f"(available: {', '.join(PASSES)})"
+            )
+        self.symbols = symbols
+        self.passes = [PASSES[name]() for name in passes]
+        self.stats: List[PassStats] = []
+        self.temporaries: Set[str] = set()
+
+    def run(self, statements: List[ASTNode]) -> List[ASTNode]:
+        statements = list(statements)
+        nodes = count_nodes(statements)
+        known = len(self.symbols)  # The passes intern nothing but their temporaries
+        for optimization in self.passes:
+            optimization.counters = {}
+            start = time.perf_counter()
+            statements = optimization.run(statements, self.symbols)
+            seconds = time.perf_counter() - start
+            after = count_nodes(statements)
+            self.stats.append(PassStats(optimization.name, seconds, nodes, after, optimization.counters))
+            nodes = after
+        self.temporaries.update(self.symbols.names[known:])
+        return statements
+
+    def format_stats(self) -> str:
+        return "\n".join(str(stats) for stats in self.stats)
+
+
+# Optimize a parsed program with the default passes
+def optimize(statements: List[ASTNode], symbols: SymbolTable, passes=DEFAULT_PASSES) -> List[ASTNode]:
+    return PassManager(symbols, passes).run(statements)
+
+
+def main(argv=None):
+    import json
+
+    from diagnostics import Diagnostics
+    from lexical import LexicalAnalyzer
+    from render import render_text
+    from sourcemap import SourceMap, open_source
+    from syntax import Parser, SyntaxError, raise_for_errors
+
+    parser = argparse.ArgumentParser(
+        description="Optimize a PoliteLang program's AST and report what each pass did."
+    )
+    parser.add_argument("program", help="PoliteLang source file")
+    parser.add_argument(
+        "--passes",
+        default=",".join(DEFAULT_PASSES),
+        help=f"comma-separated passes to run in order (default: {','.join(DEFAULT_PASSES)})",
+    )
+    parser.add_argument("--show", action="store_true", help="print the optimized AST")
+    parser.add_argument("--json", action="store_true", help="print the statistics as JSON")
+    args = parser.parse_args(argv)
+
+    diagnostics = Diagnostics(SourceMap(path=args.program))
+    try:
+        with open_source(args.program) as file:
+            symbols = SymbolTable()
+            lexer = LexicalAnalyzer(engine="regex", diagnostics=diagnostics, symbols=symbols)
+            statements = Parser(lexer.iter_tokens(file), diagnostics, symbols).parse_program()
+        raise_for_errors(diagnostics)
+        manager = PassManager(symbols, [name for name in args.passes.split(",") if name])
+    except SyntaxError as e:
+        print(f"Syntax Error: {e}")
+        return 1
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+
+    statements = manager.run(statements)
+    if args.show:
+        render_text(statements, sys.stdout, separate=True)
+    if args.json:
+        print(json.dumps([stats.as_dict() for stats in manager.stats], indent=2))
+    else:
+        print(manager.format_stats())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
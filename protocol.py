@@ -0,0 +1,51 @@
+import os
+import socket
+import struct
+import tempfile
+
+# Wire format of the compile daemon (daemon.py) and its client (client.py):
+# every message is a frame of a 4-byte big-endian payload length followed by
+# the payload. Requests are JSON objects; responses are marshal-encoded dicts
+# holding the columnar token and AST encodings of cache.py. Only light stdlib
+# modules are imported here (not asyncio), so the client starts quickly.
+
+HEADER = struct.Struct("!I")
+
+# Largest payload accepted in either direction
+MAX_FRAME = 256 * 1024 * 1024
+
+# Socket of the current user's daemon unless --socket says otherwise
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), f"politelang-{os.getuid()}.sock")
+
+
+class ProtocolError(Exception):
+    pass
+
+
+# Length-prefixed frame of a payload
+def frame(payload: bytes) -> bytes:
+    if len(payload) > MAX_FRAME:
+        raise ProtocolError(f"Message of {len(payload):,} bytes exceeds {MAX_FRAME:,}")
+    return HEADER.pack(len(payload)) + payload
+
+
+def send_frame(sock: socket.socket, payload: bytes):
+    sock.sendall(frame(payload))
+
+
+def recv_exactly(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(min(size - len(data), 1024 * 1024))
+        if not chunk:
+            raise ProtocolError("Connection closed by the daemon")
+        data += chunk
+    return bytes(data)
+
+
+# Read one frame from a blocking socket (the daemon reads with read_frame)
+def recv_frame(sock: socket.socket) -> bytes:
+    (length,) = HEADER.unpack(recv_exactly(sock, HEADER.size))
+    if length > MAX_FRAME:
+        raise ProtocolError(f"Frame of {length:,} bytes exceeds {MAX_FRAME:,}")
+    return recv_exactly(sock, length)
@@ -0,0 +1,193 @@
+import json
+import sys
+from typing import Iterable, Iterator, Tuple
+
+from lexical import Token
+
+# Number of pieces of text collected before they are written out in one call
+CHUNK_PIECES = 4096
+
+
+# Collects small strings and writes them to a file object in large chunks
+class ChunkedWriter:
+    def __init__(self, stream=None, chunk_pieces: int = CHUNK_PIECES):
+        self.stream = stream if stream is not None else sys.stdout
+        self.chunk_pieces = chunk_pieces
+        self.pieces = []
+
+    def write(self, text: str):
+        self.pieces.append(text)
+        if len(self.pieces) >= self.chunk_pieces:
+            self.flush()
+
+    def flush(self):
+        if self.pieces:
+            self.stream.write("".join(self.pieces))
+            self.pieces.clear()
+
+
+# Visit nodes in preorder as (node, depth, parent index, index), using an
+# explicit stack so arbitrarily deep trees never hit the recursion limit.
+# Indexes number the nodes in visiting order; top-level parents are -1.
+def walk(statements: Iterable, depth: int = 0) -> Iterator[Tuple[object, int, int, int]]:
+    index = 0
+    stack = [(iter(statements), -1)]  # (unvisited siblings, their parent's index)
+    while stack:
+        siblings, parent = stack[-1]
+        for node in siblings:
+            yield node, depth + len(stack) - 1, parent, index
+            index += 1
+            if node.children:
+                stack.append((iter(node.children), index - 1))
+                break
+        else:
+            stack.pop()
+
+
+# Plain value of a node for the machine-readable formats
+def node_value(node):
+    value = node.value
+    if isinstance(value, Token):
+        return value.value
+    return value
+
+
+# Indented tree, one node per line and one tab per level. A blank line follows
+# each top-level statement when `separate` is set (the display_ast layout).
+def render_text(statements: Iterable, stream=None, level: int = 0, separate: bool = False):
+    writer = ChunkedWriter(stream)
+    pieces, limit = writer.pieces, writer.chunk_pieces
+    indents = ["\t" * level]  # Indent strings by depth below `level`
+    for statement in statements:
+        stack = [iter((statement,))]  # Unvisited siblings at each depth
+        while stack:
+            for node in stack[-1]:
+                depth = len(stack) - 1
+                if depth == len(indents):
+                    indents.append(indents[-1] + "\t")
+                pieces.append(f"{indents[depth]}{node.type}({node.value if node.value else ''})\n")
+                if len(pieces) >= limit:
+                    writer.flush()
+                if node.children:
+                    stack.append(iter(node.children))
+                    break
+            else:
+                stack.pop()
+        if separate:
+            pieces.append("\n")
+    writer.flush()
+
+
+# The display_ast layout: a heading, then the indented tree with a blank line
+# after each top-level statement
+def render_display(statements: Iterable, stream=None):
+    stream = stream if stream is not None else sys.stdout
+    stream.write("Abstract Syntax Tree (AST):\n")
+    render_text(statements, stream, separate=True)
+
+
+# JSON Lines: one object per node in preorder with its id and parent id, so
+# tools can rebuild the tree without nested JSON
+def render_jsonl(statements: Iterable, stream=None):
+    writer = ChunkedWriter(stream)
+    write = writer.write
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    for node, depth, parent, index in walk(statements):
+        value = node_value(node)
+        write(
+            f'{{"id": {index}, "parent": {"null" if parent == -1 else parent}, '
+            f'"depth": {depth}, "type": {encode(node.type)}, '
+            f'"value": {"null" if value is None else encode(value)}}}\n'
+        )
+    writer.flush()
+
+
+# S-expressions: one per top-level statement and line, e.g.
+#   (Assignment (Identifier "x") (BinaryOperation "+" (Literal "1") (Literal "2")))
+def render_sexpr(statements: Iterable, stream=None):
+    writer = ChunkedWriter(stream)
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    for statement in statements:
+        stack = [iter((statement,))]  # Unvisited siblings of each open list
+        while stack:
+            for node in stack[-1]:
+                if len(stack) > 1:
+                    writer.write(" ")
+                value = node_value(node)
+                if value is None:
+                    writer.write(f"({node.type}")
+                else:
+                    writer.write(f"({node.type} {encode(value)}")
+                stack.append(iter(node.children))
+                break
+            else:
+                stack.pop()
+                if stack:
+                    writer.write(")")
+        writer.write("\n")
+    writer.flush()
+
+
+# Graphviz DOT: one box per node labelled with its type and value, and an edge
+# from each node to its children. Render with e.g. `dot -Tsvg ast.dot`.
+def render_dot(statements: Iterable, stream=None):
+    writer = ChunkedWriter(stream)
+    write = writer.write
+    encode = json.JSONEncoder(ensure_ascii=False).encode  # A quoted, escaped DOT string
+    write("digraph AST {\n    node [shape=box];\n")
+    for node, _, parent, index in walk(statements):
+        value = node_value(node)
+        label = node.type if value is None or value == "" else f"{node.type}\n{value}"
+        write(f"    n{index} [label={encode(label)}];\n")
+        if parent != -1:
+            write(f"    n{parent} -> n{index};\n")
+    write("}\n")
+    writer.flush()
+
+
+FORMATS = {
+    "text": render_text,
+    "jsonl": render_jsonl,
+    "sexpr": render_sexpr,
+    "dot": render_dot,
+}
+
+
+def main(argv=None):
+    import argparse
+
+    from diagnostics import Diagnostics
+    from lexical import LexicalAnalyzer
+    from sourcemap import SourceMap, open_source
+    from symbols import SymbolTable
+    from syntax import Parser, SyntaxError, raise_for_errors
+
+    parser = argparse.ArgumentParser(description="Export the AST of a PoliteLang program.")
+    parser.add_argument("program", help="PoliteLang source file")
+    parser.add_argument("-f", "--format", choices=sorted(FORMATS), default="text")
+    parser.add_argument("-o", "--output", default=None, help="write here instead of stdout")
+    args = parser.parse_args(argv)
+
+    diagnostics = Diagnostics(SourceMap(path=args.program))
+    try:
+        with open_source(args.program) as file:
+            symbols = SymbolTable()
+            lexer = LexicalAnalyzer(engine="regex", diagnostics=diagnostics, symbols=symbols)
+            statements = Parser(lexer.iter_tokens(file), diagnostics, symbols).parse_program_iter()
+            if args.output is None:
+                FORMATS[args.format](statements, sys.stdout)
+            else:
+                with open(args.output, "w", encoding="utf-8") as output:
+                    FORMATS[args.format](statements, output)
+        raise_for_errors(diagnostics, sys.stderr)  # Keep stdout for the exported tree
+    except SyntaxError as e:
+        print(f"Syntax Error: {e}")
+        return 1
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import re
+from array import array
+from bisect import bisect_right
+from typing import Optional, Tuple, Union
+
+NEWLINE = re.compile("\n")
+NEWLINE_BYTES = re.compile(b"\n")
+
+
+# Source files are read as UTF-8 with universal newlines (\r\n and \r become
+# \n), the same way by every path that lexes a file or maps its offsets, so
+# locations don't depend on the locale or on how the file was read
+def open_source(path: str):
+    return open(path, "r", encoding="utf-8")
+
+
+# Text of a source file read as bytes, exactly as open_source would read it
+def decode_source(data: bytes) -> str:
+    return data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+
+# Maps offsets in a source (characters of a str, or bytes of a bytes-like
+# buffer such as an mmap) to 1-based line and column numbers. The sorted array
+# of newline offsets is only built on the first lookup, and the source itself
+# can be read from `path` at that point, so compiling without errors never
+# pays for it. Each lookup is then a binary search.
+class SourceMap:
+    def __init__(self, source: Union[str, bytes, None] = None, path: Optional[str] = None):
+        if source is None and path is None:
+            raise ValueError("SourceMap needs a source or a path")
+        self.source = source
+        self.path = path
+        self.newlines = None  # Offsets of every newline, built by index()
+
+    def index(self) -> array:
+        if self.newlines is None:
+            if self.source is None:
+                with open_source(self.path) as file:  # Decoded like the lexer reads it
+                    self.source = file.read()
+            pattern = NEWLINE if isinstance(self.source, str) else NEWLINE_BYTES
+            self.newlines = array("Q", (m.start() for m in pattern.finditer(self.source)))
+        return self.newlines
+
+    # Return the 1-based (line, column) of an offset
+    def line_col(self, offset: int) -> Tuple[int, int]:
+        newlines = self.index()
+        line = bisect_right(newlines, offset - 1)
+        line_start = newlines[line - 1] + 1 if line else 0
+        return line + 1, offset - line_start + 1
+
+    # Return the text of a 1-based line, without its newline
+    def line_text(self, line: int):
+        newlines = self.index()
+        start = newlines[line - 2] + 1 if line > 1 else 0
+        end = newlines[line - 1] if line - 1 < len(newlines) else len(self.source)
+        return self.source[start:end]
+
+    def location(self, offset: int) -> str:
+        line, column = self.line_col(offset)
+        return f"line {line}, column {column}"
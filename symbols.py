@@ -0,0 +1,29 @@
+from typing import Dict, List
+
+
+# Identifier names of one compilation session, each stored once and numbered
+# densely from 0 in order of first appearance. The lexer and parser of a
+# session share one table, so tokens and Identifier nodes carry the same
+# integer ID for the same name, and later passes can keep per-variable data
+# in lists indexed by ID instead of dicts keyed by name.
+class SymbolTable:
+    def __init__(self):
+        self.ids: Dict[str, int] = {}  # Name -> ID
+        self.names: List[str] = []  # ID -> name
+
+    # Return the ID of a name, assigning the next one on first sight
+    def intern(self, name: str) -> int:
+        symbol = self.ids.get(name)
+        if symbol is None:
+            symbol = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return symbol
+
+    def name(self, symbol: int) -> str:
+        return self.names[symbol]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.ids
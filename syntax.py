@@ -1,23 +1,37 @@
-from typing import List, Union
-from lexical import Token, TokenType, LexicalAnalyzer
-from PrettyPrint import PrettyPrintTree
-
-# Assuming Token and TokenType are already defined, as in your lexical analysis
+import io
+import sys
+from collections import deque
+from typing import Iterable, Iterator, Optional
+from backends import load_backend
+from diagnostics import Diagnostics
+from grammar import NO_PRODUCTION, load_grammar, terminal_text
+from lexical import Token, TokenKind, TokenType
+from render import render_display, render_text
+from symbols import SymbolTable
 
 
 class SyntaxError(Exception):
     pass
 
 
+# Shared children of every node that has none, so leaf nodes don't allocate a list
+NO_CHILDREN = ()
+
+
 # AST Node classes
 class ASTNode:
+    __slots__ = ("type", "value", "children")  # No per-instance __dict__
+
     def __init__(self, type_, value=None):
         self.type = type_
         self.value = value
-        self.children = []
+        self.children = NO_CHILDREN
 
     def add_child(self, child):
-        self.children.append(child)
+        if self.children is NO_CHILDREN:
+            self.children = [child]
+        else:
+            self.children.append(child)
 
     # def __repr__(self):
     #     return f"{self.type}({self.value}) -> {self.children}"
@@ -31,36 +45,44 @@ class ASTNode:
 
     def to_tree(self, level=0):
         # Create a hierarchical tree-like string representation
-        ret = "\t" * level + f"{self.type}({self.value if self.value else ''})\n"
-        for child in self.children:
-            if isinstance(child, ASTNode):  # Ensure child is an ASTNode
-                ret += child.to_tree(level + 1)
-            elif isinstance(child, list):  # Handle lists of ASTNodes
-                for sub_child in child:
-                    ret += sub_child.to_tree(level + 1)
-            else:
-                raise TypeError("Invalid child type in ASTNode")
-        return ret
+        output = io.StringIO()
+        render_text([self], output, level)
+        return output.getvalue()
 
     def __repr__(self):
         # Keep __repr__ simple for debugging purposes
         return f"{self.type}({self.value})"
 
 
+# Variable reference: the name plus its SymbolTable ID
+class IdentifierNode(ASTNode):
+    __slots__ = ("symbol",)
+
+    def __init__(self, name: str, symbol: int):
+        super().__init__("Identifier", name)
+        self.symbol = symbol
+
+
 class AssignmentNode(ASTNode):
+    __slots__ = ()
+
     def __init__(self, identifier, expression):
         super().__init__("Assignment")
-        self.add_child(ASTNode("Identifier", identifier))
+        self.add_child(identifier)
         self.add_child(expression)
 
 
 class PrintNode(ASTNode):
+    __slots__ = ()
+
     def __init__(self, print_type, expression):
         super().__init__(f"{print_type.capitalize()}Print")
         self.add_child(expression)
 
 
 class IfNode(ASTNode):
+    __slots__ = ()
+
     def __init__(self, condition, if_body, else_body=None):
         super().__init__("If")
         self.add_child(condition)
@@ -70,6 +92,8 @@ class IfNode(ASTNode):
 
 
 class WhileNode(ASTNode):
+    __slots__ = ()
+
     def __init__(self, condition, body):
         super().__init__("While")
         self.add_child(condition)
@@ -77,24 +101,98 @@ class WhileNode(ASTNode):
 
 
 class ForNode(ASTNode):
+    __slots__ = ()
+
     def __init__(self, identifier, expression, body):
         super().__init__("ForEach")
-        self.add_child(ASTNode("Identifier", identifier))
+        self.add_child(identifier)
         self.add_child(expression)
         self.add_child(body)
 
 
 class BinaryOperationNode(ASTNode):
+    __slots__ = ()
+
     def __init__(self, operator, left, right):
         super().__init__("BinaryOperation", operator)
         self.add_child(left)
         self.add_child(right)
 
 
+# List literal: [a, b, c]
+class ListNode(ASTNode):
+    __slots__ = ()
+
+    def __init__(self, items):
+        super().__init__("List")
+        if items:
+            self.children = list(items)
+
+
+# Range literal: [start : stop] or [start : stop : step], like Python's range
+class RangeNode(ASTNode):
+    __slots__ = ()
+
+    def __init__(self, bounds):
+        super().__init__("Range")
+        self.children = list(bounds)
+
+
+# Binding power and associativity of every operator in LexicalAnalyzer.OPERATORS,
+# from loosest to tightest: assignment, equality, comparison, additive, multiplicative
+BINARY_PRECEDENCE = {
+    "=": (1, True),  # Right-associative: a = b = c is a = (b = c)
+    "==": (2, False),
+    "!=": (2, False),
+    "<": (3, False),
+    ">": (3, False),
+    "<=": (3, False),
+    ">=": (3, False),
+    "+": (4, False),
+    "-": (4, False),
+    "*": (5, False),
+    "/": (5, False),
+}
+
+
+# Statement grammar driving Parser.parse_nonterminal; its predict table is
+# indexed by nonterminal id and TokenKind (see politelang.grammar)
+GRAMMAR = load_grammar()
+STATEMENT = GRAMMAR.ids["statement"]
+
+
+# Emit the collected diagnostics in bulk, then raise if parsing found syntax errors
+def raise_for_errors(diagnostics: Diagnostics, stream=None):
+    diagnostics.emit(stream)
+    errors = diagnostics.count("syntax")
+    if errors:
+        raise SyntaxError(f"{errors} syntax error(s) found")
+
+
 class Parser:
-    def __init__(self, tokens: List[Token]):
-        self.tokens = tokens
-        self.position = 0
+    # Accepts a list or any iterator of tokens (e.g. LexicalAnalyzer.iter_tokens),
+    # pulling tokens lazily into a small lookahead buffer.
+    # Without diagnostics the first syntax error is raised. With a Diagnostics
+    # collector every error is reported to it and parsing resumes after the
+    # next thanks~ or at the next }, so one pass finds all errors.
+    # Identifier nodes take the symbol ID of their token; names of tokens that
+    # were not interned by the lexer go into `symbols`, which should then be
+    # the lexer's table.
+    # With a hashcons.NodeFactory as `nodes`, every statement is returned as
+    # shared immutable nodes interned in it (see hashcons.py).
+    def __init__(
+        self,
+        tokens: Iterable[Token],
+        diagnostics: Optional[Diagnostics] = None,
+        symbols: Optional[SymbolTable] = None,
+        nodes=None,
+    ):
+        self.tokens = iter(tokens)
+        self.lookahead = deque()  # Tokens read from self.tokens but not yet consumed
+        self.position = 0  # Number of tokens consumed so far
+        self.diagnostics = diagnostics
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        self.nodes = nodes
 
     # def display_ast(self, ast):
     # print("Abstract Syntax Tree (AST):")
@@ -104,9 +202,7 @@ class Parser:
     # )  # Each statement is printed with tree-like structure from __repr__
 
     def display_ast(self, ast):
-        print("Abstract Syntax Tree (AST):")
-        for statement in ast:
-            print(statement.to_tree())
+        render_display(ast, sys.stdout)  # Streams deep trees without recursing
 
     # def visualize_ast(self, ast_root):
     #     """
@@ -119,26 +215,33 @@ class Parser:
     #     )
     #     pt(ast_root)  # Print the tree to the console
 
+    # Visualize using PrettyPrintTree, imported only now (see backends.py)
     def visualize_ast(self, ast_statements):
-        # Create a dummy root node to hold the entire program
-        program_root = ASTNode("Program")
-
-        # Add each top-level statement as a child of the root
-        for statement in ast_statements:
-            program_root.add_child(statement)
-
-        # Visualize using PrettyPrintTree
-        pt = PrettyPrintTree(
-            lambda node: node.children,  # Function to get child nodes
-            lambda node: f"{node.type}\n{node.value if node.value else ''}",  # Function to get node label
-        )
-        pt(program_root)  # Print the full program tree
+        load_backend("pretty")(ast_statements, sys.stdout)
 
     # Utility functions for parser
+    def peek(self, offset=0):
+        # Fill the lookahead buffer up to the requested token
+        while len(self.lookahead) <= offset:
+            token = next(self.tokens, None)
+            if token is None:
+                return None
+            self.lookahead.append(token)
+        return self.lookahead[offset]
+
     def current_token(self):
-        return self.tokens[self.position] if self.position < len(self.tokens) else None
+        return self.peek()
+
+    # Identifier node for an IDENTIFIER token, with the token's symbol ID
+    def identifier(self, token) -> IdentifierNode:
+        symbol = token.symbol
+        if symbol is None:
+            symbol = self.symbols.intern(token.value)
+        return IdentifierNode(token.value, symbol)
 
     def advance(self):
+        if self.current_token() is not None:
+            self.lookahead.popleft()
         self.position += 1
 
     def expect(self, type_: TokenType, value=None):
@@ -152,162 +255,335 @@ class Parser:
     # Parse a complete PoliteLang program (sequence of statements)
     # Using grammar rules: <STATEMENT_LIST> ::= <STATEMENT> <STATEMENT_LIST> | ε
     def parse_program(self):
-        statements = []
-        while self.position < len(self.tokens):
-            statements.append(self.parse_statement())
-        return statements
+        return list(self.parse_program_iter())
 
-    # Parse a single statement
-    # Using grammar rules: <STATEMENT> ::= <STATEMENT> ::= pls <IDENTIFIER> = <EXPRESSION> thanks~
+    # Yield top-level statements one at a time as soon as each one is parsed
+    def parse_program_iter(self) -> Iterator[ASTNode]:
+        while self.current_token() is not None:
+            statement = self.parse_statement_or_recover()
+            if statement is not None:
+                yield statement
+
+    # Parse a single statement with the grammar's predict table
+    # Using grammar rules: <STATEMENT> ::= pls <IDENTIFIER> = <EXPRESSION> thanks~
     #                                   | show(<EXPRESSION>) thanks~
     #                                   | whisper(<EXPRESSION>) thanks~
     #                                   | shout(<EXPRESSION>) thanks~
     #                                   | Check (<EXPRESSION>) { <STATEMENT_LIST> } [otherwise { <STATEMENT_LIST> }]
     #                                   | During (<EXPRESSION>) { <STATEMENT_LIST> }
     #                                   | Given <IDENTIFIER> in <EXPRESSION> { <STATEMENT_LIST> }
-    def parse_statement(self):
-        token = self.current_token()
-
-        if token.type == TokenType.KEYWORD:
-            if token.value == "pls":
-                return self.parse_assignment()
-            elif token.value == "show":
-                return self.parse_print("show")
-            elif token.value == "whisper":
-                return self.parse_print("whisper")
-            elif token.value == "shout":
-                return self.parse_print("shout")
-            elif token.value == "Check":
-                return self.parse_if()
-            elif token.value == "During":
-                return self.parse_while()
-            elif token.value == "Given":
-                return self.parse_for()
-
-        raise SyntaxError(f"Unexpected statement: {token}")
-
-    # Parse an assignment statement
-    # Using grammar rules: <ASSIGNMENT> ::= pls <IDENTIFIER> = <EXPRESSION> thanks~
-    def parse_assignment(self):
-        self.expect(TokenType.KEYWORD, "pls")
-        identifier = self.expect(TokenType.IDENTIFIER)
-        self.expect(TokenType.OPERATOR, "=")
-        expression = self.parse_expression()
-        self.expect(TokenType.END_STATEMENT, "thanks~")
-        # return f"Assignment({identifier.value} = {expression})"   # print the assignment statement for now
-        return AssignmentNode(identifier, expression)
-
-    # Parse a print statement (show, whisper, or shout)
-    # Using grammar rules: <PRINT> ::= show(<EXPRESSION>) thanks~
-    #                               | whisper(<EXPRESSION>) thanks~
-    #                               | shout(<EXPRESSION>) thanks~
-    def parse_print(self, print_type):
-        self.expect(TokenType.KEYWORD, print_type)
-        self.expect(TokenType.SEPARATOR, "(")
-        expression = self.parse_expression()
-        self.expect(TokenType.SEPARATOR, ")")
-        self.expect(TokenType.END_STATEMENT, "thanks~")
-        # return f"{print_type.capitalize()}({expression})"  # Return the print statement for now
-        return PrintNode(print_type, expression)
-
-    # Parse an if-else statement
-    # Using grammar rules: <IF> ::= Check (<CONDITION>) { <STATEMENT_LIST> } [otherwise { <STATEMENT_LIST> }]
-    def parse_if(self):
-        self.expect(TokenType.KEYWORD, "Check")
-        self.expect(TokenType.SEPARATOR, "(")
-        condition = self.parse_expression()
-        self.expect(TokenType.SEPARATOR, ")")
-        self.expect(TokenType.SEPARATOR, "{")
-        if_body = self.parse_program_block()
-        self.expect(TokenType.SEPARATOR, "}")
-
-        else_body = None
-        if self.current_token() and self.current_token().value == "otherwise":
-            self.advance()  # Consume "otherwise"
-            self.expect(TokenType.SEPARATOR, "{")
-            else_body = self.parse_program_block()
-            self.expect(TokenType.SEPARATOR, "}")
-
-        # return f"If({condition}) Then {if_body} Else {else_body}"   # Return the if-else statement for now
-        return IfNode(condition, if_body, else_body)
-
-    # Parse a while loop
-    # Using grammar rules: <WHILE> ::= During (<CONDITION>) { <STATEMENT_LIST> }
-    def parse_while(self):
-        self.expect(TokenType.KEYWORD, "During")
-        self.expect(TokenType.SEPARATOR, "(")
-        condition = self.parse_expression()
-        self.expect(TokenType.SEPARATOR, ")")
-        self.expect(TokenType.SEPARATOR, "{")
-        body = self.parse_program_block()
-        self.expect(TokenType.SEPARATOR, "}")
-        # return f"While({condition}) Do {body}"      # Return the while loop statement for now
-        return WhileNode(condition, body)
-
-    # Parse a for loop
-    # Using grammar rules: <FOR> ::= Given <IDENTIFIER> in <EXPRESSION> { <STATEMENT_LIST> }
-    def parse_for(self):
-        self.expect(TokenType.KEYWORD, "Given")
-        identifier = self.expect(TokenType.IDENTIFIER)
-        self.expect(TokenType.KEYWORD, "in")
-        expression = self.parse_expression()
-        self.expect(TokenType.SEPARATOR, "{")
-        body = self.parse_program_block()
-        self.expect(TokenType.SEPARATOR, "}")
-        # return f"ForEach({identifier.value} in {expression}) Do {body}" # Return the for loop statement for now
-        return ForNode(identifier.value, expression, body)
-        # return ForNode(identifier, expression, body)
-
-    # Parse a block of statements
-    # Using grammar rules: <STATEMENT_LIST> ::= <STATEMENT> <STATEMENT_LIST> | ε
-    def parse_program_block(self):
-
-        # statements = []
-        # while self.current_token() and self.current_token().type != TokenType.SEPARATOR:
-        #     statements.append(self.parse_statement())
-        # return statements
+    # The rules themselves live in politelang.grammar. With diagnostics, a
+    # syntax error is reported and the statement skipped (see
+    # parse_nonterminal), returning None.
+    def parse_statement_or_recover(self):
+        statement = self.parse_nonterminal(STATEMENT)
+        return statement if self.nodes is None else self.nodes.intern(statement)
+
+    # Panic mode: skip the rest of the failed statement, up to and including its
+    # thanks~ or the } closing a block it opened (and any otherwise block), or
+    # up to a } closing the enclosing block. A stray } is skipped on its own.
+    def synchronize(self, start: int):
+        depth = 0  # Blocks opened by skipped tokens
+        while True:
+            token = self.current_token()
+            if token is None:
+                return
+            kind = token.kind
+            if kind == TokenKind.RBRACE and depth == 0:
+                if self.position == start:
+                    self.advance()
+                return
+            self.advance()
+            if kind == TokenKind.LBRACE:
+                depth += 1
+            elif kind == TokenKind.RBRACE:
+                depth -= 1
+                if depth == 0:
+                    following = self.current_token()
+                    if not (following and following.kind == TokenKind.OTHERWISE):
+                        return
+            elif kind == TokenKind.THANKS and depth == 0:
+                return
+
+    # Table-driven LL(1) parse of one GRAMMAR nonterminal. Each rule being
+    # parsed is a frame on an explicit stack, so nested blocks do not recurse:
+    #   [rhs, position, values, production, nonterminal, recovery start, parent values]
+    # The next token's kind picks a production from the predict table; a
+    # finished frame hands its builder's result to its parent's values.
+    # With diagnostics, a syntax error inside a %recover nonterminal (a
+    # statement) is reported, the frames above it are dropped and the rest of
+    # the statement skipped, and parsing continues with the statement left out.
+    def parse_nonterminal(self, nonterminal: int):
+        table, rhs_of, loops, builders = PREDICT_TABLE, PRODUCTION_RHS, PRODUCTION_LOOPS, BUILDERS
+        owners, externals = PRODUCTION_NONTERMINALS, EXTERNALS
+        recover = RECOVER if self.diagnostics is not None else ()
+        lookahead = self.lookahead
+        tokens = self.tokens
+        eof = TokenKind.EOF
+        root = [(~nonterminal,), 0, [], NO_PRODUCTION, None, None, None]
+        frames = [root]
+        while True:
+            frame = frames[-1]
+            rhs = frame[0]
+            position = frame[1]
+            try:
+                if position == len(rhs):
+                    if frame is root:
+                        break
+                    production = frame[3]
+                    if loops[production]:
+                        # Repeat the rule in place, keeping the values collected so far
+                        if lookahead:
+                            token = lookahead[0]
+                        else:
+                            token = next(tokens, None)
+                            if token is not None:
+                                lookahead.append(token)
+                        production = table[frame[4]][token.kind if token is not None else eof]
+                        if production == NO_PRODUCTION:
+                            raise SyntaxError(f"Unexpected {NONTERMINALS[frame[4]]}: {token}")
+                        frame[0] = rhs_of[production]
+                        frame[1] = 0
+                        frame[3] = production
+                        continue
+                    frames.pop()
+                    frame[6].append(builders[production](self, frame[2]))
+                    continue
+
+                symbol = rhs[position]
+                frame[1] = position + 1
+                if symbol < 0:
+                    external = externals.get(~symbol)
+                    if external is not None:
+                        frame[2].append(external(self))
+                        continue
+                if lookahead:
+                    token = lookahead[0]
+                else:
+                    token = next(tokens, None)
+                    if token is not None:
+                        lookahead.append(token)
+                if symbol >= 0:
+                    if token is not None and token.kind == symbol:
+                        lookahead.popleft()
+                        self.position += 1
+                    elif token is not None or symbol != eof:
+                        raise SyntaxError(f"Expected {terminal_text(symbol)}, but got {token}")
+                    frame[2].append(token)
+                    continue
+
+                nonterminal = ~symbol
+                child = [
+                    None,
+                    0,
+                    [],
+                    NO_PRODUCTION,
+                    nonterminal,
+                    self.position if nonterminal in recover else None,
+                    frame[2],
+                ]
+                frames.append(child)
+                production = table[nonterminal][token.kind if token is not None else eof]
+                if production == NO_PRODUCTION:
+                    raise SyntaxError(f"Unexpected {NONTERMINALS[nonterminal]}: {token}")
+                child[0] = rhs_of[production]
+                child[3] = production
+                child[4] = owners[production]  # Unit alternatives were skipped
+            except SyntaxError as e:
+                for index in range(len(frames) - 1, 0, -1):
+                    start = frames[index][5]
+                    if start is not None:
+                        break
+                else:
+                    raise
+                token = self.current_token()
+                offset = getattr(token, "start", None)  # Unknown for hand-made tokens and at the end
+                self.diagnostics.report("syntax", str(e), offset, self.position)
+                del frames[index:]
+                self.synchronize(start)
+        values = root[2]
+        return values[0] if values else None
+
+    # Builders named by the grammar's "-> name" actions. `values` holds the
+    # value of each symbol of the alternative: the Token of a terminal, the
+    # built node of a nonterminal.
+
+    # Alternatives without an action keep their only value (ε gives None)
+    def build_single(self, values):
+        return values[0] if values else None
+
+    # <PROGRAM> ::= <STATEMENT_LIST> EOF
+    def build_program(self, values):
+        return list(values[0].children)
+
+    # <STATEMENT_LIST> ::= <STATEMENT> <STATEMENT_LIST> | ε
+    def build_statement_list(self, values):
         block_node = ASTNode("Block")  # Create a node for the block
-        while self.current_token() and self.current_token().type != TokenType.SEPARATOR:
-            block_node.add_child(self.parse_statement())
+        if values:
+            block_node.children = values
         return block_node
 
-    # Parse an expression
-    # Using grammar rules: <EXPRESSION> ::= <PRIMARY> <OPERATOR> <PRIMARY> | <PRIMARY>
-    # e.g., 5 + 3, x * y, "Hello" + "World" for <PRIMARY> <OPERATOR> <PRIMARY>
-    # e.g., 5, x, "Hello" for <PRIMARY>
+    # <ASSIGNMENT> ::= pls <IDENTIFIER> = <EXPRESSION> thanks~
+    def build_assignment(self, values):
+        return AssignmentNode(self.identifier(values[1]), values[3])
+
+    # <PRINT> ::= show(<EXPRESSION>) thanks~ | whisper(<EXPRESSION>) thanks~ | shout(<EXPRESSION>) thanks~
+    def build_print(self, values):
+        return PrintNode(values[0].value, values[2])
+
+    # <IF> ::= Check (<CONDITION>) <BLOCK> [otherwise <BLOCK>]
+    def build_if(self, values):
+        return IfNode(values[2], values[4], values[5])
+
+    def build_else(self, values):
+        return values[1]
+
+    # <WHILE> ::= During (<CONDITION>) <BLOCK>
+    def build_while(self, values):
+        return WhileNode(values[2], values[4])
+
+    # <FOR> ::= Given <IDENTIFIER> in <EXPRESSION> <BLOCK>
+    def build_for(self, values):
+        return ForNode(self.identifier(values[1]), values[3], values[4])
+
+    # <BLOCK> ::= { <STATEMENT_LIST> }
+    def build_block(self, values):
+        return values[1]
+
+    # Parse an expression with precedence climbing (see BINARY_PRECEDENCE)
+    # Using grammar rules: <EXPRESSION> ::= <OPERAND> <OPERATOR> <EXPRESSION> | <OPERAND>
+    #                      <OPERAND> ::= (<EXPRESSION>) | <LIST> | <RANGE> | <PRIMARY>
+    #                      <LIST> ::= [ ] | [<EXPRESSION> {, <EXPRESSION>}]
+    #                      <RANGE> ::= [<EXPRESSION> : <EXPRESSION> [: <EXPRESSION>]]
+    # e.g., 1 + 2 * 3 parses as 1 + (2 * 3), a - b - c as (a - b) - c
+    # Operands and pending operators are kept on explicit stacks, so neither long
+    # operator chains nor deeply nested parentheses or lists recurse.
     def parse_expression(self):
-        left = self.parse_primary()  # Parse the left side of the expression
-
-        # Parse any operators following the left side
-        while self.current_token() and self.current_token().type == TokenType.OPERATOR:
-            operator = self.current_token()
+        operands = []  # Parsed sub-expressions
+        operators = []  # Pending operators, with "(" and "[" marking open groups
+        groups = []  # Open "(" and "[" inside this expression, innermost last
+        brackets = []  # Per open "[": [index of its first item in operands, separator]
+
+        def reduce():
+            operator = operators.pop()
+            right = operands.pop()
+            left = operands.pop()
+            operands.append(BinaryOperationNode(operator, left, right))
+
+        while True:
+            # An operand: any number of opening parentheses and brackets, then
+            # a primary (or the end of an empty list)
+            token = self.current_token()
+            while token and token.type == TokenType.SEPARATOR and token.value in ("(", "["):
+                self.advance()  # Skip the opening parenthesis or bracket
+                operators.append(token.value)
+                groups.append(token.value)
+                if token.value == "[":
+                    brackets.append([len(operands), None])
+                    token = self.current_token()
+                    if token and token.type == TokenType.SEPARATOR and token.value == "]":
+                        break  # [] is an empty list, closed below
+                token = self.current_token()
+            else:
+                operands.append(self.parse_primary())
+
+            # After an operand: closing parentheses and brackets, then a list
+            # or range separator, an operator or the end
+            token = self.current_token()
+            separated = False  # Another item of the innermost list or range follows
+            while groups and token and token.type == TokenType.SEPARATOR:
+                group = groups[-1]
+                if group == "(" and token.value == ")":
+                    while operators[-1] != "(":
+                        reduce()
+                    operators.pop()
+                elif group == "[" and token.value in ("]", ",", ":"):
+                    while operators[-1] != "[":
+                        reduce()
+                    if token.value != "]":
+                        self.separate(brackets[-1], token.value, len(operands))
+                        self.advance()  # Move past the separator
+                        separated = True
+                        break
+                    operators.pop()
+                    start, separator = brackets.pop()
+                    items = operands[start:]
+                    del operands[start:]
+                    operands.append(RangeNode(items) if separator == ":" else ListNode(items))
+                else:
+                    break
+                self.advance()  # Skip the closing parenthesis or bracket
+                groups.pop()
+                token = self.current_token()
+            if separated:
+                continue
+
+            if not token or token.type != TokenType.OPERATOR:
+                break
+            if token.value not in BINARY_PRECEDENCE:
+                raise SyntaxError(f"Operator {token.value} cannot be used in an expression")
+            precedence, right_associative = BINARY_PRECEDENCE[token.value]
+            while operators and operators[-1] not in ("(", "["):
+                top = BINARY_PRECEDENCE[operators[-1]][0]
+                if top > precedence or (top == precedence and not right_associative):
+                    reduce()
+                else:
+                    break
+            operators.append(token.value)
             self.advance()  # Move past the operator
-            right = self.parse_primary()  # Parse the right side of the expression
-            left = (
-                # f"({left} {operator.value} {right})"  # Combine into a binary expression for now
-                BinaryOperationNode(operator.value, left, right)
-            )
 
-        return left
-
-    # Parse primary elements (literals, identifiers, and grouped expressions)
-    # Using grammar rules: <PRIMARY> ::= <IDENTIFIER> | <LITERAL> | (<EXPRESSION>)
+        if groups:
+            # Expect the closing parenthesis or bracket of the innermost group
+            self.expect(TokenType.SEPARATOR, ")" if groups[-1] == "(" else "]")
+        while operators:
+            reduce()
+        return operands[0]
+
+    # Record a "," or ":" between the items of an open bracket; one list or
+    # range uses one kind of separator, and a range has two or three bounds
+    def separate(self, bracket, separator, operand_count):
+        if bracket[1] is None:
+            bracket[1] = separator
+        elif bracket[1] != separator:
+            raise SyntaxError("Cannot mix ',' and ':' in one list or range")
+        if separator == ":" and operand_count - bracket[0] >= 3:
+            raise SyntaxError("A range has at most three bounds: [start : stop : step]")
+
+    # Parse primary elements (numbers, strings, booleans and identifiers)
+    # Using grammar rules: <PRIMARY> ::= <IDENTIFIER> | <LITERAL> | <STRING> | yep | nah
+    # Grouped expressions are handled by parse_expression.
     def parse_primary(self):
         token = self.current_token()
 
-        if token.type == TokenType.LITERAL:
+        if token is None:
+            raise SyntaxError("Expected expression, but got None")
+        elif token.type == TokenType.KEYWORD and token.value in ("yep", "nah"):
+            self.advance()
+            return ASTNode("Boolean", token.value)
+        elif token.type == TokenType.LITERAL:
             self.advance()
             # return f"Literal({token.value})"    # Return the literal value for now
             return ASTNode("Literal", token.value)
+        elif token.type == TokenType.STRING:
+            self.advance()
+            return ASTNode("String", token.value)
         elif token.type == TokenType.IDENTIFIER:
             self.advance()
             # return f"Identifier({token.value})"  # Return the identifier for now
-            return ASTNode("Identifier", token.value)
-        elif token.type == TokenType.SEPARATOR and token.value == "(":
-            self.advance()  # Skip the opening parenthesis
-            expr = self.parse_expression()  # Parse the inner expression
-            self.expect(TokenType.SEPARATOR, ")")  # Expect a closing parenthesis
-            # return f"({expr})"  # Return the grouped expression for now
-            return expr
+            return self.identifier(token)
         else:
             raise SyntaxError(f"Expected expression, but got {token}")
+
+
+# Predict table and per-production data of GRAMMAR, in the form parse_nonterminal reads
+PREDICT_TABLE = GRAMMAR.collapsed_table()
+PRODUCTION_RHS = [production.rhs for production in GRAMMAR.productions]
+PRODUCTION_NONTERMINALS = [GRAMMAR.ids[production.nonterminal] for production in GRAMMAR.productions]
+PRODUCTION_LOOPS = [production.loops for production in GRAMMAR.productions]
+BUILDERS = [
+    getattr(Parser, f"build_{production.action}") if production.action else Parser.build_single
+    for production in GRAMMAR.productions
+]
+NONTERMINALS = GRAMMAR.nonterminals
+EXTERNALS = {GRAMMAR.ids[name]: getattr(Parser, f"parse_{name}") for name in GRAMMAR.externals}
+RECOVER = {GRAMMAR.ids[name] for name in GRAMMAR.recover}
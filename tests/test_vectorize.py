@@ -0,0 +1,28 @@
+import io
+
+from interpreter import Interpreter
+from lexical import LexicalAnalyzer
+from symbols import SymbolTable
+from syntax import Parser
+
+
+def run(source: str, vectorize: bool):
+    symbols = SymbolTable()
+    tokens = LexicalAnalyzer(source, symbols=symbols, engine="regex").tokenize()
+    statements = Parser(tokens, None, symbols).parse_program()
+    output = io.StringIO()
+    variables = Interpreter(output, vectorize=vectorize).run(statements)
+    return output.getvalue(), variables
+
+
+# A range beyond int64 runs scalar instead of overflowing in numpy.arange
+def test_range_beyond_int64_matches_scalar():
+    source = """pls t = 0 thanks~
+Given x in [100000000000000000000 : 100000000000000000300] {
+    pls t = x * 2 thanks~
+    show(t) thanks~
+}
+"""
+    batched = run(source, vectorize=True)
+    assert batched == run(source, vectorize=False)
+    assert batched[1]["t"] == 200000000000000000598
@@ -0,0 +1,302 @@
+import importlib
+from typing import Callable, List, Optional
+
+# Batched execution of element-wise Given loops with NumPy. A loop such as
+#     Given x in [0 : 1000000] { pls y = x * x + 3 thanks~ show(y / 2) thanks~ }
+# whose body only assigns and prints arithmetic on the loop variable, on
+# variables the body assigned earlier in the same pass, and on variables it
+# never assigns, has no dependency between iterations: every statement can
+# run once over the whole sequence as an array operation. The output and the
+# final variable values are exactly those of the scalar loop; whenever that
+# cannot be guaranteed (NumPy missing, a sequence that is not all ints or all
+# floats, ints that could lose precision or overflow int64, a division by
+# zero, values of other types) the loop reports it and runs scalar instead,
+# before anything was written or assigned.
+
+# Sequences shorter than this run scalar; the batch setup would cost more
+MIN_ITEMS = 256
+
+# Integers stay exact in int64 arithmetic and when converted to float64
+# (as Python does for / and mixed comparisons) within this bound
+INTEGER_LIMIT = 2**53
+
+ARITHMETIC = {"+", "-", "*", "/"}
+COMPARISONS = {"<", ">", "<=", ">=", "==", "!="}
+
+# The numpy module once loaded, False when it is not installed
+numpy = None
+
+
+def load_numpy():
+    global numpy
+    if numpy is None:
+        try:
+            numpy = importlib.import_module("numpy")
+        except ImportError:
+            numpy = False
+    return numpy
+
+
+# Raised while evaluating a batch that has to run scalar instead
+class Fallback(Exception):
+    pass
+
+
+# One evaluated expression of a batch: a NumPy array with one value per
+# iteration, or a single Python value when it does not depend on the loop
+# variable. `kind` is "int", "float" or "bool"; ints carry their bounds.
+class Batch:
+    __slots__ = ("value", "kind", "low", "high")
+
+    def __init__(self, value, kind: str, low: int = 0, high: int = 0):
+        if kind == "int" and not (-INTEGER_LIMIT <= low and high <= INTEGER_LIMIT):
+            raise Fallback()
+        self.value = value
+        self.kind = kind
+        self.low = low
+        self.high = high
+
+    @property
+    def is_array(self) -> bool:
+        return isinstance(self.value, numpy.ndarray)
+
+
+# Kind of a Python value, or None for values a batch cannot hold
+def kind_of(value) -> Optional[str]:
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    return None
+
+
+# An element-wise Given loop prepared for batched execution. Expressions are
+# kept as tuples: ("constant", value), ("loop",), ("local", slot) for a
+# variable assigned earlier in the body, ("invariant", slot) for one the body
+# never assigns, and (operator, left, right).
+class VectorizedLoop:
+    def __init__(self, variable: int, statements: list, invariants: List[int]):
+        self.variable = variable  # Slot of the loop variable
+        self.statements = statements  # ("assign", slot, expression) / ("print", render, expression)
+        self.invariants = invariants
+
+    # The batched form of a ForEach node, or None when its body is not
+    # element-wise. `slot` maps an Identifier node to its frame slot,
+    # `constant` a Literal, String or Boolean node to its value and `printer`
+    # a print statement to the function turning a value into its output line.
+    @classmethod
+    def plan(cls, node, slot: Callable, constant: Callable, printer: Callable) -> Optional["VectorizedLoop"]:
+        variable = slot(node.children[0])
+        body = node.children[2].children
+        assigned = set()  # Slots assigned so far in one pass over the body
+        later = set()  # Slots the body assigns anywhere
+        invariants = set()
+        for statement in body:
+            if statement.type == "Assignment":
+                later.add(slot(statement.children[0]))
+            elif not statement.type.endswith("Print"):
+                return None
+
+        # Compiled bottom-up with an explicit stack so long expressions don't recurse
+        def expression(root):
+            results = []
+            stack = [(root, False)]
+            while stack:
+                node, expanded = stack.pop()
+                if node.type == "BinaryOperation" and not expanded:
+                    if node.value not in ARITHMETIC | COMPARISONS:
+                        return None
+                    stack.append((node, True))
+                    stack.extend((child, False) for child in reversed(node.children))
+                    continue
+                if node.type == "BinaryOperation":
+                    left, right = results[-2:]
+                    del results[-2:]
+                    if left is None or right is None:
+                        return None
+                    results.append((node.value, left, right))
+                elif node.type in ("Literal", "String", "Boolean"):
+                    value = constant(node)
+                    results.append(("constant", value) if kind_of(value) else None)
+                elif node.type == "Identifier":
+                    target = slot(node)
+                    if target in assigned:
+                        results.append(("local", target))
+                    elif target == variable:
+                        results.append(("loop",))
+                    elif target in later:
+                        return None  # Reads the value of the previous iteration
+                    else:
+                        invariants.add(target)
+                        results.append(("invariant", target))
+                else:
+                    return None
+            return results[0]
+
+        statements = []
+        for statement in body:
+            compiled = expression(statement.children[-1])
+            if compiled is None:
+                return None
+            if statement.type == "Assignment":
+                target = slot(statement.children[0])
+                assigned.add(target)
+                statements.append(("assign", target, compiled))
+            else:
+                statements.append(("print", printer(statement), compiled))
+        if not statements:
+            return None
+        return cls(variable, statements, sorted(invariants))
+
+    # Run the loop over `sequence` as array operations. Returns False, having
+    # changed nothing, when the loop must run scalar instead.
+    def run(self, sequence, frame: list, write_line: Callable, unset) -> bool:
+        if len(sequence) < MIN_ITEMS or not load_numpy():
+            return False
+        try:
+            values = self.load(sequence, frame, unset)
+            with numpy.errstate(all="ignore"):  # inf and nan as in Python floats
+                results = self.evaluate(values)
+        except Fallback:
+            return False
+
+        columns = []
+        for kind, target, batch in results:
+            if kind == "print":
+                if batch.is_array:
+                    columns.append([target(value) for value in batch.value.tolist()])
+                else:
+                    columns.append([target(batch.value)] * len(sequence))
+        if len(columns) == 1:
+            for line in columns[0]:
+                write_line(line)
+        elif columns:
+            for row in zip(*columns):
+                for line in row:
+                    write_line(line)
+
+        frame[self.variable] = sequence[-1]
+        for kind, target, batch in results:
+            if kind == "assign":
+                frame[target] = batch.value[-1].item() if batch.is_array else batch.value
+        return True
+
+    # Batches of the loop variable and the invariant variables
+    def load(self, sequence, frame: list, unset) -> dict:
+        if isinstance(sequence, range):
+            low, high = min(sequence[0], sequence[-1]), max(sequence[0], sequence[-1])
+            if not (-INTEGER_LIMIT <= low and high <= INTEGER_LIMIT):
+                raise Fallback()  # Before arange, which cannot hold such bounds
+            array = numpy.arange(sequence.start, sequence.stop, sequence.step, dtype=numpy.int64)
+            values = {("loop",): Batch(array, "int", low, high)}
+        elif isinstance(sequence, list):
+            kinds = set(map(type, sequence))
+            if kinds == {int}:
+                try:
+                    array = numpy.array(sequence, dtype=numpy.int64)
+                except OverflowError:
+                    raise Fallback() from None
+                values = {("loop",): Batch(array, "int", int(array.min()), int(array.max()))}
+            elif kinds == {float}:
+                values = {("loop",): Batch(numpy.array(sequence, dtype=numpy.float64), "float")}
+            else:
+                raise Fallback()
+        else:
+            raise Fallback()  # e.g. the characters of a string
+
+        for slot in self.invariants:
+            value = frame[slot]
+            if value is unset:
+                raise Fallback()  # The scalar loop reports the error
+            kind = kind_of(value)
+            if kind is None:
+                raise Fallback()
+            values[("invariant", slot)] = Batch(value, kind, value, value) if kind == "int" else Batch(value, kind)
+        return values
+
+    # ("assign" or "print", slot or render, Batch) for each statement in order
+    def evaluate(self, values: dict) -> list:
+        results = []
+        for kind, target, expression in self.statements:
+            batch = self.expression(expression, values)
+            if kind == "assign":
+                values[("local", target)] = batch
+            results.append((kind, target, batch))
+        return results
+
+    # Evaluated bottom-up with an explicit stack so long expressions don't recurse
+    def expression(self, root: tuple, values: dict) -> Batch:
+        results = []
+        stack = [(root, False)]
+        while stack:
+            expression, expanded = stack.pop()
+            if expression[0] == "constant":
+                value = expression[1]
+                kind = kind_of(value)
+                results.append(Batch(value, kind, value, value) if kind == "int" else Batch(value, kind))
+            elif len(expression) < 3:
+                results.append(values[expression])
+            elif not expanded:
+                stack.append((expression, True))
+                stack.append((expression[2], False))
+                stack.append((expression[1], False))
+            else:
+                left, right = results[-2:]
+                del results[-2:]
+                results.append(self.operation(expression[0], left, right))
+        return results[0]
+
+    def operation(self, operator: str, left: Batch, right: Batch) -> Batch:
+        numeric = left.kind != "bool" and right.kind != "bool"
+
+        if operator in COMPARISONS:
+            if not numeric and (operator not in ("==", "!=") or left.kind != right.kind):
+                raise Fallback()
+            return Batch(compare(operator, left.value, right.value), "bool")
+        if not numeric:
+            raise Fallback()  # bool arithmetic differs between Python and NumPy
+        if operator == "/":
+            divisor = right.value
+            if (right.is_array and not divisor.all()) or (not right.is_array and divisor == 0):
+                raise Fallback()  # The scalar loop raises at the right iteration
+            return Batch(divide(left.value, divisor), "float")
+        if left.kind == "float" or right.kind == "float":
+            return Batch(arithmetic(operator, left.value, right.value), "float")
+        if operator == "+":
+            low, high = left.low + right.low, left.high + right.high
+        elif operator == "-":
+            low, high = left.low - right.high, left.high - right.low
+        else:
+            products = [a * b for a in (left.low, left.high) for b in (right.low, right.high)]
+            low, high = min(products), max(products)
+        return Batch(arithmetic(operator, left.value, right.value), "int", low, high)
+
+
+def arithmetic(operator: str, left, right):
+    if operator == "+":
+        return left + right
+    if operator == "-":
+        return left - right
+    return left * right
+
+
+def divide(left, right):
+    if isinstance(left, numpy.ndarray) or isinstance(right, numpy.ndarray):
+        return numpy.true_divide(left, right)
+    return left / right
+
+
+def compare(operator: str, left, right):
+    if operator == "<":
+        return left < right
+    if operator == ">":
+        return left > right
+    if operator == "<=":
+        return left <= right
+    if operator == ">=":
+        return left >= right
+    if operator == "==":
+        return left == right
+    return left != right
@@ -0,0 +1,24 @@
+import sys
+from typing import Iterable
+
+from PrettyPrint import PrettyPrintTree
+from syntax import ASTNode
+
+# The PrettyPrintTree drawing of a program. PrettyPrint takes most of a second
+# to import, so this module is only loaded when the "pretty" output backend is
+# selected (see backends.py).
+
+
+# Draw every top-level statement under one Program root
+def render_pretty(statements: Iterable, stream=None):
+    stream = stream if stream is not None else sys.stdout
+    program_root = ASTNode("Program")
+    for statement in statements:
+        program_root.add_child(statement)
+
+    pt = PrettyPrintTree(
+        lambda node: node.children,  # Function to get child nodes
+        lambda node: f"{node.type}\n{node.value if node.value else ''}",  # Function to get node label
+        return_instead_of_print=True,
+    )
+    stream.write(pt(program_root) + "\n")